@@ -0,0 +1,205 @@
+import time
+import warnings
+
+import pandas as pd
+
+from baselines import BASELINE_MODELS, SEASON_LENGTHS, BaselineResult
+from compact_model import load_compact_data
+from data_loader import DATA_FILE, SourceChangedError, open_restaurant_data
+from forecasting import MODEL_SPECS, FittedModelCache, describe_spec
+from order_cube import ALL_ORDERS, OrderCube
+from order_search import AUTO_MODEL, ORDER_CACHE_FILE, SEASONAL_PERIODS, OrderCache, search_order
+from order_store import open_store
+from profiling import PROFILER
+
+# Headless analytics: the data and model logic behind the dashboard's views
+# AnalyticsEngine owns the order counts (an OrderCube over the CSV, or the
+# SQLite OrderStore when one is configured), follows appended rows, and
+# answers the three questions the dashboard asks: the order series for a
+# dish / level / month, a fitted model for it (fitted models and "Auto"
+# orders are cached), and the forecast for one month of the drill-down.
+# It makes no Tk or matplotlib calls, so dashboard_app.py and
+# analytics_server.py share it. forecast_task is the process-pool version of
+# a fit for callers that must not block on statsmodels.
+
+# Forecast horizon per aggregation level for the year view overlay
+FORECAST_STEPS = {"Daily": 30, "Weekly": 5, "Monthly": 3}
+# Days forecast for the month drill-down, enough to cover the next month
+DETAIL_STEPS = 60
+
+
+def forecast_steps(agg_level):
+    return FORECAST_STEPS.get(agg_level, FORECAST_STEPS["Monthly"])
+
+
+def month_forecast(forecast, month, year=None):
+    """The part of a daily forecast that falls in ``month`` (of ``year``, if given)."""
+    in_month = forecast.index.month == month
+    if year is not None:
+        in_month &= forecast.index.year == year
+    return forecast[in_month]
+
+
+def month_summary(forecast):
+    """Average per day, total and number of days of a month's forecast."""
+    return {'average': float(forecast.mean()), 'total': float(forecast.sum()), 'days': len(forecast)}
+
+
+def spec_label(model_name, spec):
+    """``model_name``, with the searched order spelled out for "Auto"."""
+    if model_name != AUTO_MODEL:
+        return model_name
+    return f"{AUTO_MODEL}: " + describe_spec(spec)
+
+
+def model_label(model_name, model_fit):
+    """spec_label for a fitted result (only "Auto" results are asked for their order)."""
+    if model_name != AUTO_MODEL:
+        return model_name
+    model = model_fit.model
+    return spec_label(model_name, {'kind': 'arima', 'order': model.order, 'seasonal_order': model.seasonal_order})
+
+
+def load_orders(csv_path=DATA_FILE, store_path=None):
+    """(order counts, CsvTail) for the CSV, counted from the compact order model when the data allows.
+
+    When an order store is configured (``store_path`` or $HOSPYRA_STORE) it is
+    returned instead, with no CsvTail.
+    """
+    store = open_store(store_path)
+    if store is not None:
+        return store, None
+    try:
+        compact, tail = load_compact_data(csv_path)
+        return OrderCube.from_compact(compact), tail
+    except ValueError as e:
+        print(f"Counting orders from the full table instead of the compact model: {e}")
+        df, tail = open_restaurant_data(csv_path)
+        return OrderCube.from_frame(df), tail
+
+
+class AnalyticsEngine:
+    """Order series, fitted models and forecasts for (dish, aggregation level) selections.
+
+    Call load() before anything else. Not thread-safe for data changes:
+    refresh() must not run while another thread aggregates, but fit() may
+    run on worker threads (both caches lock internally).
+    """
+
+    def __init__(self, csv_path=DATA_FILE, store_path=None, model_cache_size=16, order_cache_path=ORDER_CACHE_FILE):
+        self.csv_path = csv_path
+        self.store_path = store_path
+        self.orders = None
+        self.tail = None
+        self.model_cache = FittedModelCache(maxsize=model_cache_size)
+        self.order_cache = OrderCache(order_cache_path)
+
+    def load(self):
+        with PROFILER.span('data load'):
+            self.orders, self.tail = load_orders(self.csv_path, self.store_path)
+        return self
+
+    @property
+    def dishes(self):
+        """Selectable series: All Orders, then every dish."""
+        return [ALL_ORDERS] + self.orders.dishes
+
+    def swap(self, orders, tail):
+        """Replace the data with a fresh load_orders() result, dropping the models fitted on the old one."""
+        self.orders, self.tail = orders, tail
+        self.model_cache.clear()
+
+    def refresh(self, reload=True):
+        """Fold in rows added since the last call. Returns (changed, newly seen dishes).
+
+        A rewritten CSV (e.g. regenerated) is reloaded in full here; with
+        ``reload=False`` SourceChangedError is raised instead, so the caller
+        can run load_orders() off its own thread and swap() the result in.
+        """
+        with PROFILER.span('data refresh'):
+            if self.tail is None:
+                # Store backend: rows arrive through order_store.py imports
+                return self.orders.refresh()
+            try:
+                new_rows = self.tail.read_new()
+            except SourceChangedError:
+                if not reload:
+                    raise
+                self.load()
+                self.model_cache.clear()
+                return True, self.orders.dishes
+            return len(new_rows) > 0, self.orders.extend(new_rows)
+
+    def aggregate(self, dish, agg_level="Daily", month=None):
+        """Order counts for ``dish`` at ``agg_level`` (optionally one calendar month) as a 'Count' frame."""
+        with PROFILER.span('get_aggregated_data', selection=dish, agg_level=agg_level, month=month):
+            return self.orders.aggregate(dish, agg_level, month)
+
+    def spec_for(self, model_name, name, agg_level, series):
+        """Model spec for ``model_name``; None for "Auto" until an order has been searched for the series."""
+        if model_name == AUTO_MODEL:
+            return self.order_cache.lookup(name, agg_level, series)
+        try:
+            return MODEL_SPECS[model_name]
+        except KeyError:
+            raise ValueError(f"Unknown model: {model_name}") from None
+
+    def baseline(self, model_name, agg_level, series):
+        return BaselineResult(model_name, series, SEASON_LENGTHS.get(agg_level, 1))
+
+    def cached_fit(self, name, agg_level, spec, series):
+        """The cached fitted model for ``spec`` on ``series``, or None."""
+        return self.model_cache.get(self.model_cache.make_key(name, agg_level, spec, series))
+
+    def fit(self, name, agg_level, spec, series, search_executor=None):
+        """Fit (or incrementally update) ``spec`` on ``series``; a None spec searches the "Auto" order first.
+
+        Blocking: the dashboard runs it on a worker thread.
+        """
+        if spec is None:
+            spec = self.order_cache.get_or_search(name, agg_level, series, executor=search_executor)
+        return self.model_cache.fit(name, agg_level, spec, series)
+
+    def forecast(self, model_name, name, agg_level, series, steps, search_executor=None):
+        """(forecast Series, model label) for ``series``, fitting in this thread on a cache miss."""
+        if model_name in BASELINE_MODELS:
+            model_fit = self.baseline(model_name, agg_level, series)
+        else:
+            spec = self.spec_for(model_name, name, agg_level, series)
+            model_fit = None if spec is None else self.cached_fit(name, agg_level, spec, series)
+            if model_fit is None:
+                model_fit = self.fit(name, agg_level, spec, series, search_executor)
+        with PROFILER.span('forecast', steps=steps):
+            return model_fit.forecast(steps=steps), model_label(model_name, model_fit)
+
+
+# Per worker process: lets repeated fits of a series filter new days instead of refitting
+_WORKER_MODELS = None
+
+
+def forecast_task(task):
+    """Fit and forecast one series in a worker process; process-pool entry point.
+
+    ``task`` is (name, agg_level, spec, start, freq, values, steps). A None
+    spec searches the order first; the outcome then carries the search
+    result in 'search' so the caller can cache it. Failures come back in
+    'error' like forecasting.forecast_series_task.
+    """
+    global _WORKER_MODELS
+    name, agg_level, spec, start, freq, values, steps = task
+    started = time.perf_counter()
+    outcome = {'forecast': None, 'spec': spec, 'search': None, 'error': None}
+    try:
+        if _WORKER_MODELS is None:
+            _WORKER_MODELS = FittedModelCache()
+        series = pd.Series(values, index=pd.date_range(start, periods=len(values), freq=freq, name='Date'))
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            if spec is None:
+                outcome['search'] = search_order(series, SEASONAL_PERIODS.get(agg_level, 0))
+                outcome['spec'] = spec = outcome['search']['spec']
+            outcome['forecast'] = _WORKER_MODELS.get_or_fit(name, agg_level, spec, series).forecast(steps=steps)
+    except Exception as e:
+        outcome['error'] = f"{type(e).__name__}: {e}"
+    outcome['seconds'] = time.perf_counter() - started
+    return outcome
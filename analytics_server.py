@@ -0,0 +1,386 @@
+import argparse
+import asyncio
+import json
+import signal
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qsl, urlsplit
+
+from analytics_engine import (DETAIL_STEPS, AnalyticsEngine, forecast_steps, forecast_task, load_orders,
+                              month_forecast, month_summary, spec_label)
+from baselines import BASELINE_MODELS
+from data_loader import DATA_FILE, SourceChangedError
+from forecasting import DEFAULT_MODEL, MODEL_SPECS, process_pool, series_fingerprint
+from order_cube import AGG_FREQS, ALL_ORDERS
+from order_search import AUTO_MODEL
+from profiling import PROFILER
+
+# Local HTTP JSON API over analytics_engine
+# One asyncio event loop serves every connection (HTTP/1.1 keep-alive, GET
+# only). Aggregates are index lookups and baseline forecasts are matrix
+# products, so both run on the loop. ARIMA fits and "Auto" order searches go
+# to a process pool; the loop keeps serving other requests while they run,
+# and concurrent requests for the same fit wait on one shared future.
+# Each endpoint has its own LRU cache of encoded responses keyed on the query.
+# Forecasts are cached per (series, model, data fingerprint) at the longest
+# horizon any endpoint needs, so the year view and the month drill-down of
+# one series share a fit. New rows are picked up every REFRESH_SECONDS; a
+# change clears the response caches. A rewritten CSV is reloaded on a thread
+# and swapped in, so the loop keeps answering from the old data meanwhile.
+#
+# Endpoints (all return JSON):
+#   /health
+#   /dishes
+#   /aggregate?dish=All Orders&level=Daily&month=6
+#   /forecast?dish=...&level=Daily&model=ARIMA (5,1,0)
+#   /forecast/month?dish=...&model=...&month=1&year=2024
+#   /stats                        response cache, fit and request counters
+
+HOST = '127.0.0.1'
+PORT = 8765
+REFRESH_SECONDS = 5
+RESPONSE_CACHE_SIZES = {'/dishes': 1, '/aggregate': 512, '/forecast': 256, '/forecast/month': 256}
+FORECAST_CACHE_SIZE = 256
+# Idle keep-alive connections are closed after this many seconds
+KEEPALIVE_SECONDS = 15
+MAX_HEADER_LINES = 100
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ResponseCache:
+    """Bounded LRU of encoded response bodies for one endpoint."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        body = self._entries.get(key)
+        if body is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return body
+
+    def put(self, key, body):
+        self._entries[key] = body
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        return {'size': len(self._entries), 'maxsize': self.maxsize, 'hits': self.hits, 'misses': self.misses}
+
+
+def series_json(series):
+    """A date-indexed Series as parallel 'dates' / 'values' lists."""
+    return {'dates': series.index.strftime('%Y-%m-%d').tolist(), 'values': [float(v) for v in series.to_numpy()]}
+
+
+def int_param(query, name, default=None, low=None, high=None):
+    value = query.get(name)
+    if value is None or value == '':
+        if default is None:
+            raise HTTPError(400, f"missing parameter: {name}")
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise HTTPError(400, f"{name} must be an integer, not {value!r}") from None
+    if (low is not None and number < low) or (high is not None and number > high):
+        raise HTTPError(400, f"{name} must be between {low} and {high}")
+    return number
+
+
+class AnalyticsService:
+    """Request handlers and caches around one AnalyticsEngine; fits go to ``pool``."""
+
+    def __init__(self, engine, pool, response_cache_sizes=RESPONSE_CACHE_SIZES, forecast_cache_size=FORECAST_CACHE_SIZE):
+        self.engine = engine
+        self.pool = pool
+        self.caches = {path: ResponseCache(size) for path, size in response_cache_sizes.items()}
+        self.forecast_cache_size = forecast_cache_size
+        self._forecasts = OrderedDict()
+        self._inflight = {}
+        self.routes = {'/health': self.health, '/dishes': self.dishes, '/aggregate': self.aggregate,
+                       '/forecast': self.forecast, '/forecast/month': self.forecast_month, '/stats': self.stats}
+        self.models = list(BASELINE_MODELS) + (list(MODEL_SPECS) + [AUTO_MODEL] if pool is not None else [])
+        self.data_version = 0
+        self.requests = 0
+        self.fits = 0
+        self.fit_seconds = 0.0
+        self.started = time.time()
+
+    # --- Parameters ---
+
+    def _dish(self, query):
+        dish = query.get('dish', ALL_ORDERS)
+        if dish != ALL_ORDERS and dish not in self.engine.orders.dishes:
+            raise HTTPError(404, f"unknown dish: {dish}")
+        return dish
+
+    def _level(self, query):
+        level = query.get('level', 'Daily')
+        if level not in AGG_FREQS:
+            raise HTTPError(400, f"level must be one of {', '.join(AGG_FREQS)}")
+        return level
+
+    def _model(self, query):
+        model = query.get('model', DEFAULT_MODEL if DEFAULT_MODEL in self.models else self.models[0])
+        if model not in self.models:
+            raise HTTPError(400, f"model must be one of {', '.join(self.models)}")
+        return model
+
+    # --- Forecasts ---
+
+    async def _forecast(self, dish, level, model):
+        """(forecast Series, label) at the longest horizon served for ``level``, fitting in the pool on a miss."""
+        series = self.engine.aggregate(dish, level)['Count']
+        if len(series) == 0:
+            raise HTTPError(404, f"no orders for {dish}")
+        steps = max(forecast_steps(level), DETAIL_STEPS if level == "Daily" else 0)
+        key = (dish, level, model, series_fingerprint(series))
+        cached = self._forecasts.get(key)
+        if cached is not None:
+            self._forecasts.move_to_end(key)
+            return cached
+
+        if model in BASELINE_MODELS:
+            result = self.engine.forecast(model, dish, level, series, steps)
+        else:
+            # Identical requests arriving while the fit runs share it
+            future = self._inflight.get(key)
+            if future is None:
+                future = asyncio.ensure_future(self._fit_in_pool(dish, level, model, series, steps))
+                self._inflight[key] = future
+                future.add_done_callback(lambda _: self._inflight.pop(key, None))
+            result = await asyncio.shield(future)
+        self._forecasts[key] = result
+        while len(self._forecasts) > self.forecast_cache_size:
+            self._forecasts.popitem(last=False)
+        return result
+
+    async def _fit_in_pool(self, dish, level, model, series, steps):
+        spec = self.engine.spec_for(model, dish, level, series)
+        task = (dish, level, spec, series.index[0], series.index.freqstr, series.to_numpy(dtype='float64'), steps)
+        loop = asyncio.get_running_loop()
+        with PROFILER.span('pool fit', dish=dish, level=level, model=model):
+            outcome = await loop.run_in_executor(self.pool, forecast_task, task)
+        self.fits += 1
+        self.fit_seconds += outcome['seconds']
+        if outcome['error'] is not None:
+            raise HTTPError(500, f"{model} fit failed: {outcome['error']}")
+        if outcome['search'] is not None:
+            # store() rewrites the JSON order cache on disk, so it runs on a thread
+            await loop.run_in_executor(None, self.engine.order_cache.store, dish, level, series, outcome['search'])
+        return outcome['forecast'], spec_label(model, outcome['spec'])
+
+    # --- Endpoints: each returns a JSON-serializable object ---
+
+    async def health(self, query):
+        return {'status': 'ok', 'data_version': self.data_version}
+
+    async def dishes(self, query):
+        return {'dishes': self.engine.dishes, 'models': self.models, 'levels': list(AGG_FREQS)}
+
+    async def aggregate(self, query):
+        dish, level = self._dish(query), self._level(query)
+        month = int_param(query, 'month', 0, 0, 12) or None
+        counts = self.engine.aggregate(dish, level, month)['Count']
+        return {'dish': dish, 'level': level, 'month': month, **series_json(counts)}
+
+    async def forecast(self, query):
+        dish, level, model = self._dish(query), self._level(query), self._model(query)
+        forecast, label = await self._forecast(dish, level, model)
+        steps = forecast_steps(level)
+        return {'dish': dish, 'level': level, 'model': label, 'steps': steps, **series_json(forecast.iloc[:steps])}
+
+    async def forecast_month(self, query):
+        dish, model = self._dish(query), self._model(query)
+        month = int_param(query, 'month', low=1, high=12)
+        year = int_param(query, 'year', 0) or None
+        forecast, label = await self._forecast(dish, "Daily", model)
+        detail = month_forecast(forecast, month, year)
+        if len(detail) == 0:
+            raise HTTPError(404, f"no forecast days in month {month}" + (f" of {year}" if year else ""))
+        return {'dish': dish, 'model': label, 'month': month, 'year': int(detail.index[0].year),
+                **month_summary(detail), **series_json(detail)}
+
+    async def stats(self, query):
+        return {
+            'requests': self.requests,
+            'uptime_seconds': time.time() - self.started,
+            'data_version': self.data_version,
+            'response_caches': {path: cache.stats() for path, cache in self.caches.items()},
+            'forecasts_cached': len(self._forecasts),
+            'fits_in_flight': len(self._inflight),
+            'pool_fits': self.fits,
+            'pool_fit_seconds': self.fit_seconds,
+            'order_cache': {'hits': self.engine.order_cache.hits, 'searches': self.engine.order_cache.searches},
+        }
+
+    # --- Dispatch ---
+
+    async def respond(self, target):
+        """(status, body bytes, cache state) for a request target such as '/aggregate?dish=...'."""
+        self.requests += 1
+        parts = urlsplit(target)
+        path = parts.path.rstrip('/') or '/'
+        handler = self.routes.get(path)
+        if handler is None:
+            return 404, json.dumps({'error': f"no such endpoint: {path}"}).encode(), None
+        query = dict(parse_qsl(parts.query))
+        cache = self.caches.get(path)
+        key = tuple(sorted(query.items()))
+        if cache is not None:
+            body = cache.get(key)
+            if body is not None:
+                return 200, body, 'HIT'
+        version = self.data_version
+        try:
+            body = json.dumps(await handler(query)).encode()
+        except HTTPError as e:
+            return e.status, json.dumps({'error': str(e)}).encode(), None
+        except (KeyError, ValueError) as e:
+            return 400, json.dumps({'error': str(e)}).encode(), None
+        # A refresh while the handler awaited a fit may have made this body stale
+        if cache is not None and self.data_version == version:
+            cache.put(key, body)
+        return 200, body, 'MISS' if cache is not None else None
+
+    async def refresh(self):
+        """Fold in new rows (reloading a rewritten CSV off the loop); on a change, drop every cached response."""
+        try:
+            changed, _ = self.engine.refresh(reload=False)
+        except SourceChangedError:
+            with PROFILER.span('data reload'):
+                loaded = await asyncio.get_running_loop().run_in_executor(
+                    None, load_orders, self.engine.csv_path, self.engine.store_path)
+            self.engine.swap(*loaded)
+            changed = True
+        if changed:
+            self.data_version += 1
+            for cache in self.caches.values():
+                cache.clear()
+        return changed
+
+    async def refresh_loop(self, interval=REFRESH_SECONDS):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"Data refresh error: {e}")
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    break
+                if not request_line:
+                    break
+                headers = {}
+                for _ in range(MAX_HEADER_LINES):
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    status, body, cache_state, version = 400, b'{"error": "malformed request line"}', None, 'HTTP/1.0'
+                else:
+                    if method != 'GET':
+                        status, body, cache_state = 405, json.dumps({'error': "only GET is supported"}).encode(), None
+                    else:
+                        try:
+                            status, body, cache_state = await self.respond(target)
+                        except Exception as e:
+                            status, body, cache_state = 500, json.dumps({'error': f"{type(e).__name__}: {e}"}).encode(), None
+
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                head = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+                        "Content-Type: application/json",
+                        f"Content-Length: {len(body)}",
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+                if cache_state:
+                    head.append(f"X-Cache: {cache_state}")
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(service, host=HOST, port=PORT, refresh_seconds=REFRESH_SECONDS):
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    refresher = asyncio.ensure_future(service.refresh_loop(refresh_seconds)) if refresh_seconds else None
+    addresses = ', '.join(f"http://{s.getsockname()[0]}:{s.getsockname()[1]}" for s in server.sockets)
+    print(f"Serving restaurant analytics on {addresses}", flush=True)
+    # Ctrl+C and SIGTERM stop the server cleanly, so the fit pool is shut down too
+    stop = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            asyncio.get_running_loop().add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            pass  # Windows: Ctrl+C still raises KeyboardInterrupt
+    try:
+        async with server:
+            await stop.wait()
+    finally:
+        if refresher is not None:
+            refresher.cancel()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve order aggregates and forecasts as a local JSON API.")
+    parser.add_argument('--host', default=HOST, help="address to listen on (default: %(default)s)")
+    parser.add_argument('--port', type=int, default=PORT, help="port to listen on (default: %(default)s)")
+    parser.add_argument('--data', default=DATA_FILE, help="input CSV (default: %(default)s)")
+    parser.add_argument('--store', default=None,
+                        help="SQLite order store to serve instead of the CSV (default: $HOSPYRA_STORE if set)")
+    parser.add_argument('--workers', type=int, default=None, help="model fit processes (default: all cores)")
+    parser.add_argument('--no-fits', action='store_true', help="serve baseline forecasts only, with no fit pool")
+    parser.add_argument('--refresh-seconds', type=float, default=REFRESH_SECONDS,
+                        help="how often to pick up new rows, 0 to never (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    try:
+        engine = AnalyticsEngine(args.data, args.store).load()
+    except FileNotFoundError as e:
+        print(str(e) if e.filename is None else f"{args.data} not found! Please run generate_restaurant_data.py first.")
+        return 1
+    pool = None if args.no_fits else process_pool(args.workers)
+    service = AnalyticsService(engine, pool)
+    try:
+        asyncio.run(serve(service, args.host, args.port, args.refresh_seconds))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,177 @@
+import argparse
+import os
+import time
+import warnings
+from concurrent.futures import as_completed
+
+import numpy as np
+import pandas as pd
+
+from baselines import BASELINE_MODELS, SEASON_LENGTHS, forecast_matrix
+from data_loader import DATA_FILE, load_restaurant_data
+from forecasting import MODEL_SPECS, describe_spec, fit_model, process_pool
+from order_cube import AGG_FREQS, ALL_ORDERS, OrderCube
+
+# Rolling-origin backtest of the dashboard's models
+# Forecast origins are spread over the history; each fold fits on everything
+# before its origin and scores the next `horizon` points. Folds run in
+# parallel processes as contiguous blocks, and inside a block each fold's
+# optimizer starts from the previous fold's parameters.
+
+HORIZON = 14
+N_ORIGINS = 20
+MIN_TRAIN = 120
+FOLDS_OUTPUT_FILE = 'backtest_folds.csv'
+HORIZON_OUTPUT_FILE = 'backtest_horizon_errors.csv'
+
+
+def rolling_origins(n_obs, horizon=HORIZON, n_origins=N_ORIGINS, min_train=MIN_TRAIN):
+    """Evenly spaced forecast origins (= training sizes) that leave a full horizon to score."""
+    last = n_obs - horizon
+    if last < min_train:
+        raise ValueError(f"{n_obs} observations are too few for min_train={min_train} and horizon={horizon}")
+    return np.unique(np.linspace(min_train, last, num=n_origins).astype(int)).tolist()
+
+
+def run_fold_block(task):
+    """Run consecutive folds of one model, warm-starting each fit from the previous one.
+
+    Process-pool entry point. ``task`` is (model_name, spec, values, start,
+    freq, origins, horizon); returns one dict per fold.
+    """
+    model_name, spec, values, start, freq, origins, horizon = task
+    series = pd.Series(values, index=pd.date_range(start, periods=len(values), freq=freq))
+    folds = []
+    previous_params = None
+    for origin in origins:
+        fold = {'model': model_name, 'origin': series.index[origin], 'train_size': origin,
+                'warm_start': previous_params is not None, 'errors': None, 'error': None}
+        started = time.perf_counter()
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                result = fit_model(series.iloc[:origin], spec, start_params=previous_params)
+            forecast = np.asarray(result.forecast(steps=horizon), dtype='float64')
+            fold['errors'] = forecast - values[origin:origin + horizon]
+            previous_params = result.params
+        except Exception as e:
+            fold['error'] = f"{type(e).__name__}: {e}"
+            previous_params = None
+        fold['seconds'] = time.perf_counter() - started
+        folds.append(fold)
+    return folds
+
+
+def run_baseline_folds(model_name, series, origins, horizon, season):
+    """Folds of a NumPy baseline, computed in-process (each takes microseconds)."""
+    values = series.to_numpy(dtype='float64')
+    folds = []
+    for origin in origins:
+        started = time.perf_counter()
+        forecast = forecast_matrix(model_name, values[:origin], horizon, season)[0]
+        folds.append({'model': model_name, 'origin': series.index[origin], 'train_size': origin,
+                      'warm_start': False, 'errors': forecast - values[origin:origin + horizon], 'error': None,
+                      'seconds': time.perf_counter() - started})
+    return folds
+
+
+def run_backtest(series, model_names=None, horizon=HORIZON, n_origins=N_ORIGINS, min_train=MIN_TRAIN, workers=None,
+                 season=SEASON_LENGTHS["Daily"]):
+    """Backtest ``model_names`` (default: every MODEL_SPECS entry) on a date-indexed series.
+
+    BASELINE_MODELS names are scored in-process with ``season`` as their
+    season length. Returns (folds, horizon_errors): one row per fold with its
+    timing and summary errors, and MAE/RMSE/bias per (model, horizon step).
+    """
+    model_names = list(model_names or MODEL_SPECS)
+    origins = rolling_origins(len(series), horizon, n_origins, min_train)
+    workers = workers or os.cpu_count() or 1
+    values = series.to_numpy(dtype='float64')
+    freq = series.index.freqstr
+
+    folds = []
+    for name in model_names:
+        if name in BASELINE_MODELS:
+            folds.extend(run_baseline_folds(name, series, origins, horizon, season))
+    fitted_names = [name for name in model_names if name not in BASELINE_MODELS]
+
+    # Split each model's origins into contiguous blocks so all workers stay
+    # busy while most folds still get a warm start from their neighbour.
+    blocks_per_model = max(1, min(len(origins), -(-workers // max(len(fitted_names), 1))))
+    tasks = [(name, MODEL_SPECS[name], values, series.index[0], freq, block.tolist(), horizon)
+             for name in fitted_names
+             for block in np.array_split(np.array(origins), blocks_per_model)]
+
+    if tasks:
+        with process_pool(workers) as pool:
+            for future in as_completed([pool.submit(run_fold_block, task) for task in tasks]):
+                folds.extend(future.result())
+
+    fold_rows, error_rows = [], []
+    for fold in sorted(folds, key=lambda f: (f['model'], f['origin'])):
+        errors = fold['errors']
+        fold_rows.append({
+            'Model': fold['model'], 'Origin': fold['origin'], 'Train_Size': fold['train_size'],
+            'Fit_Seconds': fold['seconds'], 'Warm_Start': fold['warm_start'],
+            'MAE': np.mean(np.abs(errors)) if errors is not None else np.nan,
+            'RMSE': np.sqrt(np.mean(errors ** 2)) if errors is not None else np.nan,
+            'Error': fold['error'] or '',
+        })
+        if errors is not None:
+            error_rows.extend({'Model': fold['model'], 'Horizon': h + 1, 'Error': e} for h, e in enumerate(errors))
+
+    fold_table = pd.DataFrame(fold_rows)
+    if error_rows:
+        errors = pd.DataFrame(error_rows)
+        grouped = errors.groupby(['Model', 'Horizon'])['Error']
+        horizon_table = pd.DataFrame({
+            'MAE': grouped.apply(lambda e: e.abs().mean()),
+            'RMSE': grouped.apply(lambda e: np.sqrt((e ** 2).mean())),
+            'Bias': grouped.mean(),
+            'Folds': grouped.size(),
+        }).reset_index()
+    else:
+        horizon_table = pd.DataFrame(columns=['Model', 'Horizon', 'MAE', 'RMSE', 'Bias', 'Folds'])
+    return fold_table, horizon_table
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest of the dashboard's forecasting models")
+    parser.add_argument('--data', default=DATA_FILE, help="input CSV (default: %(default)s)")
+    parser.add_argument('--dish', default=ALL_ORDERS, help="series to backtest (default: %(default)s)")
+    parser.add_argument('--agg', default="Daily", choices=list(AGG_FREQS), help="aggregation level (default: %(default)s)")
+    parser.add_argument('--models', nargs='+', default=list(MODEL_SPECS) + list(BASELINE_MODELS),
+                        choices=list(MODEL_SPECS) + list(BASELINE_MODELS),
+                        help="models to compare (default: all, NumPy baselines included)")
+    parser.add_argument('--horizon', type=int, default=HORIZON, help="steps scored per fold (default: %(default)s)")
+    parser.add_argument('--origins', type=int, default=N_ORIGINS, help="number of forecast origins (default: %(default)s)")
+    parser.add_argument('--min-train', type=int, default=MIN_TRAIN, help="observations before the first origin (default: %(default)s)")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--folds-output', default=FOLDS_OUTPUT_FILE, help="per-fold CSV (default: %(default)s)")
+    parser.add_argument('--horizon-output', default=HORIZON_OUTPUT_FILE, help="per-horizon CSV (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    cube = OrderCube.from_frame(load_restaurant_data(args.data))
+    series = cube.aggregate(args.dish, args.agg)['Count']
+
+    started = time.perf_counter()
+    fold_table, horizon_table = run_backtest(series, args.models, args.horizon, args.origins, args.min_train, args.workers,
+                                             SEASON_LENGTHS[args.agg])
+    elapsed = time.perf_counter() - started
+
+    fold_table.to_csv(args.folds_output, index=False, date_format='%Y-%m-%d')
+    horizon_table.to_csv(args.horizon_output, index=False)
+
+    print(f"Backtest of {args.dish} ({args.agg}): {len(fold_table)} folds in {elapsed:.1f}s wall, "
+          f"{fold_table['Fit_Seconds'].sum():.1f}s total fit time")
+    for name, folds in fold_table.groupby('Model'):
+        failed = (folds['Error'] != '').sum()
+        label = describe_spec(MODEL_SPECS[name]) if name in MODEL_SPECS else "NumPy baseline"
+        print(f"  {name} [{label}]: mean RMSE {folds['RMSE'].mean():.3f}, "
+              f"mean fit {folds['Fit_Seconds'].mean():.3f}s, {failed} failed fold(s)")
+    print(horizon_table.pivot(index='Horizon', columns='Model', values='RMSE').round(3).to_string())
+    print(f"Saved {args.folds_output} and {args.horizon_output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import functools
+
+import numpy as np
+import pandas as pd
+
+# NumPy-native baseline forecasters
+# Every method takes a (series x observations) history matrix and returns a
+# (series x steps) forecast matrix, so the whole dish x day matrix is
+# forecast in one call. Seasonal naive repeats the last season, the seasonal
+# average repeats the mean of the last few seasons (the weekly profile for
+# daily data), and additive Holt-Winters runs with fixed smoothing constants.
+# Holt-Winters is linear in the observations, so its forecast is the history
+# times a (observations x steps) weight matrix; the weights come from one
+# backward pass over the 2 + season state dimensions and are cached per
+# history length, after which a forecast is a single matrix product.
+
+BASELINE_MODELS = {
+    "Seasonal Naive": 'seasonal_naive',
+    "Weekly Profile MA": 'seasonal_average',
+    "Holt-Winters": 'holt_winters',
+}
+
+# Season length per aggregation level; shorter histories fall back to no season
+SEASON_LENGTHS = {"Daily": 7, "Weekly": 52, "Monthly": 12}
+PROFILE_CYCLES = 4
+
+HW_ALPHA = 0.2
+HW_BETA = 0.01
+HW_GAMMA = 0.1
+
+
+def _history(history):
+    history = np.atleast_2d(np.asarray(history, dtype='float64'))
+    if history.shape[1] == 0:
+        raise ValueError("cannot forecast from an empty history")
+    return history
+
+
+def season_for(n_obs, season):
+    """``season`` if the history holds two full seasons, else 1 (no seasonality)."""
+    return season if season > 1 and n_obs >= 2 * season else 1
+
+
+def seasonal_naive(history, steps, season=7):
+    """Each step repeats the value one season earlier (the last value when season is 1)."""
+    history = _history(history)
+    n_obs = history.shape[1]
+    season = min(season, n_obs)
+    return history[:, n_obs - season + np.arange(steps) % season]
+
+
+def seasonal_average(history, steps, season=7, cycles=PROFILE_CYCLES):
+    """Each step is the mean of the same position over the last ``cycles`` seasons."""
+    history = _history(history)
+    n_obs = history.shape[1]
+    season = min(season, n_obs)
+    cycles = max(1, min(cycles, n_obs // season))
+    profile = history[:, n_obs - cycles * season:].reshape(len(history), cycles, season).mean(axis=1)
+    return profile[:, np.arange(steps) % season]
+
+
+def _holt_winters_system(season, alpha, beta, gamma):
+    """Additive Holt-Winters as x_t = F x_{t-1} + g y_t over x = [level, trend, s_t, ..., s_{t-season+1}]."""
+    k = season + 2
+    F = np.zeros((k, k))
+    g = np.zeros(k)
+    oldest = k - 1
+    # l_t = alpha (y_t - s_{t-m}) + (1 - alpha)(l + b)
+    F[0, [0, 1]] = 1 - alpha
+    F[0, oldest] -= alpha
+    g[0] = alpha
+    # b_t = beta (l_t - l) + (1 - beta) b
+    F[1] = beta * F[0]
+    F[1, 0] -= beta
+    F[1, 1] += 1 - beta
+    g[1] = beta * alpha
+    # s_t = gamma (y_t - l - b) + (1 - gamma) s_{t-m}, then the older seasonals shift down
+    F[2, [0, 1]] = -gamma
+    F[2, oldest] += 1 - gamma
+    g[2] = gamma
+    F[np.arange(3, k), np.arange(2, k - 1)] = 1
+    return F, g
+
+
+@functools.lru_cache(maxsize=64)
+def holt_winters_weights(n_obs, steps, season=7, alpha=HW_ALPHA, beta=HW_BETA, gamma=HW_GAMMA):
+    """(n_obs, steps) matrix W such that the Holt-Winters forecast of ``y`` is ``y @ W``.
+
+    The state starts from the first two seasons (level = first season's mean,
+    trend = difference of the two seasons' means per step, seasonals =
+    first season minus level) and is filtered from the second season on.
+    """
+    if season == 1:
+        gamma = 0.0  # plain Holt: the seasonal slot stays at zero
+    F, g = _holt_winters_system(season, alpha, beta, gamma)
+    k = season + 2
+
+    # Forecast h reads level + h * trend + the seasonal from h steps ahead, one season back
+    horizons = np.arange(1, steps + 1)
+    H = np.zeros((steps, k))
+    H[:, 0] = 1
+    H[:, 1] = horizons
+    H[np.arange(steps), 2 + season - 1 - (horizons - 1) % season] = 1
+
+    # Initial state (at t = season - 1) as a linear map of the first two seasons
+    init = np.zeros((k, 2 * season))
+    init[0, :season] = 1 / season
+    init[1, :season] = -1 / season ** 2
+    init[1, season:] = 1 / season ** 2
+    init[2:, :season] = np.eye(season)[::-1] - init[0, :season]
+
+    weights = np.zeros((steps, n_obs))
+    R = H
+    for t in range(n_obs - 1, season - 1, -1):
+        weights[:, t] = R @ g
+        R = R @ F
+    weights[:, :2 * season] += R @ init
+    return weights.T
+
+
+def holt_winters(history, steps, season=7, alpha=HW_ALPHA, beta=HW_BETA, gamma=HW_GAMMA):
+    """Additive Holt-Winters forecasts for every row of ``history``, as one matrix product."""
+    history = _history(history)
+    n_obs = history.shape[1]
+    if n_obs < 2:
+        return seasonal_naive(history, steps, 1)
+    return history @ holt_winters_weights(n_obs, steps, season_for(n_obs, season), alpha, beta, gamma)
+
+
+METHODS = {'seasonal_naive': seasonal_naive, 'seasonal_average': seasonal_average, 'holt_winters': holt_winters}
+
+
+def forecast_matrix(model_name, history, steps, season=7):
+    """Forecast every row of ``history`` with the BASELINE_MODELS entry ``model_name``."""
+    history = _history(history)
+    return METHODS[BASELINE_MODELS[model_name]](history, steps, season_for(history.shape[1], season))
+
+
+def future_index(index, steps):
+    """The ``steps`` dates following a regular DatetimeIndex."""
+    freq = index.freq or pd.infer_freq(index)
+    return pd.date_range(index[-1], periods=steps + 1, freq=freq, name=index.name)[1:]
+
+
+class BaselineResult:
+    """Stands in for a fitted statsmodels result: forecast(steps) returns a date-indexed Series."""
+
+    def __init__(self, model_name, series, season=7):
+        self.model_name = model_name
+        self.series = series
+        self.season = season
+
+    def forecast(self, steps):
+        values = forecast_matrix(self.model_name, self.series.to_numpy(dtype='float64'), steps, self.season)[0]
+        return pd.Series(values, index=future_index(self.series.index, steps), name='predicted_mean')
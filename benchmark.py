@@ -0,0 +1,237 @@
+import argparse
+import importlib.util
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+import warnings
+from datetime import datetime
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+import generate_restaurant_data
+from baselines import BASELINE_MODELS, forecast_matrix
+from analytics_engine import AnalyticsEngine
+from data_loader import cache_dir_for, load_restaurant_data
+from forecasting import MODEL_SPECS, fit_model
+from order_cube import ALL_ORDERS, OrderCube
+from order_store import OrderStore, import_csv
+
+# Benchmark suite for the load -> aggregate -> forecast -> render pipeline
+# Datasets are generated at multiples of the bundled restaurant_data.csv
+# (one store for a year); scale N simulates N stores over the same year, so
+# row counts grow N-fold while the calendar stays fixed. Results are written
+# as JSON and can be compared against a stored baseline run.
+
+SCALES = [1, 10, 100]
+REPEATS = 5
+SEED = 42
+DATA_DIR = 'bench_data'
+OUTPUT_FILE = 'benchmark_results.json'
+
+# A benchmark regresses when its median is this much slower than the baseline
+# (relative) and the absolute slowdown is above the noise floor (seconds).
+TOLERANCE = 0.25
+NOISE_FLOOR = 0.002
+
+
+def dataset_path(scale, data_dir=DATA_DIR):
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f'restaurant_data_{scale}x.csv')
+    if not os.path.exists(path):
+        generate_restaurant_data.generate_data(path, stores=scale, seed=SEED)
+    return path
+
+
+def timed(fn, repeats=REPEATS):
+    """Run ``fn`` ``repeats`` times; return (timing summary, last return value)."""
+    samples = []
+    value = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        value = fn()
+        samples.append(time.perf_counter() - started)
+    summary = {'median': statistics.median(samples), 'min': min(samples), 'max': max(samples), 'repeats': repeats}
+    return summary, value
+
+
+def engine_for(orders):
+    """An AnalyticsEngine over already loaded ``orders``; the dashboard's get_aggregated_data forwards to its aggregate()."""
+    engine = AnalyticsEngine(order_cache_path=None)
+    engine.orders = orders
+    return engine
+
+
+def render_figure(series, forecast):
+    # Mirrors update_plot: markers on every point, forecast overlay, full layout pass
+    fig, ax = plt.subplots(figsize=(10, 6), dpi=100)
+    ax.plot(series.index, series.values, marker='o', linestyle='-', markersize=5, label="Historical")
+    ax.plot(forecast.index, forecast.values, marker='o', linestyle='-', markersize=5, linewidth=2, label="Forecast")
+    ax.set_title("Benchmark render", fontsize=14, fontweight='bold')
+    ax.grid(True, linestyle='--', alpha=0.6)
+    ax.legend()
+    fig.autofmt_xdate()
+    fig.tight_layout()
+    fig.canvas.draw()
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png')
+    plt.close(fig)
+
+
+def run_scale(scale, repeats=REPEATS, data_dir=DATA_DIR):
+    path = dataset_path(scale, data_dir)
+    results = {'rows': None}
+
+    # 1. Load: full CSV parse, then the columnar cache path
+    results['csv_load_parse'], df = timed(lambda: load_restaurant_data(path, use_cache=False), repeats)
+    results['rows'] = len(df)
+    shutil.rmtree(cache_dir_for(path), ignore_errors=True)
+    load_restaurant_data(path)  # writes a fresh cache
+    results['csv_load_cached'], df = timed(lambda: load_restaurant_data(path), repeats)
+
+    # 2. Aggregation: cube build once, then the dashboard's get_aggregated_data (engine.aggregate) per level
+    results['cube_build'], cube = timed(lambda: OrderCube.from_frame(df), repeats)
+    dish = cube.dishes[0] if cube.dishes else ALL_ORDERS
+    engine = engine_for(cube)
+    for agg_level in ("Daily", "Weekly", "Monthly"):
+        for label, selection in (("all", ALL_ORDERS), ("dish", dish)):
+            results[f'get_aggregated_data_{agg_level.lower()}_{label}'], _ = timed(
+                lambda: engine.aggregate(selection, agg_level), repeats)
+    results['get_aggregated_data_month_drilldown'], _ = timed(
+        lambda: engine.aggregate(ALL_ORDERS, "Daily", month=6), repeats)
+
+    # 2b. The same views served by indexed queries on the SQLite store (imported once)
+    store_path = os.path.splitext(path)[0] + '.sqlite'
+    results['store_import'], _ = timed(lambda: import_csv(path, store_path, rebuild=True), 1)
+    store = OrderStore(store_path)
+    engine = engine_for(store)
+    for label, selection in (("all", ALL_ORDERS), ("dish", dish)):
+        results[f'store_get_aggregated_data_daily_{label}'], _ = timed(
+            lambda: engine.aggregate(selection, "Daily"), repeats)
+    results['store_get_aggregated_data_month_drilldown'], _ = timed(
+        lambda: engine.aggregate(ALL_ORDERS, "Daily", month=6), repeats)
+    store.close()
+
+    # 3. Forecasting on the daily All Orders series
+    series = cube.aggregate(ALL_ORDERS, "Daily")['Count']
+    forecast = None
+    for spec in MODEL_SPECS.values():
+        key = spec['kind']
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            results[f'{key}_fit'], fitted = timed(lambda: fit_model(series, spec), repeats)
+        results[f'{key}_forecast'], forecast = timed(lambda: fitted.forecast(steps=30), repeats)
+    # NumPy baselines forecast every cube row (All Orders + each dish) in one call
+    for name, method in BASELINE_MODELS.items():
+        results[f'baseline_{method}_all_rows'], _ = timed(lambda: forecast_matrix(name, cube.counts, 30), repeats)
+
+    # 4. Rendering with the Agg backend
+    results['render_agg'], _ = timed(lambda: render_figure(series, forecast), repeats)
+    return results
+
+
+def run_startup(repeats=REPEATS):
+    """Dashboard cold start: module import time in a fresh interpreter, before the window can open."""
+    code = "import time; t = time.perf_counter(); import dashboard_app; print(time.perf_counter() - t)"
+    here = os.path.dirname(os.path.abspath(__file__))
+    imports, totals = [], []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        out = subprocess.run([sys.executable, '-c', code], cwd=here, capture_output=True, text=True, check=True)
+        totals.append(time.perf_counter() - started)
+        imports.append(float(out.stdout.strip().splitlines()[-1]))
+    summary = lambda samples: {'median': statistics.median(samples), 'min': min(samples), 'max': max(samples),
+                               'repeats': repeats}
+    return {'dashboard_import': summary(imports), 'dashboard_import_process': summary(totals)}
+
+
+def compare(current, baseline, tolerance=TOLERANCE, noise_floor=NOISE_FLOOR):
+    """Return a list of (scale, benchmark, baseline, current, ratio, regressed) rows."""
+    rows = []
+    for scale, benches in current['results'].items():
+        base_benches = baseline.get('results', {}).get(scale, {})
+        for name, timing in benches.items():
+            base = base_benches.get(name)
+            if not isinstance(timing, dict) or not isinstance(base, dict):
+                continue
+            ratio = timing['median'] / base['median'] if base['median'] > 0 else float('inf')
+            regressed = (timing['median'] > base['median'] * (1 + tolerance)
+                         and timing['median'] - base['median'] > noise_floor)
+            rows.append((scale, name, base['median'], timing['median'], ratio, regressed))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark load, aggregation, forecasting and rendering")
+    parser.add_argument('--scales', type=int, nargs='+', default=SCALES,
+                        help="dataset sizes as multiples of restaurant_data.csv (default: %(default)s)")
+    parser.add_argument('--repeats', type=int, default=REPEATS, help="timed runs per benchmark (default: %(default)s)")
+    parser.add_argument('--data-dir', default=DATA_DIR, help="where generated datasets are kept (default: %(default)s)")
+    parser.add_argument('--output', default=OUTPUT_FILE, help="results JSON (default: %(default)s)")
+    parser.add_argument('--baseline', default=None, help="results JSON to compare against; exit 1 on regressions")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE,
+                        help="allowed relative slowdown vs the baseline (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'matplotlib': matplotlib.__version__,
+            'repeats': args.repeats,
+            'seed': SEED,
+        },
+        'results': {},
+    }
+    if importlib.util.find_spec('tkinter') is None:
+        # Headless images without Tk still run every other benchmark
+        print("Skipping dashboard start-up: tkinter is not available.")
+    else:
+        print("Benchmarking dashboard start-up...")
+        report['results']['startup'] = run_startup(args.repeats)
+        for name, timing in report['results']['startup'].items():
+            print(f"  {name:<40} {timing['median'] * 1000:10.2f} ms (min {timing['min'] * 1000:.2f})")
+    for scale in args.scales:
+        print(f"Benchmarking {scale}x...")
+        results = run_scale(scale, args.repeats, args.data_dir)
+        report['results'][f'{scale}x'] = results
+        for name, timing in results.items():
+            if isinstance(timing, dict):
+                print(f"  {name:<40} {timing['median'] * 1000:10.2f} ms (min {timing['min'] * 1000:.2f})")
+            else:
+                print(f"  {name:<40} {timing}")
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        rows = compare(report, baseline, args.tolerance)
+        regressions = [row for row in rows if row[5]]
+        print(f"\nComparison with {args.baseline} (tolerance {args.tolerance:.0%}):")
+        for scale, name, base, cur, ratio, regressed in rows:
+            flag = "REGRESSION" if regressed else ""
+            print(f"  {scale:>5} {name:<40} {base * 1000:10.2f} -> {cur * 1000:10.2f} ms  x{ratio:5.2f} {flag}")
+        if regressions:
+            print(f"{len(regressions)} regression(s) found.")
+            sys.exit(1)
+        print("No regressions.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_loader import DATA_FILE, CsvTail, open_restaurant_data
+
+# Compact, normalized form of restaurant_data.csv
+# The CSV has one row per ingredient per order, so Date, Order_ID, Dish_Name
+# and Unit repeat on every row and Quantity_Used is just the dish's recipe.
+# CompactOrders keeps:
+#   - an orders table: one (day offset, order id, dish code, servings) row per
+#     order and dish, in fixed-width integer arrays sorted by day and order
+#     (Order_IDs are random per day, so the same ID can carry a dish twice);
+#   - the recipe matrix (dish x ingredient quantities), checked against the rows;
+#   - Stock_Available as an end-of-day stock array per ingredient.
+# Order counts and ingredient usage are then bincounts and a matrix product.
+# The structure is cached as '<csv>.compact.npz' and rebuilt when the CSV changes.
+
+COMPACT_VERSION = 1
+
+
+def compact_path_for(csv_path):
+    return csv_path + '.compact.npz'
+
+
+def _codes(values, sort=True):
+    """Integer codes and names for a column; categorical columns reuse their codes."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        cat = values.cat.remove_unused_categories().cat
+        categories = np.asarray(cat.categories, dtype=str)
+        codes = np.asarray(cat.codes, dtype=np.int64)
+        if not sort:
+            return codes, categories
+        # Rank categories by name so code order is name order
+        order = np.argsort(categories, kind='stable')
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+        return rank[codes], categories[order]
+    codes, names = pd.factorize(values, sort=sort)
+    return codes.astype(np.int64), np.asarray(names, dtype=str)
+
+
+class CompactOrders:
+    """Orders table + recipe matrix + per-ingredient end-of-day stock.
+
+    ``day``, ``order``, ``dish`` and ``servings`` are parallel arrays
+    (int32/int32/int16/int16), one entry per distinct (day, order, dish), sorted
+    by day then order; ``servings`` is how many times that dish's recipe
+    appears under the order. Order ids are ranks of the Order_ID strings, so
+    they sort the way the strings do.
+    ``recipe[d, i]`` is the quantity of ingredient i used by one order of dish d,
+    and ``stock[t, i]`` the last Stock_Available of ingredient i on day t (by
+    Order_ID order), NaN on days it was not used.
+    """
+
+    def __init__(self, start, n_days, dishes, ingredients, units, day, order, dish, servings, recipe, stock,
+                 last_day_orders):
+        self.start = np.datetime64(start, 'D')
+        self.n_days = int(n_days)
+        self.dishes = list(dishes)
+        self.ingredients = list(ingredients)
+        self.units = list(units)
+        self.day = np.asarray(day, dtype=np.int32)
+        self.order = np.asarray(order, dtype=np.int32)
+        self.dish = np.asarray(dish, dtype=np.int16)
+        self.servings = np.asarray(servings, dtype=np.int16)
+        self.recipe = np.asarray(recipe, dtype=np.float64)
+        self.stock = np.asarray(stock, dtype=np.float64)
+        # Order_ID strings of the newest day's orders table entries, so appended
+        # rows for those orders aren't counted twice
+        self.last_day_orders = np.asarray(last_day_orders, dtype=str)
+
+    @classmethod
+    def from_frame(cls, df):
+        """Build from the long order/ingredient table.
+
+        Raises ValueError if the rows don't follow one fixed recipe per dish
+        (the quantities could not be rebuilt from the recipe matrix then).
+        """
+        if len(df) == 0:
+            raise ValueError("no rows to build the compact model from")
+
+        days = df['Date'].values.astype('datetime64[D]')
+        start = days.min()
+        day = (days - start).astype(np.int64)
+        n_days = int(day.max()) + 1
+        order, order_names = _codes(df['Order_ID'])
+        dish, dishes = _codes(df['Dish_Name'])
+        ingredient, ingredients = _codes(df['Ingredient_Name'])
+        quantity = df['Quantity_Used'].to_numpy(dtype='float64')
+        n_orders, n_dishes, n_ingredients = len(order_names), len(dishes), len(ingredients)
+
+        # 1. Orders table: distinct (day, order, dish), sorted
+        key = (day * n_orders + order) * n_dishes + dish
+        keys, key_of_row, rows_per_key = np.unique(key, return_inverse=True, return_counts=True)
+        key_dish = keys % n_dishes
+        key_order = (keys // n_dishes) % n_orders
+        key_day = keys // (n_dishes * n_orders)
+
+        # 2. Recipe matrix, and a check that every (order, dish) is a whole number of that recipe
+        recipe = np.zeros((n_dishes, n_ingredients))
+        recipe[dish, ingredient] = quantity
+        recipe_len = np.count_nonzero(recipe, axis=1)
+        servings = rows_per_key // np.maximum(recipe_len[key_dish], 1)
+        items, item_rows = np.unique(key_of_row.astype(np.int64) * n_ingredients + ingredient, return_counts=True)
+        if (not np.allclose(recipe[dish, ingredient], quantity)
+                or len(items) != recipe_len[key_dish].sum()
+                or not np.array_equal(item_rows, servings[items // n_ingredients])):
+            raise ValueError("rows don't follow a fixed recipe per dish")
+
+        # 3. Stock: last value per (day, ingredient) in (Date, Order_ID) order, rows kept stable
+        by_order = np.lexsort((order, day))
+        cell = (day * n_ingredients + ingredient)[by_order]
+        cells, first_from_end = np.unique(cell[::-1], return_index=True)
+        last_rows = by_order[len(cell) - 1 - first_from_end]
+        stock = np.full(n_days * n_ingredients, np.nan)
+        stock[cells] = df['Stock_Available'].to_numpy(dtype='float64')[last_rows]
+
+        first_rows = np.unique(ingredient, return_index=True)[1]
+        units = [str(unit) for unit in np.asarray(df['Unit'])[first_rows]]
+        last_day_orders = order_names[key_order[key_day == n_days - 1]]
+        return cls(start, n_days, dishes, ingredients, units, key_day, key_order, key_dish, servings,
+                   recipe, stock.reshape(n_days, n_ingredients), last_day_orders)
+
+    # --- Persistence ---
+
+    def save(self, path, **meta):
+        """Write the arrays (plus ``meta`` values such as the CSV signature) to an .npz file."""
+        tmp = path + f'.tmp-{os.getpid()}.npz'
+        np.savez(tmp, version=COMPACT_VERSION, start=self.start, n_days=self.n_days,
+                 dishes=np.asarray(self.dishes, dtype=str), ingredients=np.asarray(self.ingredients, dtype=str),
+                 units=np.asarray(self.units, dtype=str), day=self.day, order=self.order, dish=self.dish,
+                 servings=self.servings,
+                 recipe=self.recipe, stock=self.stock, last_day_orders=self.last_day_orders,
+                 **{f'meta_{k}': v for k, v in meta.items()})
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        """Return (CompactOrders, meta dict), or (None, None) if missing or from another version."""
+        try:
+            with np.load(path) as data:
+                if int(data['version']) != COMPACT_VERSION:
+                    return None, None
+                compact = cls(data['start'], data['n_days'], data['dishes'].tolist(), data['ingredients'].tolist(),
+                              data['units'].tolist(), data['day'], data['order'], data['dish'], data['servings'],
+                              data['recipe'], data['stock'], data['last_day_orders'])
+                meta = {k[5:]: data[k].item() for k in data.files if k.startswith('meta_')}
+        except (OSError, ValueError, KeyError):
+            return None, None
+        return compact, meta
+
+    # --- Aggregates ---
+
+    @property
+    def dates(self):
+        return (self.start + np.arange(self.n_days).astype('timedelta64[D]')).astype('datetime64[ns]')
+
+    def nbytes(self):
+        arrays = (self.day, self.order, self.dish, self.servings, self.recipe, self.stock, self.last_day_orders)
+        return sum(a.nbytes for a in arrays)
+
+    def dish_day_counts(self):
+        """(n_dishes, n_days) distinct orders per dish per day."""
+        flat = self.dish.astype(np.int64) * self.n_days + self.day
+        return np.bincount(flat, minlength=len(self.dishes) * self.n_days).reshape(len(self.dishes), self.n_days)
+
+    def day_counts(self):
+        """Distinct orders per day across all dishes."""
+        new_order = np.r_[True, (self.day[1:] != self.day[:-1]) | (self.order[1:] != self.order[:-1])]
+        return np.bincount(self.day[new_order], minlength=self.n_days)
+
+    def usage(self):
+        """(n_days, n_ingredients) ingredient quantities used per day."""
+        flat = self.dish.astype(np.int64) * self.n_days + self.day
+        servings = np.bincount(flat, weights=self.servings, minlength=len(self.dishes) * self.n_days)
+        return servings.reshape(len(self.dishes), self.n_days).T @ self.recipe
+
+    def daily_orders(self):
+        """Same frame as model_and_plot.build_aggregates' daily_orders."""
+        counts = self.day_counts()
+        active = counts > 0
+        series = pd.Series(counts[active], index=pd.DatetimeIndex(self.dates[active], name='Date'), name='Order_Count')
+        return series.to_frame().asfreq('D').fillna(0)
+
+    def ingredient_usage(self):
+        """Long (Date, Ingredient_Name, Quantity_Used) frame for the days each ingredient was used."""
+        used = ~np.isnan(self.stock)
+        t, i = np.nonzero(used)
+        return pd.DataFrame({'Date': self.dates[t],
+                             'Ingredient_Name': np.asarray(self.ingredients, dtype=object)[i],
+                             'Quantity_Used': self.usage()[t, i]})
+
+    def daily_stock(self):
+        """End-of-day stock per ingredient (Date x Ingredient_Name), days with orders only."""
+        active = ~np.isnan(self.stock).all(axis=1)
+        frame = pd.DataFrame(self.stock[active], index=pd.DatetimeIndex(self.dates[active], name='Date'),
+                             columns=pd.Index(self.ingredients, name='Ingredient_Name'))
+        return frame.dropna(axis=1, how='all')
+
+
+def load_compact_data(csv_path=DATA_FILE):
+    """Return (CompactOrders, CsvTail) for the CSV, from the .npz cache when it is current.
+
+    Otherwise the table is loaded through data_loader (itself cached and
+    append-aware), compacted and the cache rewritten.
+    """
+    st = os.stat(csv_path)
+    path = compact_path_for(csv_path)
+    compact, meta = CompactOrders.load(path)
+    if compact is not None and meta.get('size') == st.st_size and meta.get('mtime_ns') == st.st_mtime_ns:
+        return compact, CsvTail(csv_path, int(meta['offset']))
+
+    df, tail = open_restaurant_data(csv_path)
+    compact = CompactOrders.from_frame(df)
+    try:
+        compact.save(path, size=st.st_size, mtime_ns=st.st_mtime_ns, offset=tail.offset)
+    except OSError as e:
+        print(f"Could not write compact data cache {path}: {e}")
+    return compact, tail
@@ -1,18 +1,58 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import datetime
-import matplotlib.dates as mdates
+import sqlite3
 import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+
+from analytics_engine import (DETAIL_STEPS, AnalyticsEngine, forecast_steps, load_orders, model_label, month_forecast,
+                              month_summary)
+from baselines import BASELINE_MODELS
+from data_loader import SourceChangedError
+from downsampling import downsample
+from forecasting import DEFAULT_MODEL, HAS_STATSMODELS, MODEL_SPECS, process_pool
+from order_cube import ALL_ORDERS
+from order_search import AUTO_MODEL
+from profiling import PROFILER
+
+# How often to look for rows appended to the CSV (ms)
+REFRESH_INTERVAL_MS = 5000
+# Clicks farther than this from every point are ignored
+CLICK_TOLERANCE_NS = 7 * 24 * 3600 * 10**9
+# Where "Export Profile" writes the recorded spans (profiling enabled via HOSPYRA_PROFILE=1)
+PROFILE_OUTPUT_FILE = 'dashboard_profile.trace.json'
+# How often to check on the start-up data load (ms)
+LOAD_POLL_MS = 50
+
+# Start-up: the window opens before matplotlib is imported or the data is read.
+# Both happen on a worker thread; the plot and controls come alive when it is
+# done. statsmodels is only imported by the first ARIMA fit (see forecasting.py).
+
+
+def import_plotting():
+    """Import the matplotlib modules the plot needs (run on the loader thread)."""
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+    from matplotlib.figure import Figure
+    import matplotlib.dates  # noqa: F401  (preloaded here so the first date axis doesn't import it on the Tk thread)
+    return Figure, FigureCanvasTkAgg
+
+
+def time_keys(index):
+    """A DatetimeIndex as sorted int64 nanoseconds, for nearest_point lookups."""
+    return np.asarray(index, dtype='datetime64[ns]').view('int64')
+
+
+def nearest_point(keys, x, tolerance=CLICK_TOLERANCE_NS):
+    """Position of the key closest to ``x`` (ties go left), or None if it is ``tolerance`` or farther away."""
+    n = len(keys)
+    if n == 0:
+        return None
+    i = int(np.searchsorted(keys, x))
+    if i == n or (i > 0 and x - keys[i - 1] <= keys[i] - x):
+        i -= 1
+    return i if abs(int(keys[i]) - x) < tolerance else None
 
-try:
-    from statsmodels.tsa.arima.model import ARIMA
-    from statsmodels.tsa.statespace.sarimax import SARIMAX
-    HAS_STATSMODELS = True
-except ImportError:
-    HAS_STATSMODELS = False
 
 class RestaurantDashboard:
     def __init__(self, root):
@@ -23,25 +63,77 @@ class RestaurantDashboard:
         # Configuration
         self.colors = {'hist': '#1f77b4', 'forecast': '#ff7f0e', 'bg': '#f0f0f0'}
         
-        # Load data
-        try:
-            self.df = pd.read_csv('restaurant_data.csv')
-            self.df['Date'] = pd.to_datetime(self.df['Date'])
-        except FileNotFoundError:
-            messagebox.showerror("Error", "restaurant_data.csv not found! Please run generate_restaurant_data.py first.")
-            self.root.destroy()
-            return
-
+        PROFILER.begin_interaction('startup')
+        # Order counts, fitted models and "Auto" orders; the data is loaded in the background.
+        # Every view is a slice of an order cube, or an indexed query with HOSPYRA_STORE set.
+        self.engine = AnalyticsEngine()
         self.current_month = None
         self.current_series = None
         self.current_forecast = None
+        # Sorted int64 timestamps of the plotted points, so clicks are a binary search
+        self.series_keys = time_keys([])
+        self.forecast_keys = None
+        self.showing_forecast_detail = False
+
+        # The engine's fitted models are shared by the year view and the forecast drill-down;
+        # the "Auto" order search pool starts on first use
+        self.order_search_pool = None
+
+        # Fits run off the Tk thread; only the newest request may touch the plot
+        self.fit_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="model-fit")
+        self.pending_fit = None
+        self.fit_token = 0
+        # Full reload of a rewritten CSV, also run off the Tk thread
+        self.reloading = None
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         
-        # Setup UI
+        # Setup UI (controls stay disabled until the data is in)
         self.setup_ui()
-        
+
+        # Load data
+        self.loading = self.fit_executor.submit(self.load_in_background)
+        self.root.after(LOAD_POLL_MS, self._poll_load)
+
+    def load_in_background(self):
+        """Worker-thread part of start-up: plotting imports and the data load. No Tk calls."""
+        with PROFILER.span('import plotting'):
+            plotting = import_plotting()
+        return plotting, self.engine.load()
+
+    def _poll_load(self):
+        if not self.loading.done():
+            self.root.after(LOAD_POLL_MS, self._poll_load)
+            return
+        self._stop_progress()
+        try:
+            (Figure, FigureCanvasTkAgg), _ = self.loading.result()
+        except FileNotFoundError as e:
+            # The order store raises with its own message (and no filename)
+            message = str(e) if e.filename is None else \
+                "restaurant_data.csv not found! Please run generate_restaurant_data.py first."
+            messagebox.showerror("Error", message)
+            self.on_close()
+            return
+        except Exception as e:
+            # Anything else (e.g. a malformed CSV) must not leave the window stuck on "Loading..."
+            messagebox.showerror("Error", f"Could not load the order data: {type(e).__name__}: {e}")
+            self.loading_label.config(text="Could not load the order data.")
+            self.status_var.set(f"Load failed: {type(e).__name__}: {e}")
+            return
+
+        self.loading_label.destroy()
+        self.setup_plot(Figure, FigureCanvasTkAgg)
+        self.dishes = self.engine.dishes
+        self.dropdown.config(values=self.dishes)
+        for widget in self.data_controls:
+            widget.config(state="readonly" if isinstance(widget, ttk.Combobox) else "normal")
+
         # Initial Plot
         self.update_plot()
 
+        # Pick up rows appended to the CSV while the dashboard is open
+        self.root.after(REFRESH_INTERVAL_MS, self.poll_new_data)
+
     def setup_ui(self):
         # Main Navigation / Control Panel
         control_frame = ttk.Frame(self.root, padding="10")
@@ -52,9 +144,9 @@ class RestaurantDashboard:
         filter_group.pack(side=tk.LEFT, padx=5)
         
         ttk.Label(filter_group, text="Dish:").pack(side=tk.LEFT)
-        self.dishes = ["All Orders"] + sorted(self.df['Dish_Name'].unique().tolist())
+        self.dishes = [ALL_ORDERS]  # the dishes are added once the data is loaded
         self.view_var = tk.StringVar(value=self.dishes[0])
-        self.dropdown = ttk.Combobox(filter_group, textvariable=self.view_var, values=self.dishes, state="readonly", width=20)
+        self.dropdown = ttk.Combobox(filter_group, textvariable=self.view_var, values=self.dishes, state="disabled", width=20)
         self.dropdown.pack(side=tk.LEFT, padx=5)
         self.dropdown.bind("<<ComboboxSelected>>", lambda e: self.update_plot(self.current_month))
 
@@ -64,7 +156,7 @@ class RestaurantDashboard:
         
         self.agg_var = tk.StringVar(value="Daily")
         self.agg_options = ["Daily", "Weekly", "Monthly"]
-        self.agg_dropdown = ttk.Combobox(agg_group, textvariable=self.agg_var, values=self.agg_options, state="readonly", width=10)
+        self.agg_dropdown = ttk.Combobox(agg_group, textvariable=self.agg_var, values=self.agg_options, state="disabled", width=10)
         self.agg_dropdown.pack(side=tk.LEFT, padx=5)
         self.agg_dropdown.bind("<<ComboboxSelected>>", lambda e: self.update_plot(self.current_month))
 
@@ -74,135 +166,311 @@ class RestaurantDashboard:
         
         self.forecast_var = tk.BooleanVar(value=False)
         self.chk_forecast = ttk.Checkbutton(forecast_group, text="Show Forecast", 
-                                          variable=self.forecast_var, command=lambda: self.update_plot(self.current_month))
+                                          variable=self.forecast_var, command=lambda: self.update_plot(self.current_month),
+                                          state="disabled")
         self.chk_forecast.pack(side=tk.LEFT, padx=5)
         
         ttk.Label(forecast_group, text="Model:").pack(side=tk.LEFT, padx=(5, 0))
-        self.model_var = tk.StringVar(value="ARIMA (5,1,0)")
-        self.model_options = ["ARIMA (5,1,0)", "SARIMA (Weekly)"]
+        # NumPy baselines need no fit, so they stay available without statsmodels
+        if HAS_STATSMODELS:
+            self.model_options = list(MODEL_SPECS) + [AUTO_MODEL] + list(BASELINE_MODELS)
+        else:
+            self.model_options = list(BASELINE_MODELS)
+        self.model_var = tk.StringVar(value=DEFAULT_MODEL if HAS_STATSMODELS else self.model_options[0])
         self.model_dropdown = ttk.Combobox(forecast_group, textvariable=self.model_var, 
-                                         values=self.model_options, state="readonly", width=15)
+                                         values=self.model_options, state="disabled", width=15)
         self.model_dropdown.pack(side=tk.LEFT, padx=5)
         self.model_dropdown.bind("<<ComboboxSelected>>", lambda e: self.update_plot(self.current_month))
 
         if not HAS_STATSMODELS:
-            self.chk_forecast.config(state="disabled")
-            self.model_dropdown.config(state="disabled")
-            ttk.Label(forecast_group, text="(Install statsmodels)", foreground="red").pack(side=tk.LEFT)
+            ttk.Label(forecast_group, text="(Install statsmodels for ARIMA)", foreground="red").pack(side=tk.LEFT)
 
         # 4. Global Controls
         btn_group = ttk.Frame(control_frame, padding="5")
         btn_group.pack(side=tk.RIGHT)
         
-        self.btn_reset = ttk.Button(btn_group, text="Reset View", command=self.reset_view)
+        self.btn_reset = ttk.Button(btn_group, text="Reset View", command=self.reset_view, state="disabled")
         self.btn_reset.pack(side=tk.RIGHT, padx=5)
+        self.data_controls = [self.dropdown, self.agg_dropdown, self.chk_forecast, self.model_dropdown, self.btn_reset]
+
+        if PROFILER.enabled:
+            ttk.Button(btn_group, text="Export Profile", command=self.export_profile).pack(side=tk.RIGHT, padx=5)
 
         # Plot Area
         self.plot_frame = ttk.Frame(self.root)
         self.plot_frame.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
-        
-        self.fig, self.ax = plt.subplots(figsize=(10, 6), dpi=100)
+        self.loading_label = ttk.Label(self.plot_frame, text="Loading restaurant data...", anchor=tk.CENTER)
+        self.loading_label.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+
+        # Status Bar (with a progress indicator for background model fits)
+        status_frame = ttk.Frame(self.root, relief=tk.SUNKEN)
+        status_frame.pack(side=tk.BOTTOM, fill=tk.X)
+        self.status_var = tk.StringVar(value="Loading restaurant data...")
+        status_bar = ttk.Label(status_frame, textvariable=self.status_var, anchor=tk.W)
+        status_bar.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.progress = ttk.Progressbar(status_frame, mode='indeterminate', length=120)
+        self.progress.pack(side=tk.RIGHT, padx=5)
+        self.progress.start(10)
+
+    def setup_plot(self, Figure, FigureCanvasTkAgg):
+        """Create the figure once matplotlib has been imported by the loader thread."""
+        self.fig = Figure(figsize=(10, 6), dpi=100)
+        self.ax = self.fig.subplots()
         self.canvas = FigureCanvasTkAgg(self.fig, master=self.plot_frame)
         self.canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+        self.setup_artists()
         
         # Connect interactive events
         self.fig.canvas.mpl_connect('button_press_event', self.on_click)
 
-        # Status Bar
-        self.status_var = tk.StringVar(value="Tip: Click any data point for detailed analytics.")
-        status_bar = ttk.Label(self.root, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W)
-        status_bar.pack(side=tk.BOTTOM, fill=tk.X)
+    def poll_new_data(self):
+        """Fold rows appended to the CSV into the order cube and refresh the current view."""
+        try:
+            if self.reloading is not None:
+                changed, new_dishes = self._finish_reload()
+            else:
+                try:
+                    changed, new_dishes = self.engine.refresh(reload=False)
+                except SourceChangedError:
+                    # The CSV was rewritten (e.g. regenerated): load it again on a worker
+                    # thread and keep showing the old data until it is in
+                    self.reloading = self.fit_executor.submit(load_orders, self.engine.csv_path,
+                                                              self.engine.store_path)
+                    self.status_var.set("Reloading restaurant data...")
+                    changed = False
+                except (OSError, ValueError, sqlite3.Error) as e:
+                    print(f"Data refresh error: {e}")
+                    changed = False
+
+            if changed:
+                if new_dishes:
+                    self.dishes = self.engine.dishes
+                    self.dropdown.config(values=self.dishes)
+                    if self.view_var.get() not in self.dishes:
+                        self.view_var.set(ALL_ORDERS)
+                # Leave a forecast drill-down alone; it returns to live data on the next view change
+                if not self.showing_forecast_detail:
+                    self.update_plot(self.current_month)
+        finally:
+            self.root.after(LOAD_POLL_MS if self.reloading is not None else REFRESH_INTERVAL_MS, self.poll_new_data)
+
+    def _finish_reload(self):
+        """Swap in a finished background reload. Returns (changed, dishes) like engine.refresh()."""
+        if not self.reloading.done():
+            return False, []
+        reloading, self.reloading = self.reloading, None
+        try:
+            self.engine.swap(*reloading.result())
+        except Exception as e:
+            print(f"Data reload error: {e}")
+            self.status_var.set(f"Could not reload the order data: {e}")
+            return False, []
+        self.status_var.set("Reloaded restaurant data.")
+        return True, self.engine.dishes
 
     def get_aggregated_data(self, month=None):
         selection = self.view_var.get()
         agg_level = self.agg_var.get()
-        data = self.df
-        
-        if selection != "All Orders":
-            data = data[data['Dish_Name'] == selection]
-            
-        if month:
-            data = data[data['Date'].dt.month == month]
-            
-        # Base daily aggregation
-        daily = data.groupby('Date')['Order_ID'].nunique().reset_index()
-        daily.columns = ['Date', 'Count']
-        daily = daily.set_index('Date').asfreq('D').fillna(0)
-        
-        # Resample based on aggregation level
-        if agg_level == "Weekly":
-            resampled = daily.resample('W').sum()
-        elif agg_level == "Monthly":
-            resampled = daily.resample('M').sum()
-        else:
-            resampled = daily
-            
-        return resampled
+        return self.engine.aggregate(selection, agg_level, month)
+
+    def request_fit(self, series_data, on_done, on_error):
+        """Get fitted results for the current selection without blocking the UI.
+
+        A cache hit calls on_done right away. Otherwise the fit runs on the worker
+        pool and on_done is called from the Tk loop, unless a newer request (or a
+        change of view) has superseded it in the meantime.
+        """
+        self.cancel_pending_fit()
+        name, agg_level = self.view_var.get(), self.agg_var.get()
+        series = series_data['Count']
+        if self.model_var.get() in BASELINE_MODELS:
+            # Array forecasts in well under a millisecond; no worker or cache needed
+            on_done(self.engine.baseline(self.model_var.get(), agg_level, series))
+            return
+        # None for "Auto" until an order has been searched for this series
+        spec = self.engine.spec_for(self.model_var.get(), name, agg_level, series)
+        if spec is not None:
+            cached = self.engine.cached_fit(name, agg_level, spec, series)
+            if cached is not None:
+                on_done(cached)
+                return
+
+        if spec is None and self.order_search_pool is None:
+            self.order_search_pool = process_pool()  # workers start on the first search
+
+        # Runs on a worker thread (no Tk calls); new days usually only cost a filter pass
+        self.fit_token += 1
+        future = self.fit_executor.submit(self.engine.fit, name, agg_level, spec, series, self.order_search_pool)
+        self.pending_fit = (self.fit_token, future, on_done, on_error)
+        self.progress.pack(side=tk.RIGHT, padx=5)
+        self.progress.start(10)
+        action = "Searching model orders" if spec is None else f"Fitting {self.model_var.get()}"
+        self.set_status(f"{action} for {self.view_var.get()}...")
+        self.root.after(100, self._poll_fit, self.fit_token)
+
+    def _poll_fit(self, token):
+        if self.pending_fit is None or self.pending_fit[0] != token:
+            return  # Superseded; the worker's result (if any) is still cached
+        _, future, on_done, on_error = self.pending_fit
+        if not future.done():
+            self.root.after(100, self._poll_fit, token)
+            return
+
+        self.pending_fit = None
+        self._stop_progress()
+        try:
+            model_fit = future.result()
+        except Exception as e:
+            on_error(e)
+            return
+        on_done(model_fit)
+
+    def cancel_pending_fit(self):
+        if self.pending_fit is not None:
+            self.pending_fit[1].cancel()
+            self.pending_fit = None
+            self._stop_progress()
+
+    def _stop_progress(self):
+        self.progress.stop()
+        self.progress.pack_forget()
+
+    def set_status(self, message):
+        """Show ``message``; with profiling on, append the last interaction's time breakdown."""
+        if PROFILER.enabled:
+            message = f"{message}  [{PROFILER.breakdown_text()}]"
+        self.status_var.set(message)
+
+    def setup_artists(self):
+        """Create the plot's lines once; views only swap their data, never clear the axes."""
+        self.hist_line, = self.ax.plot([], [], marker='o', linestyle='-', markersize=5, color=self.colors['hist'])
+        self.forecast_line, = self.ax.plot([], [], color=self.colors['forecast'], linestyle='-', marker='o',
+                                           markersize=5, linewidth=2, visible=False)
+        self.ax.xaxis_date()
+        self.ax.set_xlabel("Date")
+        self.ax.grid(True, linestyle='--', alpha=0.6)
+        self.legend_labels = None
+        self.layout_key = None
+
+    def set_line(self, line, series, label, full_detail=False):
+        """Point ``line`` at ``series`` (a Series or one-column frame); None hides it."""
+        if series is None:
+            line.set_visible(False)
+            line.set_data([], [])
+            return
+        values = series.iloc[:, 0] if isinstance(series, pd.DataFrame) else series
+        # Long series are drawn as one low/high pair per pixel column, without markers,
+        # unless full_detail is asked for (month drill-down); the full series stays
+        # in current_series/current_forecast for clicks.
+        n_buckets = 0 if full_detail else int(self.ax.bbox.width)
+        with PROFILER.span('downsample', points=len(values)):
+            x, y = downsample(values.index.to_numpy(), values.to_numpy(dtype='float64'), n_buckets)
+        line.set_data(x, y)
+        line.set_marker('o' if len(y) == len(values) else 'None')
+        line.set_label(label)
+        line.set_visible(True)
+
+    def redraw(self, title, ylabel="Order Volume"):
+        """Rescale to the visible lines and schedule a repaint.
+
+        The legend is rebuilt only when its entries change, and the layout pass
+        (date label rotation + tight_layout) only runs when something that
+        moves the margins changed: y label, y tick width, view or window size.
+        """
+        with PROFILER.span('redraw'):
+            self.ax.relim(visible_only=True)
+            self.ax.autoscale_view()
+            self.ax.set_title(title, fontsize=14, fontweight='bold')
+            self.ax.set_ylabel(ylabel)
+
+            lines = [line for line in (self.hist_line, self.forecast_line) if line.get_visible()]
+            labels = tuple(line.get_label() for line in lines)
+            if labels != self.legend_labels:
+                self.ax.legend(lines, labels)
+                self.legend_labels = labels
+
+            layout_key = (ylabel, len(f"{self.ax.get_ylim()[1]:.0f}"), self.current_month,
+                          self.showing_forecast_detail, tuple(self.fig.get_size_inches()))
+            if layout_key != self.layout_key:
+                self.fig.autofmt_xdate()
+                self.fig.tight_layout()
+                self.layout_key = layout_key
+            self.canvas.draw_idle()
+
+    def export_profile(self):
+        PROFILER.export(PROFILE_OUTPUT_FILE)
+        self.status_var.set(f"Saved {len(PROFILER.spans())} timing spans to {PROFILE_OUTPUT_FILE}")
+
+    def on_close(self):
+        self.cancel_pending_fit()
+        self.fit_executor.shutdown(wait=False, cancel_futures=True)
+        if self.order_search_pool is not None:
+            self.order_search_pool.shutdown(wait=False, cancel_futures=True)
+        self.root.destroy()
 
     def update_plot(self, month=None, is_forecast_month=False):
+        PROFILER.begin_interaction('update_plot')
+        self.cancel_pending_fit()
+        self.showing_forecast_detail = False
         self.current_month = month
-        self.ax.clear()
         
         daily_data = self.get_aggregated_data(month)
         self.current_series = daily_data
+        self.series_keys = time_keys(daily_data.index)
         self.current_forecast = None
+        self.forecast_keys = None
         
         label = self.view_var.get()
         agg_label = self.agg_var.get()
         title = f"{label} - {agg_label} Orders"
         
-        # Plot Historical Data
-        self.ax.plot(daily_data.index, daily_data['Count'], marker='o', linestyle='-', 
-                     markersize=5, label=f"Historical ({label})", color=self.colors['hist'], picker=5)
-
-        # Add Forecast if enabled (only in year view, not in month drill-down)
-        if self.forecast_var.get() and HAS_STATSMODELS and month is None:
-            try:
-                # Forecasting based on current aggregation
-                steps = 30 if agg_label == "Daily" else (5 if agg_label == "Weekly" else 3)
-                
-                selected_model = self.model_var.get()
-                if "SARIMA" in selected_model:
-                    # SARIMA with weekly seasonality (7 days)
-                    model = SARIMAX(daily_data['Count'], 
-                                   order=(1, 1, 1), 
-                                   seasonal_order=(1, 1, 1, 7))
-                    model_fit = model.fit(disp=False)
-                    forecast = model_fit.forecast(steps=steps)
-                    model_desc = "SARIMA (1,1,1)x(1,1,1,7)"
-                else:
-                    # Classic ARIMA
-                    model = ARIMA(daily_data['Count'], order=(5, 1, 0))
-                    model_fit = model.fit()
-                    forecast = model_fit.forecast(steps=steps)
-                    model_desc = "ARIMA (5,1,0)"
-                
-                self.current_forecast = forecast
-                
-                # Use SOLID line like historical data, just different color
-                self.ax.plot(forecast.index, forecast, color=self.colors['forecast'], 
-                             linestyle='-', marker='o', markersize=5, linewidth=2, 
-                             label=f"{steps}-Day Forecast ({selected_model})", picker=5)
-                title += f" + {selected_model} Prediction"
-            except Exception as e:
-                print(f"Forecasting error: {e}")
+        # Plot Historical Data (the forecast overlay is hidden until its fit is ready)
+        self.set_line(self.hist_line, daily_data, f"Historical ({label})", full_detail=month is not None)
+        self.set_line(self.forecast_line, None, None)
 
         if month:
             month_name = datetime.date(2023, month, 1).strftime('%B')
             title = f"{month_name} Detail: {title}"
-            self.status_var.set(f"Viewing {month_name}. Click points for stats.")
+            status = f"Viewing {month_name}. Click points for stats."
         else:
-            self.status_var.set(f"Viewing Full Year ({agg_label}). Click any point to explore.")
+            status = f"Viewing Full Year ({agg_label}). Click any point to explore."
 
-        self.ax.set_title(title, fontsize=14, fontweight='bold')
-        self.ax.set_xlabel("Date")
-        self.ax.set_ylabel("Order Volume")
-        self.ax.grid(True, linestyle='--', alpha=0.6)
-        self.ax.legend()
-        
-        self.fig.autofmt_xdate()
-        self.fig.tight_layout()
-        self.canvas.draw()
+        self.redraw(title)
+        self.set_status(status)
+
+        # Add Forecast if enabled (only in year view, not in month drill-down).
+        # The history is already on screen; the overlay follows when the fit is ready.
+        if self.forecast_var.get() and month is None:
+            # Forecasting based on current aggregation
+            steps = forecast_steps(agg_label)
+            self.request_fit(
+                daily_data,
+                lambda model_fit: self.draw_forecast(model_fit, steps, self.model_label(model_fit), title, status),
+                lambda e: self._forecast_failed(e, status))
+
+    def draw_forecast(self, model_fit, steps, selected_model, title, status):
+        try:
+            with PROFILER.span('forecast', steps=steps):
+                forecast = model_fit.forecast(steps=steps)
+        except Exception as e:
+            self._forecast_failed(e, status)
+            return
+        self.current_forecast = forecast
+        self.forecast_keys = time_keys(forecast.index)
+
+        # Use SOLID line like historical data, just different color
+        self.set_line(self.forecast_line, forecast, f"{steps}-Day Forecast ({selected_model})")
+        self.forecast_line.set_linewidth(2)
+        self.redraw(f"{title} + {selected_model} Prediction")
+        self.set_status(status)
+
+    def model_label(self, model_fit):
+        """The model dropdown's choice, with the searched order spelled out for "Auto"."""
+        return model_label(self.model_var.get(), model_fit)
+
+    def _forecast_failed(self, error, status):
+        print(f"Forecasting error: {error}")
+        self.set_status(status)
 
     def show_analytics(self, date_val, count_val, is_forecast=False):
         # Formulate date string
@@ -239,14 +507,16 @@ class RestaurantDashboard:
             return
         
         # Search for nearest point
+        import matplotlib.dates as mdates  # already loaded by import_plotting
+
         x_date = mdates.num2date(event.xdata).replace(tzinfo=None)
+        x = int(np.datetime64(x_date, 'ns').view('int64'))
         
         # Check forecast points first if enabled (top layer)
         if self.current_forecast is not None:
             # Find closest forecast point
-            time_diffs = np.abs((self.current_forecast.index - x_date).total_seconds())
-            if np.min(time_diffs) < (3600 * 24 * 7): # Within scope
-                idx = np.argmin(time_diffs)
+            idx = nearest_point(self.forecast_keys, x)
+            if idx is not None: # Within scope
                 clicked_forecast_date = self.current_forecast.index[idx]
                 clicked_forecast_value = self.current_forecast.iloc[idx]
                 
@@ -260,9 +530,8 @@ class RestaurantDashboard:
                 return
 
         # Check historical points
-        time_diffs = np.abs((self.current_series.index - x_date).total_seconds())
-        if np.min(time_diffs) < (3600 * 24 * 7):
-            idx = np.argmin(time_diffs)
+        idx = nearest_point(self.series_keys, x)
+        if idx is not None:
             clicked_date = self.current_series.index[idx]
             clicked_count = self.current_series['Count'].iloc[idx]
             
@@ -274,59 +543,51 @@ class RestaurantDashboard:
 
     def show_forecast_month_detail(self, month, year):
         """Show detailed forecast for a specific month"""
-        self.ax.clear()
-        
         # Generate forecast for the entire dataset
+        PROFILER.begin_interaction('forecast month detail')
         daily_data = self.get_aggregated_data(month=None)
-        
+        self.request_fit(
+            daily_data,
+            lambda model_fit: self.draw_forecast_month_detail(model_fit, month, year),
+            lambda e: messagebox.showerror("Error", f"Could not generate forecast details: {e}"))
+
+    def draw_forecast_month_detail(self, model_fit, month, year):
+        import matplotlib  # already loaded by import_plotting
+
         try:
-            selected_model = self.model_var.get()
-            if "SARIMA" in selected_model:
-                model = SARIMAX(daily_data['Count'], 
-                               order=(1, 1, 1), 
-                               seasonal_order=(1, 1, 1, 7))
-                model_fit = model.fit(disp=False)
-            else:
-                model = ARIMA(daily_data['Count'], order=(5, 1, 0))
-                model_fit = model.fit()
-            
-            # Forecast 60 days to ensure we cover the clicked month
-            forecast = model_fit.forecast(steps=60)
+            # Forecast DETAIL_STEPS days to ensure we cover the clicked month
+            with PROFILER.span('forecast', steps=DETAIL_STEPS):
+                forecast = model_fit.forecast(steps=DETAIL_STEPS)
             
             # Filter to just the clicked month
-            month_forecast = forecast[forecast.index.month == month]
+            detail = month_forecast(forecast, month, year)
             
-            if len(month_forecast) == 0:
+            if len(detail) == 0:
                 messagebox.showwarning("No Data", f"No forecast data available for month {month}")
                 return
             
             # Plot the forecast month detail
-            self.ax.plot(month_forecast.index, month_forecast, marker='o', linestyle='-', 
-                         markersize=5, label=f"Forecast Detail", color=self.colors['forecast'])
+            self.showing_forecast_detail = True
+            self.set_line(self.hist_line, None, None)
+            self.set_line(self.forecast_line, detail, "Forecast Detail")
+            self.forecast_line.set_linewidth(matplotlib.rcParams['lines.linewidth'])
             
             month_name = datetime.date(year, month, 1).strftime('%B %Y')
-            self.ax.set_title(f"Forecasted Orders - {month_name} (Daily)", fontsize=14, fontweight='bold')
-            self.ax.set_xlabel("Date")
-            self.ax.set_ylabel("Predicted Order Volume")
-            self.ax.grid(True, linestyle='--', alpha=0.6)
-            self.ax.legend()
             
             # Show analytics summary
-            avg_forecast = month_forecast.mean()
-            total_forecast = month_forecast.sum()
-            
-            self.status_var.set(f"Forecast for {month_name}: Avg={avg_forecast:.1f}/day, Total≈{total_forecast:.0f} orders")
+            summary = month_summary(detail)
+            avg_forecast = summary['average']
+            total_forecast = summary['total']
             
-            self.fig.autofmt_xdate()
-            self.fig.tight_layout()
-            self.canvas.draw()
+            self.redraw(f"Forecasted Orders - {month_name} (Daily)", ylabel="Predicted Order Volume")
+            self.set_status(f"Forecast for {month_name}: Avg={avg_forecast:.1f}/day, Total≈{total_forecast:.0f} orders")
             
             # Show popup with analytics
             msg = f"--- FORECAST MONTH ANALYTICS ---\n\n"
             msg += f"Month: {month_name}\n"
             msg += f"Average Daily Orders: {avg_forecast:.2f}\n"
             msg += f"Estimated Total: {total_forecast:.0f}\n"
-            msg += f"Days Forecasted: {len(month_forecast)}\n\n"
+            msg += f"Days Forecasted: {summary['days']}\n\n"
             msg += "Note: This is a prediction based on historical patterns.\n"
             msg += "Click 'Reset View' to return to the main dashboard."
             
@@ -0,0 +1,254 @@
+import contextlib
+import hashlib
+import io
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# Shared loader for restaurant_data.csv
+# The first load parses the CSV and writes a typed columnar cache next to it
+# (one .npy file per column, a directory named '<csv>.cache'). Later loads
+# memory-map those arrays instead of re-parsing text, as long as the CSV's
+# size and mtime still match the ones recorded in the cache metadata.
+# If the CSV has only grown since (the daily append), just the new bytes are
+# parsed and folded into the cache; CsvTail does the same for a running process.
+
+DATA_FILE = 'restaurant_data.csv'
+CACHE_VERSION = 2
+
+COLUMNS = ['Date', 'Order_ID', 'Dish_Name', 'Ingredient_Name', 'Quantity_Used', 'Unit', 'Stock_Available']
+CATEGORICAL_COLUMNS = ['Order_ID', 'Dish_Name', 'Ingredient_Name', 'Unit']
+FLOAT_COLUMNS = ['Quantity_Used', 'Stock_Available']
+CSV_DTYPES = {col: 'category' for col in CATEGORICAL_COLUMNS}
+CSV_DTYPES.update({col: 'float64' for col in FLOAT_COLUMNS})
+
+# Bytes just before the parsed offset that must be unchanged for an append to be trusted
+TAIL_CHECK_BYTES = 64 * 1024
+
+
+class SourceChangedError(RuntimeError):
+    """The CSV was truncated or rewritten, so appended-row tracking must restart."""
+
+
+def cache_dir_for(csv_path):
+    return csv_path + '.cache'
+
+
+def _csv_signature(csv_path):
+    st = os.stat(csv_path)
+    return {'version': CACHE_VERSION, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+def read_csv_typed(csv_path, **kwargs):
+    """Parse the CSV straight into the cache dtypes (no post-hoc to_datetime pass)."""
+    df = pd.read_csv(csv_path, dtype=CSV_DTYPES, parse_dates=['Date'], date_format='%Y-%m-%d', **kwargs)
+    return df
+
+
+class _ByteRange(io.RawIOBase):
+    """Read-only view of bytes [start, end) of an open binary file."""
+
+    def __init__(self, f, start, end):
+        f.seek(start)
+        self._f = f
+        self._left = end - start
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = min(len(buffer), self._left)
+        if n <= 0:
+            return 0
+        got = self._f.readinto(memoryview(buffer)[:n])
+        self._left -= got
+        return got
+
+
+def _complete_offset(f, size):
+    """Offset just past the last newline at or before ``size`` (a half-written row is left for later)."""
+    pos = size
+    while pos > 0:
+        start = max(0, pos - 65536)
+        f.seek(start)
+        block = f.read(pos - start)
+        i = block.rfind(b'\n')
+        if i >= 0:
+            return start + i + 1
+        pos = start
+    return 0
+
+
+def _tail_hash(f, offset):
+    start = max(0, offset - TAIL_CHECK_BYTES)
+    f.seek(start)
+    return hashlib.blake2b(f.read(offset - start), digest_size=16).hexdigest()
+
+
+def _parse_range(f, start, end, header):
+    if end <= start and not header:
+        return pd.DataFrame({col: pd.Series(dtype=CSV_DTYPES.get(col, 'datetime64[ns]')) for col in COLUMNS})
+    stream = io.BufferedReader(_ByteRange(f, start, end))
+    if header:
+        return read_csv_typed(stream)
+    return read_csv_typed(stream, header=None, names=COLUMNS)
+
+
+@contextlib.contextmanager
+def csv_chunks(csv_path, chunksize, start=0):
+    """Typed frames of the complete rows after byte ``start``, ``chunksize`` rows at a time.
+
+    Yields (chunk iterator, end offset); rows written after the call are left
+    for a later read from that offset. ``start`` 0 means the file has its header.
+    """
+    with open(csv_path, 'rb') as f:
+        end = _complete_offset(f, os.fstat(f.fileno()).st_size)
+        if end <= start:
+            yield iter(()), max(start, end)
+            return
+        stream = io.BufferedReader(_ByteRange(f, start, end))
+        if start == 0:
+            yield read_csv_typed(stream, chunksize=chunksize), end
+        else:
+            yield read_csv_typed(stream, header=None, names=COLUMNS, chunksize=chunksize), end
+
+
+def tail_signature(csv_path, offset):
+    """Hash of the bytes just before ``offset``; unchanged means rows after it were only appended."""
+    with open(csv_path, 'rb') as f:
+        return _tail_hash(f, offset)
+
+
+def append_rows(df, new_rows):
+    """Concatenate two typed frames, merging categorical columns' categories."""
+    if len(new_rows) == 0:
+        return df
+    columns = {}
+    for col in df.columns:
+        if col in CATEGORICAL_COLUMNS:
+            columns[col] = union_categoricals([df[col], new_rows[col]], ignore_order=True, sort_categories=True)
+        else:
+            columns[col] = np.concatenate([np.asarray(df[col]), np.asarray(new_rows[col])])
+    return pd.DataFrame(columns, columns=df.columns)
+
+
+def _write_cache(df, cache_dir, signature, offset, tail_hash):
+    # Write into a sibling temp directory and swap it in, so a crash or a
+    # concurrent reader never sees a half-written cache.
+    tmp_dir = cache_dir + f'.tmp-{os.getpid()}'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    np.save(os.path.join(tmp_dir, 'Date.npy'), df['Date'].values.astype('datetime64[ns]'))
+    for col in CATEGORICAL_COLUMNS:
+        cat = df[col].astype('category').cat
+        np.save(os.path.join(tmp_dir, f'{col}.codes.npy'), np.asarray(cat.codes))
+        # Fixed-width unicode keeps the categories loadable without pickle
+        np.save(os.path.join(tmp_dir, f'{col}.categories.npy'), np.asarray(cat.categories, dtype=str))
+    for col in FLOAT_COLUMNS:
+        np.save(os.path.join(tmp_dir, f'{col}.npy'), df[col].to_numpy(dtype='float64'))
+
+    meta = dict(signature, rows=len(df), columns=list(df.columns), offset=offset, tail_hash=tail_hash)
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.replace(tmp_dir, cache_dir)
+
+
+def _read_cache(cache_dir):
+    meta_path = os.path.join(cache_dir, 'meta.json')
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None, None
+    if meta.get('version') != CACHE_VERSION:
+        return None, None
+
+    try:
+        columns = {'Date': np.load(os.path.join(cache_dir, 'Date.npy'), mmap_mode='r')}
+        for col in CATEGORICAL_COLUMNS:
+            codes = np.load(os.path.join(cache_dir, f'{col}.codes.npy'), mmap_mode='r')
+            categories = np.load(os.path.join(cache_dir, f'{col}.categories.npy'))
+            columns[col] = pd.Categorical.from_codes(codes, categories=categories)
+        for col in FLOAT_COLUMNS:
+            columns[col] = np.load(os.path.join(cache_dir, f'{col}.npy'), mmap_mode='r')
+    except (OSError, ValueError):
+        return None, None
+
+    return pd.DataFrame(columns, columns=meta.get('columns', COLUMNS), copy=False), meta
+
+
+def _load(csv_path, use_cache):
+    """Load the CSV (via the cache when possible); returns (df, byte offset the frame covers)."""
+    signature = _csv_signature(csv_path)
+    with open(csv_path, 'rb') as f:
+        end = _complete_offset(f, signature['size'])
+        if not use_cache:
+            return _parse_range(f, 0, end, header=True), end
+
+        cache_dir = cache_dir_for(csv_path)
+        df, meta = _read_cache(cache_dir)
+        if df is not None and meta['size'] == signature['size'] and meta['mtime_ns'] == signature['mtime_ns']:
+            return df, meta['offset']
+
+        if df is not None and meta['offset'] <= end and _tail_hash(f, meta['offset']) == meta['tail_hash']:
+            # Append-only change: parse just the new rows
+            df = append_rows(df, _parse_range(f, meta['offset'], end, header=False))
+        else:
+            df = _parse_range(f, 0, end, header=True)
+
+        try:
+            _write_cache(df, cache_dir, signature, end, _tail_hash(f, end))
+        except OSError as e:
+            # A read-only data directory just means no cache, not a failed load
+            print(f"Could not write data cache {cache_dir}: {e}")
+    return df, end
+
+
+def load_restaurant_data(csv_path=DATA_FILE, use_cache=True):
+    """Load the order/ingredient table with typed columns.
+
+    Date is datetime64, Order_ID/Dish_Name/Ingredient_Name/Unit are categorical
+    and the quantities are float64. Raises FileNotFoundError if the CSV is missing.
+    """
+    return _load(csv_path, use_cache)[0]
+
+
+def open_restaurant_data(csv_path=DATA_FILE, use_cache=True):
+    """Like load_restaurant_data, but also return a CsvTail positioned after the loaded rows."""
+    df, offset = _load(csv_path, use_cache)
+    return df, CsvTail(csv_path, offset)
+
+
+class CsvTail:
+    """Follows rows appended to the CSV after a given byte offset.
+
+    Each read_new() call parses only the bytes added since the previous call
+    (complete lines only), so its cost tracks the new rows, not the file size.
+    """
+
+    def __init__(self, csv_path, offset):
+        self.csv_path = csv_path
+        self.offset = offset
+        with open(csv_path, 'rb') as f:
+            self._inode = os.fstat(f.fileno()).st_ino
+            self._tail_hash = _tail_hash(f, offset)
+
+    def read_new(self):
+        """Return the newly appended rows (possibly empty); SourceChangedError if the file was rewritten."""
+        with open(self.csv_path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            if st.st_ino != self._inode or st.st_size < self.offset or _tail_hash(f, self.offset) != self._tail_hash:
+                raise SourceChangedError(f"{self.csv_path} was truncated or replaced")
+            end = _complete_offset(f, st.st_size) if st.st_size > self.offset else self.offset
+            new_rows = _parse_range(f, self.offset, end, header=False)
+            if end != self.offset:
+                self.offset = end
+                self._tail_hash = _tail_hash(f, end)
+        return new_rows
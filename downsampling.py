@@ -0,0 +1,40 @@
+import numpy as np
+
+# Visual level-of-detail for long series
+# A line drawn across W pixel columns can't show more than a low and a high
+# per column, so long series are cut into equal-count buckets (the dashboard's
+# indexes are regular, so equal count means equal width on screen) and only
+# each bucket's min and max points are kept, in their original order. Spikes
+# and dips survive, unlike with stride sampling. This is for drawing only;
+# lookups such as click analytics must keep using the full series.
+
+
+def minmax_indices(values, n_buckets):
+    """Sorted positions of each bucket's min and max in ``values`` (plus the first and last point).
+
+    Returns every position when ``values`` has no more than 2 * n_buckets points.
+    """
+    values = np.asarray(values, dtype='float64')
+    n = len(values)
+    if n_buckets < 1 or n <= 2 * n_buckets:
+        return np.arange(n)
+
+    size = -(-n // n_buckets)
+    n_rows = -(-n // size)
+    padded = np.full(n_rows * size, np.nan)
+    padded[:n] = values
+    rows = padded.reshape(n_rows, size)
+    offsets = np.arange(n_rows) * size
+    lo = offsets + np.nanargmin(rows, axis=1)
+    hi = offsets + np.nanargmax(rows, axis=1)
+
+    picks = np.concatenate(([0], np.minimum(lo, hi), np.maximum(lo, hi), [n - 1]))
+    return np.unique(picks)
+
+
+def downsample(index, values, n_buckets):
+    """(index, values) reduced with minmax_indices; unchanged if already short enough."""
+    positions = minmax_indices(values, n_buckets)
+    if len(positions) == len(values):
+        return index, values
+    return index[positions], np.asarray(values)[positions]
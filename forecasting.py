@@ -0,0 +1,282 @@
+import hashlib
+import importlib.util
+import multiprocessing
+import os
+import pickle
+import threading
+import time
+import warnings
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from profiling import PROFILER
+
+# statsmodels takes longer to import than everything else the dashboard needs,
+# so it is only imported by the first fit; finding the package is enough here.
+HAS_STATSMODELS = importlib.util.find_spec('statsmodels') is not None
+
+# Model choices offered by the dashboard, keyed by their dropdown label
+MODEL_SPECS = {
+    "ARIMA (5,1,0)": {'kind': 'arima', 'order': (5, 1, 0), 'seasonal_order': (0, 0, 0, 0)},
+    "SARIMA (Weekly)": {'kind': 'sarimax', 'order': (1, 1, 1), 'seasonal_order': (1, 1, 1, 7)},
+}
+DEFAULT_MODEL = "ARIMA (5,1,0)"
+
+# Incremental updates: when a series only gains (or revises its last) observations,
+# the previous parameters are re-filtered over the new data instead of re-running
+# MLE. A full refit happens after REFIT_EVERY new observations, or when the
+# one-step-ahead error on the new observations exceeds DRIFT_THRESHOLD times
+# the in-sample error of the last full fit.
+REFIT_EVERY = 30
+DRIFT_THRESHOLD = 1.5
+DRIFT_MIN_OBS = 3
+
+
+def describe_spec(spec):
+    if spec['kind'] == 'sarimax' or spec['seasonal_order'][3]:
+        p, d, q = spec['order']
+        P, D, Q, s = spec['seasonal_order']
+        return f"SARIMA ({p},{d},{q})x({P},{D},{Q},{s})"
+    return "ARIMA ({},{},{})".format(*spec['order'])
+
+
+def spec_key(spec):
+    """Hashable identity of a model spec."""
+    return (spec['kind'], tuple(spec['order']), tuple(spec['seasonal_order']))
+
+
+def fit_model(series, spec, start_params=None):
+    """Fit the statsmodels model described by ``spec`` and return its results.
+
+    ``start_params`` (e.g. a neighbouring fit's params) warm-starts the optimizer.
+    """
+    from statsmodels.tsa.arima.model import ARIMA
+    from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+    with PROFILER.span('model fit', kind=spec['kind'], n_obs=len(series)):
+        if spec['kind'] == 'sarimax':
+            model = SARIMAX(series, order=spec['order'], seasonal_order=spec['seasonal_order'])
+            return model.fit(disp=False, start_params=start_params)
+        model = ARIMA(series, order=spec['order'], seasonal_order=spec['seasonal_order'])
+        return model.fit(start_params=start_params)
+
+
+def _rmse(values):
+    values = np.asarray(values, dtype='float64')
+    return float(np.sqrt(np.mean(np.square(values)))) if len(values) else float('nan')
+
+
+def _burn_in(spec, n_obs):
+    # Leading residuals are dominated by the state initialisation; skip them
+    p, d, _ = spec['order']
+    P, D, _, s = spec['seasonal_order']
+    return min(n_obs // 2, d + D * s + max(p, P * s))
+
+
+def _make_state(result, series, spec, fit_len, baseline_rmse=None):
+    if baseline_rmse is None:
+        baseline_rmse = _rmse(np.asarray(result.resid)[_burn_in(spec, len(series)):])
+    return {
+        'result': result,
+        'values': series.to_numpy(dtype='float64').copy(),
+        'start': series.index[0],
+        'freq': getattr(series.index, 'freqstr', None),
+        'fit_len': fit_len,
+        'baseline_rmse': baseline_rmse,
+        'spec': spec_key(spec),
+    }
+
+
+def update_model_state(state, series, spec, refit_every=REFIT_EVERY, drift_threshold=DRIFT_THRESHOLD):
+    """Bring a fitted model state up to date with ``series``.
+
+    ``state`` is None or a dict from a previous call. Returns (state, action),
+    action being 'refit' (full MLE fit) or 'filtered' (previous parameters
+    re-applied with a Kalman filter pass). Filtering is only used when
+    ``series`` starts where the old one did and matches it up to its last
+    observation, which may have been revised (a partial day, week or month),
+    and ``spec`` is the model the state was fitted with.
+    """
+    old = state['values'] if state is not None else None
+    reusable = (
+        old is not None
+        and state.get('spec') == spec_key(spec)
+        and len(series) >= len(old)
+        and series.index[0] == state['start']
+        and getattr(series.index, 'freqstr', None) == state['freq']
+        and len(series) - state['fit_len'] < refit_every
+        and np.array_equal(series.to_numpy(dtype='float64')[:len(old) - 1], old[:-1])
+    )
+    if reusable:
+        with PROFILER.span('model filter', kind=spec['kind'], n_obs=len(series)):
+            result = state['result'].apply(series, refit=False)
+        new_errors = np.asarray(result.resid)[len(old) - 1:]
+        drifted = len(new_errors) >= DRIFT_MIN_OBS and _rmse(new_errors) > drift_threshold * state['baseline_rmse']
+        if not drifted:
+            return _make_state(result, series, spec, state['fit_len'], state['baseline_rmse']), 'filtered'
+
+    return _make_state(fit_model(series, spec), series, spec, len(series)), 'refit'
+
+
+def load_model_state(path):
+    """Model state saved by save_model_state, or None if missing/unreadable (forces a full fit)."""
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+
+
+def save_model_state(path, state):
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def series_fingerprint(series):
+    """Cheap content hash of a date-indexed series (values, span and frequency)."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(np.ascontiguousarray(series.to_numpy(dtype='float64')).tobytes())
+    index = series.index
+    if len(index):
+        h.update(f"{index[0]}|{index[-1]}|{len(index)}|{getattr(index, 'freqstr', None)}".encode())
+    return h.hexdigest()
+
+
+class FittedModelCache:
+    """Bounded LRU cache of fitted model results.
+
+    Entries are keyed on (series name, aggregation level, model spec, series
+    fingerprint), so any change to the input data is a miss rather than a
+    stale hit. Callers forecast from the cached results as often as they like.
+    On a miss, the newest fit of the same (name, level, spec) is extended with
+    update_model_state when possible, so new days cost a filter pass, not a fit.
+    """
+
+    def __init__(self, maxsize=16, refit_every=REFIT_EVERY, drift_threshold=DRIFT_THRESHOLD):
+        self.maxsize = maxsize
+        self.refit_every = refit_every
+        self.drift_threshold = drift_threshold
+        self._entries = OrderedDict()
+        self._lineage = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.refits = 0
+        self.filtered_updates = 0
+
+    @staticmethod
+    def make_key(name, agg_level, spec, series):
+        return (name, agg_level, spec_key(spec), series_fingerprint(series))
+
+    def get(self, key):
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key, result):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def fit(self, name, agg_level, spec, series):
+        """Fit (or incrementally update) the model for ``series`` and cache the result."""
+        lineage_key = (name, agg_level, spec_key(spec))
+        with self._lock:
+            previous = self._lineage.get(lineage_key)
+        state, action = update_model_state(previous, series, spec, self.refit_every, self.drift_threshold)
+        with self._lock:
+            self._lineage.pop(lineage_key, None)
+            self._lineage[lineage_key] = state
+            if action == 'refit':
+                self.refits += 1
+            else:
+                self.filtered_updates += 1
+            # Bounded like the LRU: the least recently updated lineage goes first
+            if len(self._lineage) > self.maxsize:
+                self._lineage.pop(next(iter(self._lineage)))
+        self.put(self.make_key(name, agg_level, spec, series), state['result'])
+        return state['result']
+
+    def get_or_fit(self, name, agg_level, spec, series):
+        result = self.get(self.make_key(name, agg_level, spec, series))
+        if result is None:
+            result = self.fit(name, agg_level, spec, series)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._lineage.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._entries), 'maxsize': self.maxsize, 'hits': self.hits,
+                    'misses': self.misses, 'evictions': self.evictions,
+                    'refits': self.refits, 'filtered_updates': self.filtered_updates}
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def process_pool(workers=None):
+    """Process pool for fits and other CPU-bound batch work; ``workers`` defaults to one per core.
+
+    spawn keeps workers from inheriting the parent's BLAS thread pools, and
+    each worker stays single-threaded: one fit per core is what scales here.
+    The limits are set in the workers only; the parent's threads are untouched.
+    """
+    return ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1,
+                               mp_context=multiprocessing.get_context('spawn'), initializer=_single_threaded_worker)
+
+
+# Per worker process: keeps the thread limits of _single_threaded_worker in force
+_WORKER_THREAD_LIMITS = None
+
+
+def _single_threaded_worker():
+    """process_pool initializer: one BLAS/OpenMP thread in this worker."""
+    global _WORKER_THREAD_LIMITS
+    # For libraries loaded from here on (scipy and statsmodels come with the first fit)
+    for var in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS'):
+        os.environ.setdefault(var, '1')
+    # numpy's BLAS was already loaded when the worker imported its task's module
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        return
+    _WORKER_THREAD_LIMITS = threadpool_limits(limits=1)
+
+
+def forecast_series_task(task):
+    """Fit one daily series and forecast it; process-pool entry point for batch runs.
+
+    ``task`` is (series_type, name, start_date, values, spec, steps). Failures are
+    returned in the 'error' field rather than raised so one bad series never
+    takes down the whole batch.
+    """
+    series_type, name, start, values, spec, steps = task
+    started = time.perf_counter()
+    outcome = {'series_type': series_type, 'name': name, 'forecast': None, 'error': None}
+    try:
+        series = pd.Series(values, index=pd.date_range(start, periods=len(values), freq='D'))
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            outcome['forecast'] = fit_model(series, spec).forecast(steps=steps)
+    except Exception as e:
+        outcome['error'] = f"{type(e).__name__}: {e}"
+    outcome['seconds'] = time.perf_counter() - started
+    return outcome
@@ -1,12 +1,25 @@
-import csv
-import random
-from datetime import datetime, timedelta
+import argparse
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
 
 # Configuration
 START_DATE = datetime(2023, 1, 1)
 DAYS_TO_SIMULATE = 365
+NUM_STORES = 1
 OUTPUT_FILE = 'restaurant_data.csv'
 
+# Daily order volume per store (inclusive bounds)
+MIN_ORDERS_PER_DAY = 20
+MAX_ORDERS_PER_DAY = 50
+
+# Rows buffered before each chunk is appended to the CSV
+CHUNK_ROWS = 1_000_000
+
+FIELDNAMES = ['Date', 'Order_ID', 'Dish_Name', 'Ingredient_Name', 'Quantity_Used', 'Unit', 'Stock_Available']
+
 # Define Ingredients and their initial stock
 # Format: 'Ingredient Name': {'unit': 'unit_name', 'initial_stock': quantity, 'restock_amount': quantity, 'restock_threshold': quantity}
 INGREDIENTS = {
@@ -58,76 +71,180 @@ MENU = {
     }
 }
 
-def generate_data():
-    current_date = START_DATE
-    current_stock = {ing: data['initial_stock'] for ing, data in INGREDIENTS.items()}
-    
-    # List to store the generated data rows
-    data_rows = []
-    
+
+def recipe_arrays():
+    """MENU/INGREDIENTS as arrays: dense recipe matrix plus per-dish ingredient lists in recipe order."""
+    dishes = list(MENU)
+    ingredients = list(INGREDIENTS)
+    ing_index = {ing: i for i, ing in enumerate(ingredients)}
+    max_len = max(len(recipe) for recipe in MENU.values())
+
+    recipe = np.zeros((len(dishes), len(ingredients)))
+    recipe_len = np.zeros(len(dishes), dtype=np.int64)
+    recipe_ing = np.zeros((len(dishes), max_len), dtype=np.int64)
+    recipe_qty = np.zeros((len(dishes), max_len))
+    for d, dish in enumerate(dishes):
+        for k, (ing, qty_needed) in enumerate(MENU[dish].items()):
+            recipe[d, ing_index[ing]] = qty_needed
+            recipe_ing[d, k] = ing_index[ing]
+            recipe_qty[d, k] = qty_needed
+        recipe_len[d] = len(MENU[dish])
+    return dishes, ingredients, recipe, recipe_len, recipe_ing, recipe_qty
+
+
+def simulate_day(stock, rng, recipe, thresholds, amounts):
+    """Run one day for every store at once; ``stock`` (stores x ingredients) is updated in place.
+
+    Orders within a store are still applied in sequence (a stock-out on one order
+    affects the next), but each step is vectorized across stores.
+    Returns (made, dish, suffix, snapshots) with one entry per store/order slot.
+    """
+    n_stores, n_ing = stock.shape
+
+    # 1. Restock if needed (Simplistic Logic: Restock at start of day)
+    stock += np.where(stock < thresholds, amounts, 0)
+
+    # 2. Simulate Orders for the day
+    num_orders = rng.integers(MIN_ORDERS_PER_DAY, MAX_ORDERS_PER_DAY + 1, size=n_stores)
+    slots = int(num_orders.max())
+    dish = rng.integers(0, recipe.shape[0], size=(n_stores, slots))
+    suffix = rng.integers(1000, 10000, size=(n_stores, slots))
+
+    made = np.zeros((n_stores, slots), dtype=bool)
+    snapshots = np.empty((n_stores, slots, n_ing))
+    for j in range(slots):
+        need = recipe[dish[:, j]]
+        # Check if we have enough ingredients; otherwise the order is lost
+        can_make = (j < num_orders) & (stock >= need).all(axis=1)
+        # Deduct stock; clamp at zero (floating point correction)
+        np.copyto(stock, np.maximum(stock - need, 0), where=can_make[:, None])
+        made[:, j] = can_make
+        snapshots[:, j] = stock
+    return made, dish, suffix, snapshots
+
+
+def expand_rows(day_str, made, dish, suffix, snapshots, recipe_len, recipe_ing, recipe_qty, store_tags):
+    """Turn one day's successful orders into ingredient rows (order, then recipe order)."""
+    store_idx, slot_idx = np.nonzero(made)
+    order_dish = dish[store_idx, slot_idx]
+
+    # Generate a unique Order ID (e.g., specific to day and sequence)
+    prefix = f"ORD-{day_str.replace('-', '')}-"
+    order_ids = np.array([prefix + tag + str(n) for tag, n in
+                          zip(store_tags[store_idx], suffix[store_idx, slot_idx])], dtype=object)
+
+    lengths = recipe_len[order_dish]
+    row_order = np.repeat(np.arange(len(order_dish)), lengths)
+    starts = np.cumsum(lengths) - lengths
+    position = np.arange(len(row_order)) - np.repeat(starts, lengths)
+    row_dish = order_dish[row_order]
+    row_ing = recipe_ing[row_dish, position]
+
+    return {
+        'order_id': order_ids[row_order],
+        'dish': row_dish,
+        'ingredient': row_ing,
+        'quantity': recipe_qty[row_dish, position],
+        'stock': snapshots[store_idx[row_order], slot_idx[row_order], row_ing],
+    }
+
+
+def format_numbers(values):
+    """Format floats like the recipe literals ('1', '0.25', '49.8') via their unique values only."""
+    unique, inverse = np.unique(values, return_inverse=True)
+    return np.array(['%g' % v for v in unique], dtype=object)[inverse.ravel()]
+
+
+def csv_field(text):
+    if any(c in text for c in ',"\r\n'):
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
+
+def write_chunk(path, parts, dishes, ingredients, write_header):
+    dish_names = np.array([csv_field(d) for d in dishes], dtype=object)
+    ing_names = np.array([csv_field(i) for i in ingredients], dtype=object)
+    units = np.array([csv_field(INGREDIENTS[ing]['unit']) for ing in ingredients], dtype=object)
+    ing_codes = np.concatenate([p['ingredient'] for _, p in parts])
+
+    # Every column is pre-rendered to text: quantities and 2-decimal stock levels
+    # take few distinct values, so formatting each once and joining lines
+    # directly is several times faster than DataFrame.to_csv.
+    columns = [
+        np.repeat(np.array([d for d, _ in parts], dtype=object), [len(p['dish']) for _, p in parts]),
+        np.concatenate([p['order_id'] for _, p in parts]),
+        dish_names[np.concatenate([p['dish'] for _, p in parts])],
+        ing_names[ing_codes],
+        format_numbers(np.concatenate([p['quantity'] for _, p in parts])),
+        units[ing_codes],
+        format_numbers(np.round(np.concatenate([p['stock'] for _, p in parts]), 2)),
+    ]
+    with open(path, 'w' if write_header else 'a', newline='') as csvfile:
+        if write_header:
+            csvfile.write(','.join(FIELDNAMES) + '\n')
+        csvfile.write('\n'.join(map(','.join, zip(*columns))) + '\n')
+    return len(ing_codes)
+
+
+def generate_data(output_file=OUTPUT_FILE, start_date=START_DATE, days=DAYS_TO_SIMULATE,
+                  stores=NUM_STORES, seed=None, chunk_rows=CHUNK_ROWS):
+    """Simulate ``stores`` independent restaurants for ``days`` days and stream the rows to CSV.
+
+    The same ``seed`` always produces the same file. Rows are written in chunks
+    of roughly ``chunk_rows``, so memory stays flat however long the run is.
+    """
+    rng = np.random.default_rng(seed)
+    dishes, ingredients, recipe, recipe_len, recipe_ing, recipe_qty = recipe_arrays()
+    initial = np.array([INGREDIENTS[ing]['initial_stock'] for ing in ingredients], dtype=float)
+    thresholds = np.array([INGREDIENTS[ing]['restock_threshold'] for ing in ingredients], dtype=float)
+    amounts = np.array([INGREDIENTS[ing]['restock_amount'] for ing in ingredients], dtype=float)
+    current_stock = np.tile(initial, (stores, 1))
+
+    # Single-store output keeps the classic ORD-YYYYMMDD-NNNN ids; with several
+    # stores a store tag keeps ids unique across stores on the same day.
+    width = len(str(stores - 1))
+    store_tags = np.array(['' if stores == 1 else f"S{s:0{width}d}-" for s in range(stores)], dtype=object)
+
+    day_strings = pd.date_range(start_date, periods=days, freq='D').strftime('%Y-%m-%d')
+    started = time.perf_counter()
+    total_rows = 0
+    buffered, buffered_rows = [], 0
+    write_header = True
+
     # Simulate each day
-    for day in range(DAYS_TO_SIMULATE):
-        date_str = current_date.strftime('%Y-%m-%d')
-        
-        # 1. Restock if needed (Simplistic Logic: Restock at start of day)
-        for ing, stock in current_stock.items():
-            if stock < INGREDIENTS[ing]['restock_threshold']:
-                restock_amt = INGREDIENTS[ing]['restock_amount']
-                current_stock[ing] += restock_amt
-                # Optionally log restock events, but for now we focus on order data
-        
-        # 2. Simulate Orders for the day
-        # Random number of orders between 20 and 50
-        num_orders = random.randint(20, 50)
-        
-        for _ in range(num_orders):
-            # Pick a random dish
-            dish_name = random.choice(list(MENU.keys()))
-            recipe = MENU[dish_name]
-            
-            # Check if we have enough ingredients
-            can_make = True
-            for ing, qty_needed in recipe.items():
-                if current_stock[ing] < qty_needed:
-                    can_make = False
-                    break
-            
-            if can_make:
-                # Generate a unique Order ID (e.g., specific to day and sequence)
-                order_id = f"ORD-{date_str.replace('-', '')}-{random.randint(1000, 9999)}"
-                
-                # Deduct stock and record data
-                for ing, qty_needed in recipe.items():
-                    current_stock[ing] -= qty_needed
-                    # Ensure stock doesn't go below zero (floating point correction)
-                    if current_stock[ing] < 0: current_stock[ing] = 0
-                    
-                    row = {
-                        'Date': date_str,
-                        'Order_ID': order_id,
-                        'Dish_Name': dish_name,
-                        'Ingredient_Name': ing,
-                        'Quantity_Used': qty_needed,
-                        'Unit': INGREDIENTS[ing]['unit'],
-                        'Stock_Available': round(current_stock[ing], 2)
-                    }
-                    data_rows.append(row)
-            else:
-                # Stock out - Order lost (Optional: limit output to successful orders)
-                pass
-        
-        # Move to next day
-        current_date += timedelta(days=1)
-
-    # Write to CSV
-    fieldnames = ['Date', 'Order_ID', 'Dish_Name', 'Ingredient_Name', 'Quantity_Used', 'Unit', 'Stock_Available']
-    
-    with open(OUTPUT_FILE, mode='w', newline='') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(data_rows)
-        
-    print(f"Data generation complete. Saved {len(data_rows)} rows to {OUTPUT_FILE}")
+    for day_str in day_strings:
+        made, dish, suffix, snapshots = simulate_day(current_stock, rng, recipe, thresholds, amounts)
+        part = expand_rows(day_str, made, dish, suffix, snapshots, recipe_len, recipe_ing, recipe_qty, store_tags)
+        buffered.append((day_str, part))
+        buffered_rows += len(part['dish'])
+
+        if buffered_rows >= chunk_rows:
+            total_rows += write_chunk(output_file, buffered, dishes, ingredients, write_header)
+            write_header = False
+            buffered, buffered_rows = [], 0
+
+    if buffered:
+        total_rows += write_chunk(output_file, buffered, dishes, ingredients, write_header)
+    elif write_header:
+        with open(output_file, 'w', newline='') as csvfile:
+            csvfile.write(','.join(FIELDNAMES) + '\n')
+
+    print(f"Data generation complete. Saved {total_rows} rows to {output_file} "
+          f"({stores} store(s), {days} days) in {time.perf_counter() - started:.1f}s")
+    return total_rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate simulated restaurant order data")
+    parser.add_argument('--output', default=OUTPUT_FILE, help="output CSV (default: %(default)s)")
+    parser.add_argument('--start', default=START_DATE.strftime('%Y-%m-%d'), help="first day, YYYY-MM-DD (default: %(default)s)")
+    parser.add_argument('--days', type=int, default=DAYS_TO_SIMULATE, help="days to simulate (default: %(default)s)")
+    parser.add_argument('--stores', type=int, default=NUM_STORES, help="independent stores (default: %(default)s)")
+    parser.add_argument('--seed', type=int, default=None, help="random seed for a reproducible dataset")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help="rows per written chunk (default: %(default)s)")
+    args = parser.parse_args(argv)
+    generate_data(args.output, datetime.strptime(args.start, '%Y-%m-%d'), args.days, args.stores, args.seed, args.chunk_rows)
+
 
 if __name__ == "__main__":
-    generate_data()
+    main()
@@ -0,0 +1,228 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from urllib.parse import urlencode
+
+from analytics_server import HOST, PORT
+from order_search import AUTO_MODEL
+
+# Load test for analytics_server.py
+# Opens --clients keep-alive connections and has each one send requests back
+# to back for --duration seconds (or until --requests in total), drawn at
+# random from a mix of aggregate, forecast and forecast-month queries over
+# the server's dishes, levels and models. Reports throughput, latency
+# percentiles per endpoint, the share of responses served from the response
+# cache and any errors. --spawn starts a server for the run and stops it after.
+
+CLIENTS = 16
+DURATION = 10.0
+SEED = 42
+# Relative weights of the endpoints in the request mix
+MIX = {'/aggregate': 6, '/forecast': 3, '/forecast/month': 1}
+STARTUP_TIMEOUT = 60.0
+
+
+async def http_get(reader, writer, host, target):
+    """Send one GET on an open keep-alive connection; returns (status, headers, body)."""
+    writer.write(f"GET {target} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode())
+    await writer.drain()
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("server closed the connection")
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers.get('content-length', 0)))
+    return status, headers, body
+
+
+async def fetch_json(host, port, target):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        status, _, body = await http_get(reader, writer, host, target)
+    finally:
+        writer.close()
+    if status != 200:
+        raise RuntimeError(f"{target} returned {status}: {body.decode(errors='replace')}")
+    return json.loads(body)
+
+
+def request_mix(catalog, models, rng, mix=MIX):
+    """Endless stream of (endpoint, target) drawn from ``mix`` over the server's catalog."""
+    endpoints = list(mix)
+    weights = [mix[e] for e in endpoints]
+    while True:
+        endpoint = rng.choices(endpoints, weights)[0]
+        dish = rng.choice(catalog['dishes'])
+        if endpoint == '/aggregate':
+            query = {'dish': dish, 'level': rng.choice(catalog['levels']), 'month': rng.choice([0] * 3 + list(range(1, 13)))}
+        elif endpoint == '/forecast':
+            query = {'dish': dish, 'level': rng.choice(catalog['levels']), 'model': rng.choice(models)}
+        else:
+            # The next month is always inside the drill-down horizon
+            query = {'dish': dish, 'model': rng.choice(models), 'month': rng.choice(catalog['next_months'])}
+        yield endpoint, f"{endpoint}?{urlencode(query)}"
+
+
+async def client(host, port, requests, deadline, budget, results):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for endpoint, target in requests:
+            if time.perf_counter() >= deadline or budget[0] <= 0:
+                break
+            budget[0] -= 1
+            started = time.perf_counter()
+            try:
+                status, headers, _ = await http_get(reader, writer, host, target)
+            except (ConnectionError, asyncio.IncompleteReadError) as e:
+                results.append((endpoint, time.perf_counter() - started, f"{type(e).__name__}", None))
+                writer.close()
+                reader, writer = await asyncio.open_connection(host, port)
+                continue
+            results.append((endpoint, time.perf_counter() - started, status, headers.get('x-cache')))
+    finally:
+        writer.close()
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return float('nan')
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def summarize(results, seconds):
+    def latency(rows):
+        values = sorted(r[1] for r in rows)
+        return {'count': len(values), 'p50_ms': percentile(values, 0.50) * 1000,
+                'p95_ms': percentile(values, 0.95) * 1000, 'p99_ms': percentile(values, 0.99) * 1000,
+                'max_ms': values[-1] * 1000 if values else float('nan'),
+                'mean_ms': statistics.fmean(values) * 1000 if values else float('nan')}
+
+    by_endpoint = {}
+    for endpoint in sorted({r[0] for r in results}):
+        rows = [r for r in results if r[0] == endpoint]
+        cached = [r for r in rows if r[3] is not None]
+        by_endpoint[endpoint] = {**latency(rows),
+                                 'cache_hit_rate': sum(r[3] == 'HIT' for r in cached) / len(cached) if cached else None}
+    statuses = {}
+    for r in results:
+        statuses[str(r[2])] = statuses.get(str(r[2]), 0) + 1
+    return {'requests': len(results), 'seconds': seconds,
+            'throughput_rps': len(results) / seconds if seconds else float('nan'),
+            'errors': sum(r[2] != 200 for r in results), 'statuses': statuses,
+            'overall': latency(results), 'endpoints': by_endpoint}
+
+
+def print_summary(summary, clients):
+    print(f"{summary['requests']} requests from {clients} clients in {summary['seconds']:.2f}s: "
+          f"{summary['throughput_rps']:.1f} req/s, {summary['errors']} errors")
+    print(f"  {'endpoint':<17} {'count':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>9} {'cache hits':>10}")
+    rows = list(summary['endpoints'].items()) + [('(all)', summary['overall'])]
+    for endpoint, s in rows:
+        hit_rate = s.get('cache_hit_rate')
+        hits = f"{hit_rate:.0%}" if hit_rate is not None else ""
+        print(f"  {endpoint:<17} {s['count']:>6} {s['p50_ms']:>8.2f} {s['p95_ms']:>8.2f} {s['p99_ms']:>8.2f} "
+              f"{s['max_ms']:>9.2f} {hits:>10}")
+    if summary['errors']:
+        print(f"  statuses: {summary['statuses']}")
+
+
+async def run_load(host, port, clients=CLIENTS, duration=DURATION, total=None, models=None, seed=SEED):
+    catalog = await fetch_json(host, port, '/dishes')
+    # "Auto" runs a full order search per series on its first request, so it is only included on request
+    models = models or [m for m in catalog['models'] if m != AUTO_MODEL]
+    unknown = set(models) - set(catalog['models'])
+    if unknown:
+        raise ValueError(f"server does not offer model(s): {', '.join(sorted(unknown))}")
+    # The drill-down shows the month after the last day with orders
+    last = (await fetch_json(host, port, '/aggregate?level=Daily'))['dates'][-1]
+    catalog['next_months'] = [int(last[5:7]) % 12 + 1]
+
+    rng = random.Random(seed)
+    before = await fetch_json(host, port, '/stats')
+    results = []
+    budget = [total if total is not None else float('inf')]
+    started = time.perf_counter()
+    deadline = started + duration if duration else float('inf')
+    streams = [request_mix(catalog, models, random.Random(rng.random())) for _ in range(clients)]
+    await asyncio.gather(*(client(host, port, stream, deadline, budget, results) for stream in streams))
+    summary = summarize(results, time.perf_counter() - started)
+    after = await fetch_json(host, port, '/stats')
+    summary['server'] = {'pool_fits': after['pool_fits'] - before['pool_fits'],
+                         'pool_fit_seconds': after['pool_fit_seconds'] - before['pool_fit_seconds']}
+    return summary
+
+
+def spawn_server(host, port, server_args):
+    """Start analytics_server.py and wait until it answers /health."""
+    try:
+        asyncio.run(fetch_json(host, port, '/health'))
+    except OSError:
+        pass
+    else:
+        raise RuntimeError(f"a server is already listening on {host}:{port}")
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'analytics_server.py')
+    process = subprocess.Popen([sys.executable, script, '--host', host, '--port', str(port)] + server_args)
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with code {process.returncode}")
+        try:
+            asyncio.run(fetch_json(host, port, '/health'))
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"server did not start within {STARTUP_TIMEOUT:.0f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure analytics_server.py throughput under concurrent clients.")
+    parser.add_argument('--host', default=HOST, help="server address (default: %(default)s)")
+    parser.add_argument('--port', type=int, default=PORT, help="server port (default: %(default)s)")
+    parser.add_argument('--clients', type=int, default=CLIENTS, help="concurrent connections (default: %(default)s)")
+    parser.add_argument('--duration', type=float, default=DURATION, help="seconds to run (default: %(default)s)")
+    parser.add_argument('--requests', type=int, default=None, help="stop after this many requests in total")
+    parser.add_argument('--models', nargs='+', default=None, help="models to request (default: all the server offers except Auto)")
+    parser.add_argument('--seed', type=int, default=SEED, help="request mix seed (default: %(default)s)")
+    parser.add_argument('--output', default=None, help="also write the summary as JSON to this file")
+    parser.add_argument('--spawn', action='store_true', help="start a server for the run and stop it afterwards")
+    parser.add_argument('--server-args', nargs=argparse.REMAINDER, default=[],
+                        help="with --spawn, remaining arguments are passed to analytics_server.py")
+    args = parser.parse_args(argv)
+
+    process = spawn_server(args.host, args.port, args.server_args) if args.spawn else None
+    try:
+        summary = asyncio.run(run_load(args.host, args.port, args.clients, args.duration, args.requests,
+                                       args.models, args.seed))
+    except (OSError, RuntimeError, ValueError) as e:
+        print(f"Load test failed: {e}")
+        return 1
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    summary['clients'] = args.clients
+    print_summary(summary, args.clients)
+    print(f"  server: {summary['server']['pool_fits']} pool fits, {summary['server']['pool_fit_seconds']:.1f}s fitting")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(f"Saved {args.output}")
+    return 1 if summary['errors'] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
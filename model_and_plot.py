@@ -1,102 +1,481 @@
+import argparse
+import os
+import time
+from concurrent.futures import as_completed
+
 import pandas as pd
 import matplotlib.pyplot as plt
-from statsmodels.tsa.arima.model import ARIMA
 from sklearn.metrics import mean_squared_error
 import numpy as np
 import warnings
 
+from analytics_engine import model_label
+from baselines import BASELINE_MODELS, BaselineResult, forecast_matrix
+from compact_model import CompactOrders, load_compact_data
+from data_loader import load_restaurant_data
+from forecasting import (DEFAULT_MODEL, DRIFT_THRESHOLD, MODEL_SPECS, REFIT_EVERY, describe_spec, fit_model,
+                         forecast_series_task, load_model_state, process_pool, save_model_state, series_fingerprint,
+                         update_model_state)
+from generate_restaurant_data import INGREDIENTS, MENU
+from order_search import AUTO_MODEL, OrderCache, auto_forecast_series_task
+from order_cube import OrderCube
+from profiling import PROFILER
+from report import (REPORT_DIR, deferred_chart, dish_charts, future_chart, holdout_chart, ingredient_charts, overview_charts,
+                    render_report)
+from stock_projection import STOCK_PROJECTION_FILE, dish_forecast_frame, run_projection
+
 warnings.filterwarnings("ignore")
 
-# Load Data
 DATA_FILE = 'restaurant_data.csv'
-df = pd.read_csv(DATA_FILE)
-df['Date'] = pd.to_datetime(df['Date'])
-
-# 1. Aggregate Data: Daily Order Counts
-daily_orders = df.groupby('Date')['Order_ID'].nunique().reset_index()
-daily_orders.columns = ['Date', 'Order_Count']
-daily_orders = daily_orders.set_index('Date')
-daily_orders = daily_orders.asfreq('D').fillna(0) # Ensure continuous time series
-
-# 2. Aggregate Data: Ingredient Usage (Example: Pizza Dough)
-ingredient_usage = df.groupby(['Date', 'Ingredient_Name'])['Quantity_Used'].sum().reset_index()
-pizza_dough_usage = ingredient_usage[ingredient_usage['Ingredient_Name'] == 'Pizza Dough'].set_index('Date')['Quantity_Used']
-pizza_dough_usage = pizza_dough_usage.asfreq('D').fillna(0)
-
-# --- Visualizations ---
-
-# Plot 1: Daily Order Count History
-plt.figure(figsize=(12, 6))
-plt.plot(daily_orders.index, daily_orders['Order_Count'], label='Daily Orders', color='blue')
-plt.title('Daily Restaurant Orders (1 Year)')
-plt.xlabel('Date')
-plt.ylabel('Number of Orders')
-plt.legend()
-plt.grid(True)
-plt.savefig('daily_orders_history.png')
-print("Saved daily_orders_history.png")
-
-# Plot 2: Stock Levels (Example: Pizza Dough)
-# We need to take the last stock value of the day for a proper stock level plot
-daily_stock = df.sort_values(['Date', 'Order_ID']).groupby(['Date', 'Ingredient_Name'])['Stock_Available'].last().unstack()
-if 'Pizza Dough' in daily_stock.columns:
+BATCH_OUTPUT_FILE = 'batch_forecasts.csv'
+CHUNK_SIZE = 1_000_000
+
+
+def load_data(data_file):
+    """The CSV as a CompactOrders, or as the full table if its rows don't fit the compact model."""
+    try:
+        return load_compact_data(data_file)[0]
+    except ValueError as e:
+        print(f"Using the full table instead of the compact model: {e}")
+        return load_restaurant_data(data_file)
+
+
+def order_cube(data):
+    if isinstance(data, CompactOrders):
+        return OrderCube.from_compact(data)
+    return OrderCube.from_frame(data)
+
+
+def build_aggregates(data):
+    if isinstance(data, CompactOrders):
+        # Bincounts and a recipe product; same frames as the full-table path below
+        return data.daily_orders(), data.ingredient_usage(), data.daily_stock()
+    df = data
+
+    # 1. Aggregate Data: Daily Order Counts
+    daily_orders = df.groupby('Date')['Order_ID'].nunique().reset_index()
+    daily_orders.columns = ['Date', 'Order_Count']
+    daily_orders = daily_orders.set_index('Date')
+    daily_orders = daily_orders.asfreq('D').fillna(0) # Ensure continuous time series
+
+    # 2. Aggregate Data: Ingredient Usage
+    ingredient_usage = df.groupby(['Date', 'Ingredient_Name'])['Quantity_Used'].sum().reset_index()
+
+    # 3. Stock Levels
+    # We need to take the last stock value of the day for a proper stock level plot
+    daily_stock = df.sort_values(['Date', 'Order_ID']).groupby(['Date', 'Ingredient_Name'])['Stock_Available'].last().unstack()
+    return daily_orders, ingredient_usage, daily_stock
+
+
+def build_aggregates_chunked(data_file, chunksize=CHUNK_SIZE):
+    """Same three aggregates as build_aggregates, streamed from the CSV in one pass.
+
+    Only per-chunk partial aggregates are kept, plus the distinct orders of the
+    latest date seen, so peak memory follows the aggregate size rather than the
+    raw row count. Rows must be grouped by date (as the generator and the daily
+    append write them); an order split across a chunk boundary is still counted
+    once because that date stays open until a later date shows up.
+    """
+    reader = pd.read_csv(data_file, chunksize=chunksize,
+                         usecols=['Date', 'Order_ID', 'Ingredient_Name', 'Quantity_Used', 'Stock_Available'],
+                         dtype={'Order_ID': str, 'Ingredient_Name': str, 'Quantity_Used': 'float64', 'Stock_Available': 'float64'},
+                         parse_dates=['Date'], date_format='%Y-%m-%d')
+
+    count_parts, usage_parts, stock_parts = [], [], []
+    open_orders = None  # distinct (Date, Order_ID) of the newest date, not yet final
+    closed_through = None
+    for chunk in reader:
+        if closed_through is not None and (chunk['Date'] <= closed_through).any():
+            raise ValueError(f"{data_file} is not grouped by date; use the in-memory path instead of --chunksize")
+
+        # 1. Distinct orders per day; every date before the chunk's newest one is final
+        pairs = chunk[['Date', 'Order_ID']].drop_duplicates()
+        if open_orders is not None:
+            pairs = pd.concat([open_orders, pairs]).drop_duplicates()
+        newest = pairs['Date'].max()
+        closed = pairs[pairs['Date'] < newest]
+        if len(closed):
+            count_parts.append(closed.groupby('Date').size())
+            closed_through = closed['Date'].max()
+        open_orders = pairs[pairs['Date'] == newest]
+
+        # 2. Ingredient usage sums add up across chunks
+        usage_parts.append(chunk.groupby(['Date', 'Ingredient_Name'])['Quantity_Used'].sum())
+
+        # 3. Last stock per day by (Date, Order_ID) order, keeping the Order_ID to merge chunks
+        last = chunk.sort_values(['Date', 'Order_ID'], kind='stable').groupby(['Date', 'Ingredient_Name'])[['Order_ID', 'Stock_Available']].last()
+        stock_parts.append(last.reset_index())
+
+    if open_orders is not None and len(open_orders):
+        count_parts.append(open_orders.groupby('Date').size())
+    if not count_parts:
+        raise ValueError(f"{data_file} has no rows")
+
+    daily_orders = pd.concat(count_parts).groupby(level=0).sum().rename('Order_Count').to_frame()
+    daily_orders.index.name = 'Date'
+    daily_orders = daily_orders.asfreq('D').fillna(0) # Ensure continuous time series
+
+    ingredient_usage = pd.concat(usage_parts).groupby(level=[0, 1]).sum().reset_index()
+
+    stock = pd.concat(stock_parts, ignore_index=True)
+    daily_stock = stock.sort_values(['Date', 'Order_ID'], kind='stable').groupby(['Date', 'Ingredient_Name'])['Stock_Available'].last().unstack()
+    return daily_orders, ingredient_usage, daily_stock
+
+
+def plot_history(daily_orders):
+    # Plot 1: Daily Order Count History
     plt.figure(figsize=(12, 6))
-    plt.plot(daily_stock.index, daily_stock['Pizza Dough'], label='Pizza Dough Stock', color='green')
-    plt.title('Pizza Dough Stock Level Over Time')
+    plt.plot(daily_orders.index, daily_orders['Order_Count'], label='Daily Orders', color='blue')
+    plt.title('Daily Restaurant Orders (1 Year)')
     plt.xlabel('Date')
-    plt.ylabel('Stock (balls)')
+    plt.ylabel('Number of Orders')
     plt.legend()
     plt.grid(True)
-    plt.savefig('stock_level_pizza_dough.png')
-    print("Saved stock_level_pizza_dough.png")
-
-# --- Time Series Modeling (ARIMA) ---
-
-# Split into Train and Test
-train_size = int(len(daily_orders) * 0.9)
-train, test = daily_orders.iloc[:train_size], daily_orders.iloc[train_size:]
-
-print(f"Training samples: {len(train)}, Testing samples: {len(test)}")
-
-# Fit ARIMA Model
-# Using order=(5,1,0) as a starting point. simpler models are often better for random data.
-# (p,d,q): p=AR order, d=Differencing, q=MA order
-model = ARIMA(train['Order_Count'], order=(5,1,0))
-model_fit = model.fit()
-
-# Forecast
-forecast_result = model_fit.forecast(steps=len(test))
-forecast = forecast_result # pandas Series with index matching test
-
-# Calculate Error
-rmse = np.sqrt(mean_squared_error(test['Order_Count'], forecast))
-print(f"Test RMSE: {rmse:.3f}")
-
-# Plot 3: Forecast vs Actual
-plt.figure(figsize=(12, 6))
-plt.plot(train.index, train['Order_Count'], label='Training Data')
-plt.plot(test.index, test['Order_Count'], label='Actual Valid Data', color='green')
-plt.plot(test.index, forecast, label='Forecast', color='red', linestyle='--')
-plt.title(f'Order Forecast using ARIMA (RMSE: {rmse:.2f})')
-plt.xlabel('Date')
-plt.ylabel('Number of Orders')
-plt.legend()
-plt.grid(True)
-plt.savefig('forecast_vs_actual.png')
-print("Saved forecast_vs_actual.png")
-
-# Future Forecast (Next 30 Days)
-future_model = ARIMA(daily_orders['Order_Count'], order=(5,1,0)).fit()
-future_forecast = future_model.forecast(steps=30)
-
-# Plot 4: Future Forecast
-plt.figure(figsize=(12, 6))
-plt.plot(daily_orders.index, daily_orders['Order_Count'], label='Historical Data')
-plt.plot(future_forecast.index, future_forecast, label='30-Day Forecast', color='orange', linestyle='--')
-plt.title('Future Order Forecast (Next 30 Days)')
-plt.xlabel('Date')
-plt.ylabel('Number of Orders')
-plt.legend()
-plt.grid(True)
-plt.savefig('future_forecast.png')
-print("Saved future_forecast.png")
+    with PROFILER.span('redraw', figure='daily_orders_history'):
+        plt.savefig('daily_orders_history.png')
+    print("Saved daily_orders_history.png")
+
+
+def plot_stock(daily_stock):
+    # Plot 2: Stock Levels (Example: Pizza Dough)
+    if 'Pizza Dough' in daily_stock.columns:
+        plt.figure(figsize=(12, 6))
+        plt.plot(daily_stock.index, daily_stock['Pizza Dough'], label='Pizza Dough Stock', color='green')
+        plt.title('Pizza Dough Stock Level Over Time')
+        plt.xlabel('Date')
+        plt.ylabel('Stock (balls)')
+        plt.legend()
+        plt.grid(True)
+        with PROFILER.span('redraw', figure='stock_level_pizza_dough'):
+            plt.savefig('stock_level_pizza_dough.png')
+        print("Saved stock_level_pizza_dough.png")
+
+
+def model_spec(model_name, series, name):
+    """MODEL_SPECS entry, or for "Auto" the order searched for ``series`` (cached under ``name``)."""
+    if model_name != AUTO_MODEL:
+        return MODEL_SPECS[model_name]
+    return OrderCache().get_or_search(name, "Daily", series)
+
+
+def holdout_forecast(daily_orders, model_name=DEFAULT_MODEL):
+    # --- Time Series Modeling (ARIMA) ---
+
+    # Split into Train and Test
+    train_size = int(len(daily_orders) * 0.9)
+    train, test = daily_orders.iloc[:train_size], daily_orders.iloc[train_size:]
+
+    print(f"Training samples: {len(train)}, Testing samples: {len(test)}")
+
+    # Fit ARIMA Model
+    # (p,d,q): p=AR order, d=Differencing, q=MA order. The default (5,1,0) is a
+    # fixed starting point; "Auto" searches the order on the training data only.
+    if model_name in BASELINE_MODELS:
+        model_fit = BaselineResult(model_name, train['Order_Count'])
+    else:
+        model_fit = fit_model(train['Order_Count'], model_spec(model_name, train['Order_Count'], 'daily_orders_holdout'))
+
+    # Forecast
+    with PROFILER.span('forecast', steps=len(test)):
+        forecast_result = model_fit.forecast(steps=len(test))
+    forecast = forecast_result # pandas Series with index matching test
+
+    # Calculate Error
+    rmse = np.sqrt(mean_squared_error(test['Order_Count'], forecast))
+    label = model_label(model_name, model_fit)
+    print(f"Test RMSE: {rmse:.3f} ({label})")
+    for name, baseline_rmse in baseline_rmses(train['Order_Count'], test['Order_Count']).items():
+        print(f"  vs {name}: {baseline_rmse:.3f}")
+    return train, test, forecast, rmse, label
+
+
+def baseline_rmses(train, test):
+    """Holdout RMSE of every NumPy baseline, for comparison with the fitted model."""
+    actual = test.to_numpy(dtype='float64')
+    return {name: float(np.sqrt(np.mean((forecast_matrix(name, train.to_numpy(dtype='float64'), len(actual))[0] - actual) ** 2)))
+            for name in BASELINE_MODELS}
+
+
+def evaluate_holdout(daily_orders, model_name=DEFAULT_MODEL):
+    train, test, forecast, rmse, label = holdout_forecast(daily_orders, model_name)
+
+    # Plot 3: Forecast vs Actual
+    plt.figure(figsize=(12, 6))
+    plt.plot(train.index, train['Order_Count'], label='Training Data')
+    plt.plot(test.index, test['Order_Count'], label='Actual Valid Data', color='green')
+    plt.plot(test.index, forecast, label='Forecast', color='red', linestyle='--')
+    plt.title(f'Order Forecast using {label} (RMSE: {rmse:.2f})')
+    plt.xlabel('Date')
+    plt.ylabel('Number of Orders')
+    plt.legend()
+    plt.grid(True)
+    with PROFILER.span('redraw', figure='forecast_vs_actual'):
+        plt.savefig('forecast_vs_actual.png')
+    print("Saved forecast_vs_actual.png")
+
+
+def future_forecast(daily_orders, state_file=None, refit_every=REFIT_EVERY, drift_threshold=DRIFT_THRESHOLD,
+                    model_name=DEFAULT_MODEL):
+    # Future Forecast (Next 30 Days)
+    if model_name in BASELINE_MODELS:
+        # Nothing fitted, so there is no model state to keep
+        future_model = BaselineResult(model_name, daily_orders['Order_Count'])
+    elif state_file:
+        # Extend last run's fit with the new days (Kalman filter pass) unless a refit is due
+        previous = load_model_state(state_file)
+        spec = model_spec(model_name, daily_orders['Order_Count'], 'daily_orders')
+        state, action = update_model_state(previous, daily_orders['Order_Count'], spec,
+                                           refit_every, drift_threshold)
+        save_model_state(state_file, state)
+        future_model = state['result']
+        print(f"Future model: {'full refit' if action == 'refit' else 'filtered with saved parameters'} "
+              f"({len(daily_orders) - state['fit_len']} day(s) since last full fit)")
+    else:
+        future_model = fit_model(daily_orders['Order_Count'], model_spec(model_name, daily_orders['Order_Count'], 'daily_orders'))
+    with PROFILER.span('forecast', steps=30):
+        return future_model.forecast(steps=30)
+
+
+def plot_future(daily_orders, state_file=None, refit_every=REFIT_EVERY, drift_threshold=DRIFT_THRESHOLD,
+                model_name=DEFAULT_MODEL):
+    forecast = future_forecast(daily_orders, state_file, refit_every, drift_threshold, model_name)
+
+    # Plot 4: Future Forecast
+    plt.figure(figsize=(12, 6))
+    plt.plot(daily_orders.index, daily_orders['Order_Count'], label='Historical Data')
+    plt.plot(forecast.index, forecast, label='30-Day Forecast', color='orange', linestyle='--')
+    plt.title('Future Order Forecast (Next 30 Days)')
+    plt.xlabel('Date')
+    plt.ylabel('Number of Orders')
+    plt.legend()
+    plt.grid(True)
+    with PROFILER.span('redraw', figure='future_forecast'):
+        plt.savefig('future_forecast.png')
+    print("Saved future_forecast.png")
+
+
+# --- Batch Forecasting (every dish and every ingredient) ---
+
+def batch_series(data, series_types=('dish', 'ingredient')):
+    """Daily series for every dish in MENU and every ingredient in INGREDIENTS.
+
+    All series share one calendar (first to last day in the data) so the
+    forecasts line up. Dishes/ingredients with no history come back as zeros.
+    ``series_types`` limits the result to dishes or ingredients.
+    """
+    cube = order_cube(data)
+    dates = pd.DatetimeIndex(cube.dates, freq='D', name='Date')
+
+    if isinstance(data, CompactOrders):
+        usage = pd.DataFrame(data.usage(), index=dates, columns=data.ingredients)
+    else:
+        usage = data.groupby(['Date', 'Ingredient_Name'])['Quantity_Used'].sum().unstack()
+    usage = usage.reindex(index=dates, columns=list(INGREDIENTS)).fillna(0)
+
+    series = []
+    for dish in (MENU if 'dish' in series_types else ()):
+        values = cube.daily_series(dish).values if dish in cube.dishes else np.zeros(len(dates))
+        series.append(('dish', dish, values))
+    for ingredient in (INGREDIENTS if 'ingredient' in series_types else ()):
+        series.append(('ingredient', ingredient, usage[ingredient].to_numpy(dtype='float64')))
+    return dates, series
+
+
+def baseline_batch(dates, series, model_name, steps):
+    """Forecast every series with a NumPy baseline in one batched call (no process pool needed)."""
+    print(f"Batch forecasting {len(series)} series with {model_name} in one array computation...")
+    started = time.perf_counter()
+    forecasts = forecast_matrix(model_name, np.vstack([values for _, _, values in series]), steps)
+    index = pd.date_range(dates[-1], periods=steps + 1, freq='D')[1:]
+    seconds = (time.perf_counter() - started) / len(series)
+    return [{'series_type': kind, 'name': name, 'forecast': pd.Series(values, index=index), 'error': None,
+             'seconds': seconds}
+            for (kind, name, _), values in zip(series, forecasts)]
+
+
+def fit_batch(dates, series, model_name, steps, workers):
+    """Fit every series across a process pool, one series per task.
+
+    For "Auto", orders found by earlier runs (OrderCache, keyed like the
+    single-series path) are reused; only the series without one are searched.
+    """
+    tasks = []
+    if model_name == AUTO_MODEL:
+        order_cache = OrderCache()
+        daily = {name: pd.Series(values, index=dates) for _, name, values in series}
+        for kind, name, values in series:
+            spec = order_cache.lookup(name, "Daily", daily[name])
+            if spec is None:
+                tasks.append((auto_forecast_series_task, (kind, name, dates[0], values, 'aic', steps), None))
+            else:
+                tasks.append((forecast_series_task, (kind, name, dates[0], values, spec, steps), spec))
+        description = f"per-series auto orders ({order_cache.hits} cached)"
+    else:
+        spec = MODEL_SPECS[model_name]
+        tasks = [(forecast_series_task, (kind, name, dates[0], values, spec, steps), None)
+                 for kind, name, values in series]
+        description = describe_spec(spec)
+
+    print(f"Batch forecasting {len(tasks)} series with {description} on {workers} worker(s)...")
+    outcomes = []
+    with process_pool(workers) as pool:
+        futures = {pool.submit(task_fn, task): spec for task_fn, task, spec in tasks}
+        for future in as_completed(futures):
+            outcome = future.result()
+            outcomes.append(outcome)
+            if futures[future] is not None:
+                outcome['spec'] = futures[future]
+            if outcome.get('search') is not None:
+                order_cache.store(outcome['name'], "Daily", daily[outcome['name']], outcome['search'])
+            if outcome['error']:
+                print(f"  FAILED {outcome['series_type']} '{outcome['name']}' after {outcome['seconds']:.2f}s: {outcome['error']}")
+            else:
+                chosen = f" with {describe_spec(outcome['spec'])}" if outcome.get('spec') else ""
+                print(f"  fitted {outcome['series_type']} '{outcome['name']}'{chosen} in {outcome['seconds']:.2f}s")
+    return outcomes
+
+
+def run_batch(data, output_file=BATCH_OUTPUT_FILE, model_name=DEFAULT_MODEL, steps=30, workers=None,
+              series_types=('dish', 'ingredient')):
+    """Forecast every dish/ingredient series and write them to ``output_file`` (None: only return the outcomes).
+
+    Fitted models run across a process pool, one series per task ("Auto"
+    searches each series' order first); NumPy baselines do all series at once.
+    """
+    dates, series = batch_series(data, series_types)
+    if len(dates) == 0:
+        print("No data to forecast.")
+        return []
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+    if model_name in BASELINE_MODELS:
+        outcomes = baseline_batch(dates, series, model_name, steps)
+    else:
+        outcomes = fit_batch(dates, series, model_name, steps, workers)
+
+    frames = []
+    for outcome in outcomes:
+        if outcome['forecast'] is None:
+            continue
+        frames.append(pd.DataFrame({
+            'Series_Type': outcome['series_type'],
+            'Series_Name': outcome['name'],
+            'Date': outcome['forecast'].index,
+            'Forecast': outcome['forecast'].values,
+        }))
+    if frames and output_file:
+        result = pd.concat(frames, ignore_index=True).sort_values(['Series_Type', 'Series_Name', 'Date'])
+        result.to_csv(output_file, index=False, date_format='%Y-%m-%d')
+
+    failed = sum(1 for o in outcomes if o['error'])
+    fit_total = sum(o['seconds'] for o in outcomes)
+    print(f"Batch done in {time.perf_counter() - started:.2f}s wall ({fit_total:.2f}s total fit time), "
+          f"{len(outcomes) - failed} ok, {failed} failed." + (f" Saved {output_file}" if output_file else ""))
+    return outcomes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Restaurant order analysis and forecasting")
+    parser.add_argument('--data', default=DATA_FILE, help="input CSV (default: %(default)s)")
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help="stream the CSV in chunks of this many rows instead of loading it whole")
+    parser.add_argument('--model-state', default=None,
+                        help="file keeping the future-forecast model between runs, so new days update it instead of refitting")
+    parser.add_argument('--refit-every', type=int, default=REFIT_EVERY,
+                        help="with --model-state, refit after this many new days (default: %(default)s)")
+    parser.add_argument('--drift-threshold', type=float, default=DRIFT_THRESHOLD,
+                        help="with --model-state, refit when new-day error exceeds this multiple of the fit error (default: %(default)s)")
+    parser.add_argument('--batch', action='store_true',
+                        help="forecast every dish and ingredient in parallel instead of the default charts")
+    parser.add_argument('--output', default=BATCH_OUTPUT_FILE, help="batch forecast output CSV (default: %(default)s)")
+    parser.add_argument('--model', default=DEFAULT_MODEL, choices=list(MODEL_SPECS) + [AUTO_MODEL] + list(BASELINE_MODELS),
+                        help="forecast model; \"Auto\" searches the ARIMA order per series (default: %(default)s)")
+    parser.add_argument('--steps', type=int, default=30, help="batch forecast horizon in days (default: %(default)s)")
+    parser.add_argument('--workers', type=int, default=None, help="batch worker processes (default: all cores)")
+    parser.add_argument('--project-stock', action='store_true',
+                        help="forecast every dish, turn the forecasts into ingredient demand and project stock-out dates")
+    parser.add_argument('--projection-output', default=STOCK_PROJECTION_FILE,
+                        help="stock projection summary CSV (default: %(default)s)")
+    parser.add_argument('--report', action='store_true',
+                        help="render the charts plus per-dish and per-ingredient charts in parallel, skipping unchanged ones")
+    parser.add_argument('--report-dir', default=REPORT_DIR, help="report output directory (default: %(default)s)")
+    parser.add_argument('--force', action='store_true', help="with --report, re-render charts even if unchanged")
+    parser.add_argument('--profile', default=None,
+                        help="record timing spans and write them here (Chrome trace, or plain JSON for *.spans.json)")
+    args = parser.parse_args(argv)
+
+    if args.profile:
+        PROFILER.enable()
+    PROFILER.begin_interaction('model_and_plot')
+    try:
+        run(args)
+    finally:
+        if args.profile:
+            PROFILER.export(args.profile)
+            print(f"Timing breakdown: {PROFILER.breakdown_text()}")
+            print(f"Saved {args.profile}")
+
+
+def run(args):
+    if args.batch:
+        # Load Data
+        with PROFILER.span('data load'):
+            data = load_data(args.data)
+        run_batch(data, args.output, args.model, args.steps, args.workers)
+        return
+
+    if args.project_stock:
+        with PROFILER.span('data load'):
+            data = load_data(args.data)
+        # Only the dish series are fitted; ingredient demand comes from the recipes. The
+        # forecasts feed the projection only, so --output (the full batch file) is left alone
+        outcomes = run_batch(data, None, args.model, args.steps, args.workers, series_types=('dish',))
+        daily_stock = build_aggregates(data)[2]
+        with PROFILER.span('stock projection', steps=args.steps):
+            run_projection(dish_forecast_frame(outcomes), daily_stock, args.projection_output)
+        return
+
+    data = None
+    if args.chunksize:
+        with PROFILER.span('aggregate', chunksize=args.chunksize):
+            daily_orders, ingredient_usage, daily_stock = build_aggregates_chunked(args.data, args.chunksize)
+    else:
+        # Load Data
+        with PROFILER.span('data load'):
+            data = load_data(args.data)
+        with PROFILER.span('aggregate'):
+            daily_orders, ingredient_usage, daily_stock = build_aggregates(data)
+
+    if args.report:
+        run_report(args, data, daily_orders, ingredient_usage, daily_stock)
+        return
+
+    # --- Visualizations ---
+    plot_history(daily_orders)
+    plot_stock(daily_stock)
+    evaluate_holdout(daily_orders, args.model)
+    plot_future(daily_orders, args.model_state, args.refit_every, args.drift_threshold, args.model)
+
+
+def run_report(args, data, daily_orders, ingredient_usage, daily_stock):
+    # Models are fitted here, and only for forecast charts whose inputs changed since
+    # the last render; only the drawing is spread over the workers
+    inputs = [args.model, series_fingerprint(daily_orders['Order_Count'])]
+    specs = overview_charts(daily_orders, daily_stock)
+    specs.append(deferred_chart('forecast_vs_actual.png', inputs,
+                                lambda: holdout_chart(holdout_forecast(daily_orders, args.model))))
+    specs.append(deferred_chart('future_forecast.png', inputs + [args.refit_every, args.drift_threshold],
+                                lambda: future_chart(daily_orders, future_forecast(
+                                    daily_orders, args.model_state, args.refit_every, args.drift_threshold, args.model))))
+    if data is not None:
+        cube = order_cube(data)
+        specs += dish_charts({dish: cube.daily_series(dish) for dish in cube.dishes})
+    else:
+        print("Per-dish charts need the full table; skipped with --chunksize.")
+    specs += ingredient_charts(ingredient_usage, daily_stock)
+    with PROFILER.span('redraw', charts=len(specs)):
+        render_report(specs, args.report_dir, args.workers, args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+import numpy as np
+import pandas as pd
+
+ALL_ORDERS = "All Orders"
+
+# Bucket labels match pandas resample: weeks end on Sunday, months on month end
+AGG_FREQS = {"Daily": 'D', "Weekly": 'W-SUN', "Monthly": 'ME'}
+
+
+class OrderCube:
+    """Dense dish x day matrix of distinct order counts.
+
+    Row 0 is "All Orders" (distinct Order_IDs per day across every dish), the
+    remaining rows follow ``dishes``. Columns are consecutive calendar days
+    starting at ``start``. A running cumulative sum per row turns any weekly or
+    monthly bucket into two lookups, so views never go back to the long table.
+    """
+
+    def __init__(self, start, dishes, counts):
+        self.start = np.datetime64(start, 'D')
+        self._set_dishes(dishes)
+        self.counts = np.asarray(counts, dtype=np.int64)
+        # Distinct orders already counted on the newest day, so rows appended
+        # later for the same order (or a repeated Order_ID) are not counted twice
+        self._open_day = -1
+        self._open_orders = set()
+        self._open_dish_orders = set()
+        self._refresh()
+
+    @classmethod
+    def from_frame(cls, df):
+        """Build the cube from the long order/ingredient table."""
+        if len(df) == 0:
+            return cls(np.datetime64('1970-01-01'), [], np.zeros((1, 0), dtype=np.int64))
+
+        days = df['Date'].values.astype('datetime64[D]')
+        start = days.min()
+        day_idx = (days - start).astype(np.int64)
+        n_days = int(day_idx.max()) + 1
+
+        dish_codes, dishes = pd.factorize(df['Dish_Name'], sort=True)
+        order_codes, _ = pd.factorize(df['Order_ID'])
+
+        # One ingredient row per recipe item: reduce to distinct orders first
+        keys = pd.DataFrame({'day': day_idx, 'order': order_codes, 'dish': dish_codes})
+        per_dish = keys.drop_duplicates()
+        per_day = per_dish.drop_duplicates(['day', 'order'])
+
+        n_dishes = len(dishes)
+        counts = np.zeros((n_dishes + 1, n_days), dtype=np.int64)
+        counts[0] = np.bincount(per_day['day'].values, minlength=n_days)
+        flat = per_dish['dish'].values * n_days + per_dish['day'].values
+        counts[1:] = np.bincount(flat, minlength=n_dishes * n_days).reshape(n_dishes, n_days)
+        cube = cls(start, [str(d) for d in dishes], counts)
+
+        last_day = per_dish[per_dish['day'] == n_days - 1]
+        order_names = np.asarray(df['Order_ID'].values[last_day.index], dtype=str)
+        dish_names = np.asarray(dishes, dtype=str)[last_day['dish'].values]
+        cube._remember_open_day(n_days - 1, order_names, dish_names)
+        return cube
+
+    @classmethod
+    def from_compact(cls, compact):
+        """Build the cube from a compact_model.CompactOrders (bincounts over its orders table)."""
+        counts = np.zeros((len(compact.dishes) + 1, compact.n_days), dtype=np.int64)
+        counts[0] = compact.day_counts()
+        counts[1:] = compact.dish_day_counts()
+        cube = cls(compact.start, compact.dishes, counts)
+
+        on_last_day = compact.day == compact.n_days - 1
+        dish_names = np.asarray(compact.dishes, dtype=str)[compact.dish[on_last_day]]
+        cube._remember_open_day(compact.n_days - 1, compact.last_day_orders, dish_names)
+        return cube
+
+    def _set_dishes(self, dishes):
+        self.dishes = list(dishes)
+        self.rows = [ALL_ORDERS] + self.dishes
+        self._row_index = {name: i for i, name in enumerate(self.rows)}
+
+    def _remember_open_day(self, day, order_names, dish_names):
+        if day > self._open_day:
+            self._open_day = day
+            self._open_orders = set()
+            self._open_dish_orders = set()
+        self._open_orders.update(order_names)
+        self._open_dish_orders.update(zip(dish_names, order_names))
+
+    def extend(self, new_rows):
+        """Fold newly appended long-format rows into the counts.
+
+        Work is proportional to the new rows. Rows are expected to arrive in date
+        order (an append-only daily log): orders on the newest day are deduplicated
+        against what was already counted, earlier days are assumed complete.
+        Returns the list of dishes that were not in the cube before.
+        """
+        if len(new_rows) == 0:
+            return []
+        if self.counts.shape[1] == 0:
+            fresh = OrderCube.from_frame(new_rows)
+            added = fresh.dishes
+            self.__dict__.update(fresh.__dict__)
+            return added
+
+        days = new_rows['Date'].values.astype('datetime64[D]')
+        pairs = pd.DataFrame({
+            'day': (days - self.start).astype(np.int64),
+            'order': np.asarray(new_rows['Order_ID'], dtype=str),
+            'dish': np.asarray(new_rows['Dish_Name'], dtype=str),
+        }).drop_duplicates()
+
+        # Grow the matrix for unseen dishes (kept sorted) and days before/after the current span
+        added = sorted(set(pairs['dish']) - set(self.dishes))
+        if added:
+            dishes = sorted(self.dishes + added)
+            counts = np.zeros((len(dishes) + 1, self.counts.shape[1]), dtype=np.int64)
+            counts[0] = self.counts[0]
+            for dish in self.dishes:
+                counts[dishes.index(dish) + 1] = self.counts[self.row(dish)]
+            self._set_dishes(dishes)
+            self.counts = counts
+        lo = min(int(pairs['day'].min()), 0)
+        hi = max(int(pairs['day'].max()) + 1, self.counts.shape[1])
+        if lo < 0 or hi > self.counts.shape[1]:
+            self.counts = np.pad(self.counts, ((0, 0), (-lo, hi - self.counts.shape[1])))
+            self.start = self.start + np.timedelta64(lo, 'D')
+            pairs['day'] -= lo
+            self._open_day -= lo
+
+        on_open_day = (pairs['day'] == self._open_day).values
+        dish_seen = on_open_day & np.array([(d, o) in self._open_dish_orders
+                                            for d, o in zip(pairs['dish'], pairs['order'])], dtype=bool)
+        per_dish = pairs[~dish_seen]
+        per_day = pairs.drop_duplicates(['day', 'order'])
+        order_seen = (per_day['day'] == self._open_day).values & per_day['order'].isin(self._open_orders).values
+        per_day = per_day[~order_seen]
+
+        np.add.at(self.counts[0], per_day['day'].values, 1)
+        row_idx = np.array([self._row_index[d] for d in per_dish['dish']], dtype=np.int64)
+        np.add.at(self.counts, (row_idx, per_dish['day'].values), 1)
+
+        newest = int(pairs['day'].max())
+        if newest >= self._open_day:
+            on_newest = pairs[pairs['day'] == newest]
+            self._remember_open_day(newest, on_newest['order'].values, on_newest['dish'].values)
+
+        self._refresh()
+        return added
+
+    def _refresh(self):
+        n_days = self.counts.shape[1]
+        self.dates = self.start + np.arange(n_days).astype('timedelta64[D]')
+        self._cumsum = np.zeros((self.counts.shape[0], n_days + 1), dtype=np.int64)
+        np.cumsum(self.counts, axis=1, out=self._cumsum[:, 1:])
+        # First/last active day per row, so a dish's series spans only the days it sold
+        active = self.counts > 0
+        has_any = active.any(axis=1)
+        if n_days == 0:
+            self._first = np.zeros(len(self.rows), dtype=np.int64)
+            self._last = np.full(len(self.rows), -1, dtype=np.int64)
+            return
+        self._first = np.where(has_any, active.argmax(axis=1), 0)
+        self._last = np.where(has_any, n_days - 1 - active[:, ::-1].argmax(axis=1), -1)
+
+    def row(self, dish):
+        try:
+            return self._row_index[dish]
+        except KeyError:
+            raise KeyError(f"Unknown dish: {dish}") from None
+
+    def daily_series(self, dish):
+        """Full-calendar daily counts for one row (zeros outside the days it sold)."""
+        index = pd.DatetimeIndex(self.dates, freq='D', name='Date')
+        return pd.Series(self.counts[self.row(dish)].astype('float64'), index=index, name=dish)
+
+    def daily_values(self, dish, month=None):
+        """Return (dates, counts) for one row, optionally limited to a calendar month."""
+        r = self.row(dish)
+        lo, hi = self._first[r], self._last[r] + 1
+        if month:
+            months = self.dates[lo:hi].astype('datetime64[M]').astype(np.int64) % 12 + 1
+            in_month = np.flatnonzero((months == month) & (self.counts[r, lo:hi] > 0))
+            if len(in_month) == 0:
+                return self.dates[:0], self.counts[r, :0]
+            lo, hi = lo + in_month[0], lo + in_month[-1] + 1
+            values = np.where(months[in_month[0]:in_month[-1] + 1] == month, self.counts[r, lo:hi], 0)
+            return self.dates[lo:hi], values
+        return self.dates[lo:hi], self.counts[r, lo:hi]
+
+    def aggregate(self, dish, agg_level="Daily", month=None):
+        """Order counts for ``dish`` at ``agg_level`` as a one-column 'Count' frame."""
+        dates, values = self.daily_values(dish, month)
+        if month:
+            return count_frame(dates, values, agg_level)
+        r = self.row(dish)
+        return count_frame(dates, values, agg_level, self._cumsum[r], self._first[r])
+
+
+def count_frame(dates, values, agg_level="Daily", cumsum=None, offset=0):
+    """A 'Count' frame from consecutive daily counts, summed into ``agg_level`` buckets.
+
+    ``cumsum``/``offset`` may pass a running sum the values are a slice of
+    (starting at ``offset``), so bucket sums are two lookups each.
+    """
+    freq = AGG_FREQS.get(agg_level, 'D')
+    if len(dates) == 0:
+        return pd.DataFrame({'Count': pd.Series(dtype='float64')}, index=pd.DatetimeIndex([], name='Date'))
+
+    if freq == 'D':
+        index = pd.DatetimeIndex(dates, freq='D', name='Date')
+        return pd.DataFrame({'Count': values.astype('float64')}, index=index)
+
+    # Bucket ends for every day in the slice, then sums as cumsum differences
+    index = pd.DatetimeIndex(dates)
+    if freq == 'W-SUN':
+        ends = index + pd.to_timedelta((6 - index.dayofweek) % 7, unit='D')
+    else:
+        ends = index + pd.offsets.MonthEnd(0)
+    boundaries = np.flatnonzero(np.r_[True, ends[1:] != ends[:-1]])
+
+    if cumsum is None:
+        cumsum = np.r_[0, np.cumsum(values)]
+        offset = 0
+    starts = boundaries + offset
+    stops = np.r_[boundaries[1:], len(values)] + offset
+    sums = cumsum[stops] - cumsum[starts]
+
+    bucket_index = pd.DatetimeIndex(ends[boundaries], freq=freq, name='Date')
+    return pd.DataFrame({'Count': sums.astype('float64')}, index=bucket_index)
@@ -0,0 +1,278 @@
+import json
+import os
+import threading
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from forecasting import REFIT_EVERY, describe_spec, fit_model, series_fingerprint
+from profiling import PROFILER
+
+# Automatic (p,d,q)(P,D,Q,s) order selection
+# The differencing orders are picked first (KPSS test for d, strength of the
+# seasonal pattern for D), since information criteria can't compare models
+# fitted to differently differenced data. The AR/MA orders are then searched
+# stepwise: a few small starting models, then only the neighbours (+-1 on one
+# or two of p, q, P, Q) of the best model so far, round after round until no
+# neighbour beats it by the criterion (AIC or BIC). Everything outside that
+# path is pruned without being fitted, and failed fits drop out. Each round's
+# candidates are fitted in parallel.
+# The chosen order is cached per series and data fingerprint (in memory and
+# in a JSON file), so "Auto" only searches again when the data changes.
+
+AUTO_MODEL = "Auto"
+ORDER_CACHE_FILE = 'auto_orders.json'
+
+# Seasonal period searched per dashboard aggregation level (0 = non-seasonal)
+SEASONAL_PERIODS = {"Daily": 7, "Weekly": 0, "Monthly": 0}
+
+MAX_P = 3
+MAX_Q = 3
+MAX_SEASONAL = 1
+MAX_TERMS = 6  # cap on p + q + P + Q
+MAX_ROUNDS = 10
+CRITERIA = ('aic', 'bic')
+# Seasonal strength (Hyndman & Athanasopoulos) above which D = 1
+SEASONAL_STRENGTH = 0.64
+
+
+def choose_d(values, max_d=1, alpha=0.05):
+    """Non-seasonal differences needed until a KPSS level-stationarity test no longer rejects."""
+    from statsmodels.tsa.stattools import kpss  # imported on first use, like the models
+
+    values = np.asarray(values, dtype='float64')
+    for d in range(max_d + 1):
+        if d == max_d or len(values) < 10 or np.ptp(values) == 0:
+            return d
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            p_value = kpss(values, regression='c', nlags='auto')[1]
+        if p_value >= alpha:
+            return d
+        values = np.diff(values)
+    return max_d
+
+
+def seasonal_strength(values, period):
+    """1 - Var(remainder) / Var(seasonal + remainder) after removing a centred moving-average trend."""
+    values = np.asarray(values, dtype='float64')
+    if period < 2 or len(values) < 2 * period + 1:
+        return 0.0
+    # Centred moving average of width `period` (2 x period for even periods)
+    weights = np.ones(period + 1 - period % 2)
+    if period % 2 == 0:
+        weights[[0, -1]] = 0.5
+    weights /= period
+    trend = np.convolve(values, weights, mode='valid')
+    offset = len(weights) // 2
+    detrended = values[offset:offset + len(trend)] - trend
+    phase = (np.arange(len(detrended)) + offset) % period
+    profile = np.bincount(phase, weights=detrended, minlength=period) / np.bincount(phase, minlength=period)
+    remainder = detrended - profile[phase]
+    total = np.var(detrended)
+    return 0.0 if total == 0 else max(0.0, 1.0 - np.var(remainder) / total)
+
+
+def choose_D(values, period, d):
+    values = np.diff(np.asarray(values, dtype='float64'), n=d)
+    return int(seasonal_strength(values, period) >= SEASONAL_STRENGTH)
+
+
+def make_spec(order, seasonal_order):
+    """ARIMA spec dict; a seasonal part with no terms and no differencing is dropped."""
+    if not any(seasonal_order[:3]):
+        seasonal_order = (0, 0, 0, 0)
+    return {'kind': 'arima', 'order': tuple(order), 'seasonal_order': tuple(seasonal_order)}
+
+
+def start_candidates(d, D, period):
+    """Small starting models, as in the stepwise auto-ARIMA procedure."""
+    if not period:
+        return [((p, d, q), (0, 0, 0, 0)) for p, q in ((2, 2), (0, 0), (1, 0), (0, 1))]
+    return [((2, d, 2), (1, D, 1, period)), ((0, d, 0), (0, D, 0, period)),
+            ((1, d, 0), (1, D, 0, period)), ((0, d, 1), (0, D, 1, period))]
+
+
+def neighbours(order, seasonal_order):
+    """Candidates one step away from (order, seasonal_order) within the search bounds."""
+    p, d, q = order
+    P, D, Q, s = seasonal_order
+    steps = [(1, 0, 0, 0), (-1, 0, 0, 0), (0, 1, 0, 0), (0, -1, 0, 0), (1, 1, 0, 0), (-1, -1, 0, 0)]
+    if s:
+        steps += [(0, 0, 1, 0), (0, 0, -1, 0), (0, 0, 0, 1), (0, 0, 0, -1), (0, 0, 1, 1), (0, 0, -1, -1)]
+    result = []
+    for dp, dq, dP, dQ in steps:
+        np_, nq, nP, nQ = p + dp, q + dq, P + dP, Q + dQ
+        if not (0 <= np_ <= MAX_P and 0 <= nq <= MAX_Q and 0 <= nP <= MAX_SEASONAL and 0 <= nQ <= MAX_SEASONAL):
+            continue
+        if np_ + nq + nP + nQ > MAX_TERMS:
+            continue
+        result.append(((np_, d, nq), (nP, D, nQ, s)))
+    return result
+
+
+def fit_candidate(task):
+    """Fit one candidate and score it. Process-pool entry point.
+
+    ``task`` is (values, start, freq, order, seasonal_order, criterion); the
+    score is inf when the fit fails, so a broken candidate never wins.
+    """
+    values, start, freq, order, seasonal_order, criterion = task
+    started = time.perf_counter()
+    outcome = {'order': order, 'seasonal_order': seasonal_order, 'score': np.inf, 'error': None}
+    try:
+        series = pd.Series(values, index=pd.date_range(start, periods=len(values), freq=freq))
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            result = fit_model(series, make_spec(order, seasonal_order))
+        score = float(getattr(result, criterion))
+        if np.isfinite(score):
+            outcome['score'] = score
+    except Exception as e:
+        outcome['error'] = f"{type(e).__name__}: {e}"
+    outcome['seconds'] = time.perf_counter() - started
+    return outcome
+
+
+def search_order(series, seasonal_period=0, criterion='aic', executor=None):
+    """Pick an ARIMA order for a date-indexed series by stepwise search.
+
+    Candidates within a round go through ``executor`` (any Executor, e.g. a
+    process pool) or are fitted in turn when it is None. Returns a dict with
+    the chosen 'spec', its 'score', and the number of 'fits' and 'rounds'.
+    """
+    if criterion not in CRITERIA:
+        raise ValueError(f"criterion must be one of {CRITERIA}, not {criterion!r}")
+    values = series.to_numpy(dtype='float64')
+    period = seasonal_period if seasonal_period and len(values) >= 3 * seasonal_period else 0
+    started = time.perf_counter()
+
+    with PROFILER.span('order search', n_obs=len(values), period=period):
+        d = choose_d(values)
+        D = choose_D(values, period, d) if period else 0
+        freq = getattr(series.index, 'freqstr', None) or pd.infer_freq(series.index)
+        seen = {}
+        best = None
+        candidates = start_candidates(d, D, period)
+        rounds = 0
+        while candidates and rounds < MAX_ROUNDS:
+            rounds += 1
+            tasks = [(values, series.index[0], freq, order, seasonal, criterion) for order, seasonal in candidates]
+            outcomes = executor.map(fit_candidate, tasks) if executor is not None else map(fit_candidate, tasks)
+            improved = False
+            for outcome in outcomes:
+                seen[(outcome['order'], outcome['seasonal_order'])] = outcome['score']
+                if best is None or outcome['score'] < best['score']:
+                    best, improved = outcome, True
+            if not improved or not np.isfinite(best['score']):
+                break
+            candidates = [c for c in neighbours(best['order'], best['seasonal_order']) if c not in seen]
+
+    if best is None or not np.isfinite(best['score']):
+        raise ValueError("no candidate order could be fitted")
+    return {'spec': make_spec(best['order'], best['seasonal_order']), 'score': best['score'],
+            'criterion': criterion, 'fits': len(seen), 'rounds': rounds, 'seconds': time.perf_counter() - started}
+
+
+class OrderCache:
+    """Chosen orders per (series name, aggregation level, criterion), with the data they were chosen on.
+
+    A lookup hits when the series fingerprint matches. A series that only
+    gained fewer than ``reuse_within`` observations since (same first date)
+    reuses the order too, the same rule that lets FittedModelCache filter
+    instead of refit. Entries are saved to ``path`` (None keeps them in memory).
+    """
+
+    def __init__(self, path=ORDER_CACHE_FILE, reuse_within=REFIT_EVERY):
+        self.path = path
+        self.reuse_within = reuse_within
+        self._lock = threading.Lock()
+        self._entries = self._load()
+        self.hits = 0
+        self.searches = 0
+
+    def _load(self):
+        if self.path is None:
+            return {}
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        if self.path is None:
+            return
+        tmp = f"{self.path}.tmp-{os.getpid()}"
+        try:
+            with open(tmp, 'w') as f:
+                json.dump(self._entries, f, indent=1, sort_keys=True)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"Could not write order cache {self.path}: {e}")
+
+    @staticmethod
+    def _key(name, agg_level, criterion):
+        return f"{name}|{agg_level}|{criterion}"
+
+    def lookup(self, name, agg_level, series, criterion='aic'):
+        """The cached spec for ``series``, or None if it needs a search."""
+        with self._lock:
+            entry = self._entries.get(self._key(name, agg_level, criterion))
+            if entry is None or len(series) == 0:
+                return None
+            same_data = entry['fingerprint'] == series_fingerprint(series)
+            grown = (entry['first'] == str(series.index[0])
+                     and 0 <= len(series) - entry['n_obs'] < self.reuse_within)
+            if not (same_data or grown):
+                return None
+            self.hits += 1
+            return make_spec(entry['order'], entry['seasonal_order'])
+
+    def store(self, name, agg_level, series, found):
+        with self._lock:
+            spec = found['spec']
+            self._entries[self._key(name, agg_level, found['criterion'])] = {
+                'fingerprint': series_fingerprint(series), 'n_obs': len(series), 'first': str(series.index[0]),
+                'order': list(spec['order']), 'seasonal_order': list(spec['seasonal_order']),
+                'score': found['score'], 'fits': found['fits'],
+            }
+            self._save()
+
+    def get_or_search(self, name, agg_level, series, criterion='aic', executor=None):
+        """Cached spec for ``series``, searching (and caching the result) on a miss."""
+        spec = self.lookup(name, agg_level, series, criterion)
+        if spec is not None:
+            return spec
+        found = search_order(series, SEASONAL_PERIODS.get(agg_level, 0), criterion, executor)
+        with self._lock:
+            self.searches += 1
+        self.store(name, agg_level, series, found)
+        print(f"Auto order for {name} ({agg_level}): {describe_spec(found['spec'])}, "
+              f"{criterion.upper()} {found['score']:.1f} after {found['fits']} fits in {found['seconds']:.1f}s")
+        return found['spec']
+
+
+def auto_forecast_series_task(task):
+    """forecasting.forecast_series_task with the order searched per series.
+
+    ``task`` is (series_type, name, start_date, values, criterion, steps); the
+    search runs serially since batch mode already spreads series over processes.
+    The search result comes back in 'search' so the caller can cache it.
+    """
+    series_type, name, start, values, criterion, steps = task
+    started = time.perf_counter()
+    outcome = {'series_type': series_type, 'name': name, 'forecast': None, 'error': None, 'spec': None, 'search': None}
+    try:
+        series = pd.Series(values, index=pd.date_range(start, periods=len(values), freq='D'))
+        outcome['search'] = search_order(series, SEASONAL_PERIODS["Daily"], criterion)
+        outcome['spec'] = outcome['search']['spec']
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            outcome['forecast'] = fit_model(series, outcome['spec']).forecast(steps=steps)
+    except Exception as e:
+        outcome['error'] = f"{type(e).__name__}: {e}"
+    outcome['seconds'] = time.perf_counter() - started
+    return outcome
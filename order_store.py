@@ -0,0 +1,333 @@
+import argparse
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_loader import DATA_FILE, csv_chunks, tail_signature
+from order_cube import ALL_ORDERS, count_frame
+from profiling import PROFILER
+
+# Optional SQLite backend for the order/ingredient table
+# The importer copies restaurant_data.csv into one narrow table (day number,
+# Order_ID, dish and ingredient ids, quantity, stock) in chunks, so a history
+# of any length is never held in memory. COUNT(DISTINCT Order_ID) per day and
+# dish (dish 0 = All Orders) is then run in SQLite over the (date, dish, order)
+# index and kept in a small daily_orders table keyed by (dish, date), so a
+# view is one primary-key range scan with the dish and month filters in the
+# WHERE clause. Ingredient usage is a range scan of the (ingredient, date) index.
+# Later imports only add the rows appended to the CSV since the last one and
+# recount just the days those rows touch.
+# The dashboard uses the store instead of the CSV when HOSPYRA_STORE names a
+# database file.
+
+STORE_FILE = 'restaurant_data.sqlite'
+STORE_ENV = 'HOSPYRA_STORE'
+STORE_VERSION = 1
+IMPORT_CHUNK_ROWS = 200_000
+
+EPOCH = np.datetime64('1970-01-01', 'D')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS dishes (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS ingredients (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE, unit TEXT);
+CREATE TABLE IF NOT EXISTS order_items (
+    day INTEGER NOT NULL,
+    order_id TEXT NOT NULL,
+    dish_id INTEGER NOT NULL,
+    ingredient_id INTEGER NOT NULL,
+    quantity REAL,
+    stock REAL
+);
+CREATE TABLE IF NOT EXISTS daily_orders (
+    dish_id INTEGER NOT NULL,
+    day INTEGER NOT NULL,
+    orders INTEGER NOT NULL,
+    PRIMARY KEY (dish_id, day)
+) WITHOUT ROWID;
+"""
+INDEXES = """
+CREATE INDEX IF NOT EXISTS order_items_date_dish ON order_items (day, dish_id, order_id);
+CREATE INDEX IF NOT EXISTS order_items_date_ingredient ON order_items (ingredient_id, day, quantity);
+"""
+DROP_INDEXES = """
+DROP INDEX IF EXISTS order_items_date_dish;
+DROP INDEX IF EXISTS order_items_date_ingredient;
+"""
+# Full import: every table (meta included) emptied and the indexes dropped until the rows are in
+WIPE = """
+DELETE FROM meta;
+DELETE FROM order_items;
+DELETE FROM daily_orders;
+DELETE FROM dishes;
+DELETE FROM ingredients;
+""" + DROP_INDEXES
+# Distinct orders per (dish, day) and per day (dish 0), recounted from day :first on
+RECOUNT = """
+DELETE FROM daily_orders WHERE day >= :first;
+INSERT INTO daily_orders (dish_id, day, orders)
+    SELECT dish_id, day, COUNT(DISTINCT order_id) FROM order_items WHERE day >= :first GROUP BY day, dish_id;
+INSERT INTO daily_orders (dish_id, day, orders)
+    SELECT 0, day, COUNT(DISTINCT order_id) FROM order_items WHERE day >= :first GROUP BY day;
+"""
+
+
+def to_days(dates):
+    """datetime64 values as integer days since 1970-01-01."""
+    return (np.asarray(dates, dtype='datetime64[D]') - EPOCH).astype(np.int64)
+
+
+def from_days(days):
+    return EPOCH + np.asarray(days, dtype=np.int64).astype('timedelta64[D]')
+
+
+def month_ranges(first_day, last_day, month):
+    """(first, last) day numbers of ``month`` in every year from first_day to last_day."""
+    first_year = int(from_days(first_day).astype('datetime64[Y]').astype(np.int64)) + 1970
+    last_year = int(from_days(last_day).astype('datetime64[Y]').astype(np.int64)) + 1970
+    ranges = []
+    for year in range(first_year, last_year + 1):
+        start = np.datetime64(f"{year}-{month:02d}", 'M')
+        ranges.append((int(to_days(start.astype('datetime64[D]'))),
+                       int(to_days((start + 1).astype('datetime64[D]'))) - 1))
+    return ranges
+
+
+class OrderStore:
+    """Read side of the SQLite store, shaped like order_cube.OrderCube for the dashboard.
+
+    ``dishes`` and ``aggregate()`` match the cube; each call is a query, so
+    memory use does not depend on the length of the history. One connection
+    is shared behind a lock, so the store can be opened on a loader thread and
+    queried from the Tk thread.
+    """
+
+    def __init__(self, path=STORE_FILE):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"{path} not found! Import the CSV first with order_store.py.")
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        version = self._query("SELECT value FROM meta WHERE key = 'version'")
+        if not version or int(version[0][0]) != STORE_VERSION:
+            raise ValueError(f"{path} is not an order store of version {STORE_VERSION}; re-import the CSV")
+        self._data_version = None
+        self.refresh()
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def refresh(self):
+        """Pick up rows imported since the last call. Returns (changed, newly seen dishes)."""
+        # Changes whenever another connection (the importer) commits
+        data_version = self._query("PRAGMA data_version")[0][0]
+        if data_version == self._data_version:
+            return False, []
+        known = set(getattr(self, 'dishes', []))
+        self._dish_ids = dict(self._query("SELECT name, id FROM dishes"))
+        self._ingredient_ids = dict(self._query("SELECT name, id FROM ingredients"))
+        self.dishes = sorted(self._dish_ids)
+        self.ingredients = sorted(self._ingredient_ids)
+        self._data_version = data_version
+        return True, sorted(set(self.dishes) - known)
+
+    def _dish_id(self, dish):
+        if dish == ALL_ORDERS:
+            return 0
+        try:
+            return self._dish_ids[dish]
+        except KeyError:
+            raise KeyError(f"Unknown dish: {dish}") from None
+
+    def day_counts(self, dish, ranges=None):
+        """(days, distinct order counts) for ``dish`` on the days it sold, within the (first, last) day ranges."""
+        params = (self._dish_id(dish),)
+        where = "1"
+        if ranges is not None:
+            where = " OR ".join(["day BETWEEN ? AND ?"] * len(ranges))
+            params += tuple(day for pair in ranges for day in pair)
+        rows = self._query(f"SELECT day, orders FROM daily_orders WHERE dish_id = ? AND ({where}) ORDER BY day",
+                           params)
+        if not rows:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        days, counts = np.array(rows, dtype=np.int64).T
+        return days, counts
+
+    def daily_values(self, dish, month=None):
+        """Return (dates, counts) for one row, like OrderCube.daily_values."""
+        ranges = None
+        if month:
+            first, last = self._query("SELECT min(day), max(day) FROM daily_orders WHERE dish_id = ?",
+                                      (self._dish_id(dish),))[0]
+            if first is None:
+                return from_days([]), np.zeros(0, dtype=np.int64)
+            ranges = month_ranges(first, last, month)
+        days, counts = self.day_counts(dish, ranges)
+        if len(days) == 0:
+            return from_days([]), counts
+        # Zero-fill the days in between (including other months), as the cube's dense rows are
+        values = np.zeros(days[-1] - days[0] + 1, dtype=np.int64)
+        values[days - days[0]] = counts
+        return from_days(np.arange(days[0], days[-1] + 1)), values
+
+    def aggregate(self, dish, agg_level="Daily", month=None):
+        """Order counts for ``dish`` at ``agg_level`` as a one-column 'Count' frame."""
+        with PROFILER.span('store query', dish=dish, agg_level=agg_level, month=month):
+            dates, values = self.daily_values(dish, month)
+        return count_frame(dates, values, agg_level)
+
+    def daily_series(self, dish):
+        """Daily counts for one row from its first to its last day (zeros in between)."""
+        dates, values = self.daily_values(dish)
+        index = pd.DatetimeIndex(dates, freq='D', name='Date')
+        return pd.Series(values.astype('float64'), index=index, name=dish)
+
+    def ingredient_usage(self, ingredient, start=None, end=None):
+        """Quantity of ``ingredient`` used per day (days it was used), optionally between two dates."""
+        try:
+            params = [self._ingredient_ids[ingredient]]
+        except KeyError:
+            raise KeyError(f"Unknown ingredient: {ingredient}") from None
+        where = "ingredient_id = ?"
+        if start is not None:
+            where += " AND day >= ?"
+            params.append(int(to_days(pd.Timestamp(start).to_datetime64())))
+        if end is not None:
+            where += " AND day <= ?"
+            params.append(int(to_days(pd.Timestamp(end).to_datetime64())))
+        rows = self._query(f"SELECT day, SUM(quantity) FROM order_items WHERE {where} GROUP BY day ORDER BY day",
+                           params)
+        days = np.array([r[0] for r in rows], dtype=np.int64)
+        index = pd.DatetimeIndex(from_days(days).astype('datetime64[ns]'), name='Date')
+        return pd.Series([r[1] for r in rows], index=index, dtype='float64', name=ingredient)
+
+
+def open_store(path=None):
+    """OrderStore for ``path`` (default: $HOSPYRA_STORE), or None when no store is configured."""
+    path = path or os.environ.get(STORE_ENV)
+    return OrderStore(path) if path else None
+
+
+# --- Import ---
+
+def _ids(conn, table, names, units=None):
+    """name -> id for ``names``, inserting the ones the table doesn't have yet."""
+    known = dict(conn.execute(f"SELECT name, id FROM {table}"))
+    new = [name for name in names if name not in known]
+    if new:
+        if units is None:
+            conn.executemany(f"INSERT INTO {table} (name) VALUES (?)", [(name,) for name in new])
+        else:
+            conn.executemany(f"INSERT INTO {table} (name, unit) VALUES (?, ?)", [(name, units[name]) for name in new])
+        known = dict(conn.execute(f"SELECT name, id FROM {table}"))
+    return known
+
+
+def _insert_chunk(conn, chunk):
+    dishes = chunk['Dish_Name'].astype(str)
+    ingredients = chunk['Ingredient_Name'].astype(str)
+    units = dict(zip(ingredients, chunk['Unit'].astype(str)))
+    dish_ids = _ids(conn, 'dishes', dishes.unique())
+    ingredient_ids = _ids(conn, 'ingredients', ingredients.unique(), units)
+    rows = zip(to_days(chunk['Date'].values).tolist(),
+               chunk['Order_ID'].astype(str).tolist(),
+               dishes.map(dish_ids).tolist(),
+               ingredients.map(ingredient_ids).tolist(),
+               chunk['Quantity_Used'].tolist(),
+               chunk['Stock_Available'].tolist())
+    conn.executemany("INSERT INTO order_items VALUES (?, ?, ?, ?, ?, ?)", rows)
+    return len(chunk)
+
+
+def _run_script(conn, script, params=()):
+    """Run the statements of ``script`` one by one (executescript would commit the open transaction)."""
+    for statement in script.split(';')[:-1]:
+        conn.execute(statement, params)
+
+
+def _recount(conn, first_day):
+    _run_script(conn, RECOUNT, {'first': first_day})
+
+
+def _source_offset(conn, csv_path):
+    """Byte offset of the CSV already imported, or None if it must be imported from scratch."""
+    meta = dict(conn.execute("SELECT key, value FROM meta"))
+    if meta.get('version') != str(STORE_VERSION) or meta.get('source') != os.path.abspath(csv_path):
+        return None
+    offset = int(meta.get('offset', 0))
+    if offset > os.path.getsize(csv_path) or tail_signature(csv_path, offset) != meta.get('tail_hash'):
+        return None  # the CSV was rewritten, not appended to
+    return offset
+
+
+def import_csv(csv_path=DATA_FILE, store_path=STORE_FILE, chunksize=IMPORT_CHUNK_ROWS, rebuild=False):
+    """Bring the store up to date with the CSV; returns a dict with the rows imported and whether it was a full load.
+
+    Rows appended to the CSV since the last import are added on their own;
+    a new, rewritten or truncated CSV (or ``rebuild``) reloads everything.
+    """
+    started = time.perf_counter()
+    # Autocommit mode, so the one transaction below is opened and closed explicitly
+    conn = sqlite3.connect(store_path, isolation_level=None)
+    try:
+        conn.executescript(SCHEMA)
+        offset = None if rebuild else _source_offset(conn, csv_path)
+        full = offset is None
+        rows = 0
+        first_day = None
+        # One transaction for the wipe, the rows, the indexes, the recount and meta:
+        # a failed import rolls back to the previous store, and readers never see a
+        # half-loaded one (they pick the result up through PRAGMA data_version)
+        conn.execute("BEGIN IMMEDIATE")
+        with conn, csv_chunks(csv_path, chunksize, start=offset or 0) as (chunks, end):
+            if full:
+                _run_script(conn, WIPE)
+            for chunk in chunks:
+                rows += _insert_chunk(conn, chunk)
+                if len(chunk):
+                    day = int(to_days(chunk['Date'].min().to_datetime64()))
+                    first_day = day if first_day is None else min(first_day, day)
+            if full:
+                _run_script(conn, INDEXES)
+            if first_day is not None:
+                _recount(conn, first_day)
+            meta = {'version': STORE_VERSION, 'source': os.path.abspath(csv_path), 'offset': end,
+                    'tail_hash': tail_signature(csv_path, end)}
+            conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", [(k, str(v)) for k, v in meta.items()])
+        if full:
+            conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    return {'rows': rows, 'full': full, 'seconds': time.perf_counter() - started}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import restaurant_data.csv into the SQLite order store.")
+    parser.add_argument('--data', default=DATA_FILE, help="input CSV (default: %(default)s)")
+    parser.add_argument('--store', default=STORE_FILE, help="SQLite database to create or update (default: %(default)s)")
+    parser.add_argument('--chunksize', type=int, default=IMPORT_CHUNK_ROWS,
+                        help="CSV rows parsed and inserted per batch (default: %(default)s)")
+    parser.add_argument('--rebuild', action='store_true', help="re-import everything instead of only appended rows")
+    args = parser.parse_args(argv)
+
+    try:
+        result = import_csv(args.data, args.store, args.chunksize, args.rebuild)
+    except FileNotFoundError:
+        print(f"{args.data} not found! Please run generate_restaurant_data.py first.")
+        return 1
+    kind = "Imported" if result['full'] else "Appended"
+    print(f"{kind} {result['rows']} rows into {args.store} in {result['seconds']:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
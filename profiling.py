@@ -0,0 +1,128 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# Lightweight timing spans for the hot paths (load, aggregation, fit, forecast, redraw)
+# Disabled by default; set HOSPYRA_PROFILE=1 (or call PROFILER.enable()) to record.
+# When disabled, span() hands back one shared no-op context manager, so an
+# instrumented call costs a method call and an attribute check.
+
+PROFILE_ENV_VAR = 'HOSPYRA_PROFILE'
+MAX_SPANS = 100_000
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('profiler', 'name', 'args', 'start')
+
+    def __init__(self, profiler, name, args):
+        self.profiler = profiler
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        self.profiler._record(self.name, self.start, end - self.start, self.args)
+        return False
+
+
+class Profiler:
+    """Records named timing spans and exports them as JSON or Chrome trace events."""
+
+    def __init__(self, enabled=False, max_spans=MAX_SPANS):
+        self.enabled = enabled
+        self._spans = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+        self._origin_ns = time.perf_counter_ns()
+        self._interaction = None
+        self._interaction_start = 0
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def span(self, name, **args):
+        """Context manager timing the enclosed block as ``name`` (no-op when disabled)."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, args)
+
+    def _record(self, name, start_ns, duration_ns, args):
+        with self._lock:
+            self._spans.append((name, start_ns, duration_ns, threading.get_ident(), args))
+
+    def begin_interaction(self, name):
+        """Mark the start of a user interaction; breakdown() summarises spans from here on."""
+        if self.enabled:
+            self._interaction = name
+            self._interaction_start = time.perf_counter_ns()
+
+    def breakdown(self):
+        """{span name: total ms} for spans that started during the current interaction."""
+        totals = {}
+        with self._lock:
+            for name, start_ns, duration_ns, _, _ in self._spans:
+                if start_ns >= self._interaction_start:
+                    totals[name] = totals.get(name, 0.0) + duration_ns / 1e6
+        return totals
+
+    def breakdown_text(self):
+        totals = self.breakdown()
+        parts = ", ".join(f"{name} {ms:.1f}ms" for name, ms in sorted(totals.items(), key=lambda kv: -kv[1]))
+        return f"{self._interaction}: {parts}" if self._interaction else parts
+
+    def spans(self):
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+
+    def export_json(self, path):
+        """Plain JSON: one record per span with start/duration in milliseconds."""
+        records = [{'name': name, 'start_ms': (start - self._origin_ns) / 1e6, 'duration_ms': dur / 1e6,
+                    'thread': tid, 'args': args}
+                   for name, start, dur, tid, args in self.spans()]
+        with open(path, 'w') as f:
+            json.dump({'spans': records}, f, indent=1, default=str)
+
+    def export_chrome_trace(self, path):
+        """Chrome trace event format (load in chrome://tracing or Perfetto)."""
+        pid = os.getpid()
+        events = [{'name': name, 'ph': 'X', 'ts': (start - self._origin_ns) / 1e3, 'dur': dur / 1e3,
+                   'pid': pid, 'tid': tid, 'args': args}
+                  for name, start, dur, tid, args in self.spans()]
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f, default=str)
+
+    def export(self, path):
+        """Write ``path`` as a Chrome trace, or as plain JSON spans if it ends in '.spans.json'."""
+        if path.endswith('.spans.json'):
+            self.export_json(path)
+        else:
+            self.export_chrome_trace(path)
+
+
+# Shared instance used by the dashboard, model_and_plot.py and the helpers they call
+PROFILER = Profiler(enabled=os.environ.get(PROFILE_ENV_VAR, '') not in ('', '0'))
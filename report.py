@@ -0,0 +1,198 @@
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import as_completed
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from forecasting import process_pool
+from generate_restaurant_data import INGREDIENTS
+
+# Headless report rendering
+# A chart is described by a plain dict (file name, labels and the line data),
+# so it can be hashed and shipped to a worker process. Workers draw with the
+# Agg canvas directly (no pyplot state). A manifest in the report directory
+# records each file's spec hash, and charts whose hash is unchanged since the
+# last run are not drawn again. Charts that need a model fit are deferred: they
+# are hashed on their inputs, and fitted and drawn only when those changed.
+
+REPORT_DIR = 'reports'
+MANIFEST_FILE = 'manifest.json'
+# Bump to force a full re-render after changing how specs are drawn
+RENDER_VERSION = 1
+
+
+def line(index, values, label, **style):
+    return {'x': np.asarray(index, dtype='datetime64[ns]'), 'y': np.asarray(values, dtype='float64'),
+            'label': label, 'style': style}
+
+
+def chart(file, title, ylabel, lines, xlabel='Date', figsize=(12, 6)):
+    return {'file': file, 'title': title, 'xlabel': xlabel, 'ylabel': ylabel, 'lines': lines, 'figsize': figsize}
+
+
+def deferred_chart(file, inputs, build):
+    """A chart whose spec is expensive to make; ``build()`` only runs when ``inputs`` changed since the last render."""
+    return {'file': file, 'inputs': inputs, 'build': build}
+
+
+def slug(name):
+    return re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_')
+
+
+def chart_hash(spec):
+    """Digest of everything that affects the rendered image."""
+    h = hashlib.blake2b(digest_size=16)
+    meta = {key: value for key, value in spec.items() if key != 'lines'}
+    meta['lines'] = [{'label': ln['label'], 'style': ln['style']} for ln in spec['lines']]
+    h.update(json.dumps([RENDER_VERSION, meta], sort_keys=True, default=str).encode())
+    for ln in spec['lines']:
+        h.update(ln['x'].tobytes())
+        h.update(ln['y'].tobytes())
+    return h.hexdigest()
+
+
+def inputs_hash(inputs):
+    """Digest of a deferred chart's inputs (JSON-able values, e.g. settings and data fingerprints)."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(json.dumps([RENDER_VERSION, inputs], sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+def render_chart(task):
+    """Draw one chart spec to a PNG. Process-pool entry point; returns (file, seconds)."""
+    spec, output_dir = task
+    started = time.perf_counter()
+    fig = Figure(figsize=spec['figsize'])
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    for ln in spec['lines']:
+        ax.plot(ln['x'], ln['y'], label=ln['label'], **ln['style'])
+    ax.set_title(spec['title'])
+    ax.set_xlabel(spec['xlabel'])
+    ax.set_ylabel(spec['ylabel'])
+    ax.legend()
+    ax.grid(True)
+    fig.savefig(os.path.join(output_dir, spec['file']))
+    return spec['file'], time.perf_counter() - started
+
+
+# --- Chart specs ---
+
+def overview_charts(daily_orders, daily_stock, holdout=None, future=None):
+    """The four charts model_and_plot.py draws by default.
+
+    ``holdout`` is (train, test, forecast, rmse, model label) and ``future`` the 30-day
+    forecast; either chart is left out when its forecast is None.
+    """
+    counts = daily_orders['Order_Count']
+    charts = [chart('daily_orders_history.png', 'Daily Restaurant Orders (1 Year)', 'Number of Orders',
+                    [line(counts.index, counts, 'Daily Orders', color='blue')])]
+    if 'Pizza Dough' in daily_stock.columns:
+        charts.append(chart('stock_level_pizza_dough.png', 'Pizza Dough Stock Level Over Time', 'Stock (balls)',
+                            [line(daily_stock.index, daily_stock['Pizza Dough'], 'Pizza Dough Stock', color='green')]))
+    if holdout is not None:
+        charts.append(holdout_chart(holdout))
+    if future is not None:
+        charts.append(future_chart(daily_orders, future))
+    return charts
+
+
+def holdout_chart(holdout):
+    train, test, forecast, rmse, label = holdout
+    return chart('forecast_vs_actual.png', f'Order Forecast using {label} (RMSE: {rmse:.2f})', 'Number of Orders', [
+        line(train.index, train['Order_Count'], 'Training Data'),
+        line(test.index, test['Order_Count'], 'Actual Valid Data', color='green'),
+        line(test.index, forecast, 'Forecast', color='red', linestyle='--'),
+    ])
+
+
+def future_chart(daily_orders, future):
+    counts = daily_orders['Order_Count']
+    return chart('future_forecast.png', 'Future Order Forecast (Next 30 Days)', 'Number of Orders', [
+        line(counts.index, counts, 'Historical Data'),
+        line(future.index, future, '30-Day Forecast', color='orange', linestyle='--'),
+    ])
+
+
+def dish_charts(dish_orders):
+    """One daily order history chart per dish; ``dish_orders`` maps dish -> daily Series."""
+    return [chart(f'dish_{slug(dish)}.png', f'Daily Orders: {dish}', 'Number of Orders',
+                  [line(series.index, series, dish, color='blue')])
+            for dish, series in dish_orders.items()]
+
+
+def ingredient_charts(ingredient_usage, daily_stock):
+    """Daily usage and end-of-day stock charts per ingredient."""
+    usage = ingredient_usage.pivot(index='Date', columns='Ingredient_Name', values='Quantity_Used')
+    usage = usage.asfreq('D').fillna(0)
+    charts = []
+    for name in sorted(set(usage.columns) | set(daily_stock.columns)):
+        unit = INGREDIENTS.get(name, {}).get('unit', 'units')
+        if name in usage.columns:
+            charts.append(chart(f'ingredient_{slug(name)}_usage.png', f'{name} Daily Usage', f'Used ({unit})',
+                                [line(usage.index, usage[name], f'{name} Usage', color='purple')]))
+        if name in daily_stock.columns:
+            charts.append(chart(f'ingredient_{slug(name)}_stock.png', f'{name} Stock Level Over Time', f'Stock ({unit})',
+                                [line(daily_stock.index, daily_stock[name], f'{name} Stock', color='green')]))
+    return charts
+
+
+# --- Rendering ---
+
+def load_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, MANIFEST_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(output_dir, manifest):
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def render_report(specs, output_dir=REPORT_DIR, workers=None, force=False):
+    """Render every chart in ``specs`` whose data or spec (for deferred charts: inputs) changed since the last run.
+
+    Returns (rendered file names, skipped file names).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = {} if force else load_manifest(output_dir)
+    hashes = {spec['file']: inputs_hash(spec['inputs']) if 'build' in spec else chart_hash(spec) for spec in specs}
+    todo = [spec for spec in specs
+            if manifest.get(spec['file']) != hashes[spec['file']]
+            or not os.path.exists(os.path.join(output_dir, spec['file']))]
+    todo = [spec['build']() if 'build' in spec else spec for spec in todo]
+    todo_files = {spec['file'] for spec in todo}
+    skipped = [spec['file'] for spec in specs if spec['file'] not in todo_files]
+
+    workers = min(workers or os.cpu_count() or 1, len(todo))
+    print(f"Rendering {len(todo)} of {len(specs)} chart(s) into {output_dir}/ "
+          f"({len(skipped)} unchanged) on {max(workers, 1)} worker(s)...")
+    started = time.perf_counter()
+    rendered = []
+    try:
+        if workers <= 1:
+            for spec in todo:
+                rendered.append(render_chart((spec, output_dir))[0])
+                manifest[spec['file']] = hashes[spec['file']]
+        else:
+            with process_pool(workers) as pool:
+                futures = [pool.submit(render_chart, (spec, output_dir)) for spec in todo]
+                for future in as_completed(futures):
+                    file, _ = future.result()
+                    rendered.append(file)
+                    manifest[file] = hashes[file]
+    finally:
+        # Charts finished before a failure are still recorded
+        save_manifest(output_dir, manifest)
+    print(f"Report done in {time.perf_counter() - started:.2f}s: {len(rendered)} rendered, {len(skipped)} skipped.")
+    return rendered, skipped
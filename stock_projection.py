@@ -0,0 +1,149 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from generate_restaurant_data import INGREDIENTS, MENU
+
+# Ingredient demand and stock-out projection from per-dish forecasts
+# Daily dish forecasts (days x dishes) times the MENU recipe matrix
+# (dishes x ingredients) give every ingredient's expected daily demand in
+# one product. Stock is then run forward with the generator's policy: at the
+# start of each day an ingredient below its restock_threshold gets its
+# restock_amount, then the day's demand is taken out, floored at zero. Each
+# day is one array step over all ingredients (and any leading scenario
+# axes), so the only Python loop is over the forecast horizon.
+# Unlike the generator, ingredients are projected independently: a shortfall
+# is reported per ingredient rather than cancelling whole orders.
+
+STOCK_PROJECTION_FILE = 'stock_projection.csv'
+
+
+class StockProjector:
+    """Recipe matrix and restock policy as arrays, for repeated projections.
+
+    ``recipe[d, i]`` is the quantity of ingredient i one order of dish d uses;
+    ``thresholds``, ``amounts`` and ``initial`` follow ``ingredients``.
+    """
+
+    def __init__(self, menu=MENU, ingredients=INGREDIENTS):
+        self.dishes = list(menu)
+        self.ingredients = list(ingredients)
+        self.units = [ingredients[name]['unit'] for name in self.ingredients]
+        column = {name: i for i, name in enumerate(self.ingredients)}
+        self.recipe = np.zeros((len(self.dishes), len(self.ingredients)))
+        for d, dish in enumerate(self.dishes):
+            for name, quantity in menu[dish].items():
+                self.recipe[d, column[name]] = quantity
+        self.thresholds = np.array([ingredients[name]['restock_threshold'] for name in self.ingredients], dtype=float)
+        self.amounts = np.array([ingredients[name]['restock_amount'] for name in self.ingredients], dtype=float)
+        self.initial = np.array([ingredients[name]['initial_stock'] for name in self.ingredients], dtype=float)
+
+    def dish_matrix(self, dish_forecasts):
+        """A (days x dishes) frame as a float array in ``dishes`` order; missing dishes are zero demand."""
+        unknown = set(dish_forecasts.columns) - set(self.dishes)
+        if unknown:
+            raise KeyError(f"No recipe for dish(es): {', '.join(sorted(map(str, unknown)))}")
+        frame = dish_forecasts.reindex(columns=self.dishes, fill_value=0.0)
+        return np.clip(frame.to_numpy(dtype='float64'), 0, None)
+
+    def start_stock(self, daily_stock=None):
+        """Latest end-of-day stock per ingredient from a daily_stock frame; initial_stock where unknown."""
+        if daily_stock is None or len(daily_stock) == 0:
+            return self.initial.copy()
+        latest = daily_stock.ffill().iloc[-1].reindex(self.ingredients)
+        return np.where(latest.isna(), self.initial, latest.to_numpy(dtype='float64'))
+
+    def demand(self, dishes_by_day):
+        """(..., days, dishes) dish counts -> (..., days, ingredients) ingredient quantities."""
+        return np.asarray(dishes_by_day, dtype='float64') @ self.recipe
+
+    def simulate(self, demand, start_stock):
+        """Run stock forward through ``demand`` (..., days, ingredients).
+
+        Returns a dict of arrays shaped like ``demand``: 'stock' (end of day),
+        'restocked' (a delivery arrived that morning) and 'shortfall' (demand
+        the stock on hand could not cover); plus 'stockout_day', the first day
+        index with a shortfall per ingredient, -1 if none.
+        """
+        demand = np.asarray(demand, dtype='float64')
+        level = np.broadcast_to(np.asarray(start_stock, dtype='float64'), demand.shape[:-2] + demand.shape[-1:]).copy()
+        stock = np.empty_like(demand)
+        shortfall = np.empty_like(demand)
+        restocked = np.empty(demand.shape, dtype=bool)
+        for t in range(demand.shape[-2]):
+            low = level < self.thresholds
+            level += np.where(low, self.amounts, 0.0)
+            need = demand[..., t, :]
+            np.maximum(need - level, 0.0, out=shortfall[..., t, :])
+            level = np.maximum(level - need, 0.0)
+            stock[..., t, :] = level
+            restocked[..., t, :] = low
+
+        short = shortfall > 0
+        if demand.shape[-2] == 0:
+            # No days to run (argmax of an empty axis raises)
+            stockout_day = np.full(level.shape, -1)
+        else:
+            stockout_day = np.where(short.any(axis=-2), short.argmax(axis=-2), -1)
+        return {'stock': stock, 'restocked': restocked, 'shortfall': shortfall, 'stockout_day': stockout_day}
+
+    def project(self, dish_forecasts, start_stock=None):
+        """Project stock for a (Date x dish) forecast frame.
+
+        Returns (stock, summary): end-of-day stock as a (Date x ingredient)
+        frame, and one summary row per ingredient with the projected
+        stock-out date (NaT if none), restock count and total shortfall.
+        """
+        if start_stock is None:
+            start_stock = self.initial
+        index = pd.DatetimeIndex(dish_forecasts.index, name='Date')
+        demand = self.demand(self.dish_matrix(dish_forecasts))
+        result = self.simulate(demand, start_stock)
+
+        stockout_day = result['stockout_day']
+        stockout_date = np.full(len(self.ingredients), np.datetime64('NaT'), dtype='datetime64[ns]')
+        has_stockout = stockout_day >= 0
+        stockout_date[has_stockout] = index.values[stockout_day[has_stockout]]
+        stock = pd.DataFrame(result['stock'], index=index, columns=pd.Index(self.ingredients, name='Ingredient_Name'))
+        summary = pd.DataFrame({
+            'Ingredient_Name': self.ingredients,
+            'Unit': self.units,
+            'Start_Stock': np.asarray(start_stock, dtype='float64'),
+            'Total_Demand': demand.sum(axis=0),
+            'Restocks': result['restocked'].sum(axis=0),
+            'Stockout_Date': stockout_date,
+            'Shortfall': result['shortfall'].sum(axis=0),
+            'End_Stock': result['stock'][-1] if len(index) else np.asarray(start_stock, dtype='float64'),
+        })
+        return stock, summary
+
+
+def dish_forecast_frame(outcomes):
+    """(Date x dish) frame from model_and_plot.run_batch outcomes of series_type 'dish'."""
+    series = {o['name']: o['forecast'] for o in outcomes if o['series_type'] == 'dish' and o['forecast'] is not None}
+    if not series:
+        return pd.DataFrame(index=pd.DatetimeIndex([], name='Date'))
+    frame = pd.DataFrame(series)
+    frame.index.name = 'Date'
+    return frame
+
+
+def print_projection(summary, seconds):
+    print(f"Stock projection for {len(summary)} ingredients in {seconds * 1000:.2f}ms:")
+    for row in summary.itertuples(index=False):
+        when = row.Stockout_Date.strftime('%Y-%m-%d') if not pd.isna(row.Stockout_Date) else "no stock-out"
+        print(f"  {row.Ingredient_Name:<18} {when:<13} start {row.Start_Stock:8.2f} {row.Unit:<5} "
+              f"demand {row.Total_Demand:8.2f}  restocks {row.Restocks:3d}  short {row.Shortfall:7.2f}")
+
+
+def run_projection(dish_forecasts, daily_stock=None, output_file=STOCK_PROJECTION_FILE, projector=None):
+    """Project every ingredient from ``dish_forecasts``, print the stock-out dates and save the summary."""
+    projector = projector or StockProjector()
+    start_stock = projector.start_stock(daily_stock)
+    started = time.perf_counter()
+    stock, summary = projector.project(dish_forecasts, start_stock)
+    print_projection(summary, time.perf_counter() - started)
+    summary.to_csv(output_file, index=False, date_format='%Y-%m-%d')
+    print(f"Saved {output_file}")
+    return stock, summary
@@ -0,0 +1,234 @@
+import os
+
+import pandas as pd
+import pytest
+
+from analytics_engine import load_orders
+from compact_model import CompactOrders, load_compact_data
+from data_loader import (CATEGORICAL_COLUMNS, DATA_FILE, SourceChangedError, append_rows, load_restaurant_data,
+                         open_restaurant_data)
+from model_and_plot import build_aggregates
+from order_cube import ALL_ORDERS, OrderCube
+from order_store import OrderStore, import_csv
+
+# Incremental state against a full rebuild
+# Every append path (OrderCube.extend, CsvTail.read_new, the columnar and
+# compact caches, order_store's append import) must end up exactly where a
+# from-scratch load of the same bytes does. The checks run on truncated
+# copies of restaurant_data.csv, split at line boundaries that fall inside an
+# order (so its rows straddle two reads) and in the middle of a line.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROWS = 6000
+# (aggregation level, month) views compared for every dish
+VIEWS = [("Daily", None), ("Weekly", None), ("Monthly", None), ("Daily", 2)]
+
+
+def same_order(a, b):
+    return a.split(b',')[:2] == b.split(b',')[:2]  # same Date and Order_ID
+
+
+@pytest.fixture(scope='module')
+def lines():
+    """Header plus about ROWS rows, ending on a complete order."""
+    with open(os.path.join(HERE, DATA_FILE), 'rb') as f:
+        lines = [next(f) for _ in range(ROWS + 1)]
+        for line in f:
+            if not same_order(line, lines[-1]):
+                break
+            lines.append(line)
+    return lines
+
+
+def write(path, data):
+    with open(path, 'ab') as f:
+        f.write(data)
+
+
+def straddling_splits(lines):
+    """Line numbers where the next row continues the previous row's order (same day, same Order_ID)."""
+    splits = [i for i in range(2, len(lines)) if same_order(lines[i], lines[i - 1])]
+    return splits[len(splits) // 3], splits[2 * len(splits) // 3]
+
+
+def order_splits(lines):
+    """Line numbers where a new order starts on the same day as the previous row's."""
+    splits = [i for i in range(2, len(lines)) if not same_order(lines[i], lines[i - 1])
+              and lines[i].split(b',')[0] == lines[i - 1].split(b',')[0]]
+    return splits[len(splits) // 3], splits[2 * len(splits) // 3]
+
+
+def assert_same_counts(actual, expected):
+    assert actual.dishes == expected.dishes
+    for dish in [ALL_ORDERS] + expected.dishes:
+        for level, month in VIEWS:
+            pd.testing.assert_frame_equal(actual.aggregate(dish, level, month), expected.aggregate(dish, level, month),
+                                          check_dtype=False, obj=f"{dish} ({level}, month {month})")
+
+
+# --- OrderCube.extend ---
+
+def test_cube_extend_matches_rebuild(tmp_path, lines):
+    path = str(tmp_path / DATA_FILE)
+    write(path, b''.join(lines))
+    df = load_restaurant_data(path, use_cache=False)
+    first, second = (i - 1 for i in straddling_splits(lines))  # line 0 is the header
+
+    cube = OrderCube.from_frame(df.iloc[:first])
+    cube.extend(df.iloc[first:second])
+    cube.extend(df.iloc[second:second])  # nothing new
+    cube.extend(df.iloc[second:])
+    assert_same_counts(cube, OrderCube.from_frame(df))
+
+
+def test_cube_extend_adds_new_dishes(tmp_path, lines):
+    path = str(tmp_path / DATA_FILE)
+    write(path, b''.join(lines))
+    df = load_restaurant_data(path, use_cache=False)
+    # A dish that first sells in the appended rows
+    last_dish = df['Dish_Name'].astype(str).max()
+    early, late = df.iloc[:len(df) // 2], df.iloc[len(df) // 2:]
+    early = early[early['Dish_Name'].astype(str) != last_dish]
+
+    cube = OrderCube.from_frame(early)
+    assert last_dish not in cube.dishes
+    assert cube.extend(late) == [last_dish]
+    assert_same_counts(cube, OrderCube.from_frame(pd.concat([early, late])))
+
+
+# --- CsvTail.read_new and the columnar cache ---
+
+def assert_same_frame(actual, expected):
+    # The cache stores Date as datetime64[ns]; a fresh parse may pick another unit
+    actual, expected = (frame.reset_index(drop=True).astype({'Date': 'datetime64[ns]'}) for frame in (actual, expected))
+    pd.testing.assert_frame_equal(actual, expected)
+
+
+def test_read_new_matches_full_parse(tmp_path, lines):
+    path = str(tmp_path / DATA_FILE)
+    first, second = straddling_splits(lines)
+    half_line = len(lines[second]) // 2
+    write(path, b''.join(lines[:first]))
+    df, tail = open_restaurant_data(path, use_cache=False)
+
+    write(path, b''.join(lines[first:second]) + lines[second][:half_line])
+    df = append_rows(df, tail.read_new())  # the half-written row is left for the next read
+    assert len(tail.read_new()) == 0
+    write(path, lines[second][half_line:] + b''.join(lines[second + 1:]))
+    df = append_rows(df, tail.read_new())
+
+    expected = load_restaurant_data(path, use_cache=False)
+    assert_same_frame(df, expected)
+    # Categories (and so codes) match a fresh parse, not just the values
+    for col in CATEGORICAL_COLUMNS:
+        assert list(df[col].cat.categories) == list(expected[col].cat.categories), col
+
+
+def test_read_new_detects_rewrite(tmp_path, lines):
+    path = str(tmp_path / DATA_FILE)
+    write(path, b''.join(lines))
+    _, tail = open_restaurant_data(path, use_cache=False)
+    with open(path, 'wb') as f:
+        f.write(b''.join(lines[:1] + lines[2:]))
+    with pytest.raises(SourceChangedError):
+        tail.read_new()
+
+
+def test_cache_append_matches_full_parse(tmp_path, lines):
+    path = str(tmp_path / DATA_FILE)
+    first, _ = straddling_splits(lines)
+    write(path, b''.join(lines[:first]))
+    load_restaurant_data(path)  # writes the cache
+    write(path, b''.join(lines[first:]))
+    assert_same_frame(load_restaurant_data(path), load_restaurant_data(path, use_cache=False))
+
+
+# --- Compact order model ---
+
+def test_compact_matches_full_table(tmp_path, lines):
+    path = str(tmp_path / DATA_FILE)
+    write(path, b''.join(lines))
+    df = load_restaurant_data(path, use_cache=False)
+    compact = CompactOrders.from_frame(df)
+
+    assert_same_counts(OrderCube.from_compact(compact), OrderCube.from_frame(df))
+    daily_orders, ingredient_usage, daily_stock = build_aggregates(df)
+    pd.testing.assert_frame_equal(compact.daily_orders(), daily_orders, check_dtype=False, check_freq=False,
+                                  check_index_type=False)
+    daily_stock.columns = daily_stock.columns.astype(str)
+    pd.testing.assert_frame_equal(compact.daily_stock(), daily_stock, check_freq=False, check_index_type=False,
+                                  check_column_type=False)
+    usage = compact.ingredient_usage().sort_values(['Date', 'Ingredient_Name'], ignore_index=True)
+    as_plain = {'Date': 'datetime64[ns]', 'Ingredient_Name': str}
+    pd.testing.assert_frame_equal(usage.astype(as_plain), ingredient_usage.astype(as_plain))
+
+
+def test_compact_cache_follows_append(tmp_path, lines):
+    path = str(tmp_path / DATA_FILE)
+    # Both parts must hold whole orders to follow the fixed recipes
+    first, _ = order_splits(lines)
+    write(path, b''.join(lines[:first]))
+    load_compact_data(path)  # writes both caches
+    write(path, b''.join(lines[first:]))
+    compact, tail = load_compact_data(path)
+
+    assert tail.offset == os.path.getsize(path)
+    expected = OrderCube.from_frame(load_restaurant_data(path, use_cache=False))
+    assert_same_counts(OrderCube.from_compact(compact), expected)
+
+
+def test_varying_recipe_falls_back_to_full_table(tmp_path, lines):
+    path = str(tmp_path / DATA_FILE)
+    # One serving of a dish with an odd quantity breaks the fixed-recipe assumption
+    fields = lines[5].split(b',')
+    fields[4] = b'%g' % (float(fields[4]) * 3)
+    write(path, b''.join(lines[:5] + [b','.join(fields)] + lines[6:]))
+    df = load_restaurant_data(path, use_cache=False)
+    with pytest.raises(ValueError):
+        CompactOrders.from_frame(df)
+
+    orders, tail = load_orders(path)
+    assert tail.offset == os.path.getsize(path)
+    assert_same_counts(orders, OrderCube.from_frame(df))
+
+
+# --- SQLite order store ---
+
+def test_store_append_import_matches_rebuild(tmp_path, lines):
+    path, store_path = str(tmp_path / DATA_FILE), str(tmp_path / 'orders.sqlite')
+    first, second = straddling_splits(lines)
+    half_line = len(lines[second]) // 2
+    write(path, b''.join(lines[:first]))
+    assert import_csv(path, store_path)['full']
+    store = OrderStore(store_path)
+
+    write(path, b''.join(lines[first:second]) + lines[second][:half_line])
+    assert not import_csv(path, store_path)['full']
+    write(path, lines[second][half_line:] + b''.join(lines[second + 1:]))
+    assert not import_csv(path, store_path)['full']
+    assert store.refresh()[0]  # an open reader sees the appends
+
+    expected = OrderCube.from_frame(load_restaurant_data(path, use_cache=False))
+    assert_same_counts(store, expected)
+    rebuilt_path = str(tmp_path / 'rebuilt.sqlite')
+    import_csv(path, rebuilt_path, rebuild=True)
+    rebuilt = OrderStore(rebuilt_path)
+    assert_same_counts(rebuilt, expected)
+    for ingredient in rebuilt.ingredients:
+        pd.testing.assert_series_equal(store.ingredient_usage(ingredient), rebuilt.ingredient_usage(ingredient))
+    store.close()
+    rebuilt.close()
+
+
+def test_store_reimports_rewritten_csv(tmp_path, lines):
+    path, store_path = str(tmp_path / DATA_FILE), str(tmp_path / 'orders.sqlite')
+    write(path, b''.join(lines))
+    import_csv(path, store_path)
+    first, _ = order_splits(lines)
+    with open(path, 'wb') as f:
+        f.write(b''.join(lines[:first]))
+    assert import_csv(path, store_path)['full']
+
+    store = OrderStore(store_path)
+    assert_same_counts(store, OrderCube.from_frame(load_restaurant_data(path, use_cache=False)))
+    store.close()